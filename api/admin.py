@@ -17,7 +17,7 @@ class BackgroundImageAdmin(admin.ModelAdmin):
             'fields': ('title', 'image', 'image_preview', 'hotspot_name')
         }),
         ('Status', {
-            'fields': ('is_active',)
+            'fields': ('is_active', ('starts_at', 'ends_at'))
         }),
         ('Metadata', {
             'fields': ('uploaded_by', 'uploaded_at', 'updated_at'),
@@ -166,7 +166,7 @@ class SlideContentAdmin(admin.ModelAdmin):
             'description': 'Add a call-to-action button to redirect users'
         }),
         ('Settings', {
-            'fields': ('hotspot_name', 'order', 'is_active')
+            'fields': ('hotspot_name', 'order', 'is_active', ('starts_at', 'ends_at'))
         }),
         ('Metadata', {
             'fields': ('created_by', 'created_at', 'updated_at'),
@@ -205,8 +205,8 @@ class TemplateConfigAdmin(admin.ModelAdmin):
             'fields': ('template_name', 'left_panel_component')
         }),
         ('Assignment', {
-            'fields': ('hotspot_name', 'is_active'),
-            'description': 'Assign this template to a specific hotspot or leave blank for all hotspots. Only one template can be active per hotspot.'
+            'fields': ('hotspot_name', 'is_active', ('starts_at', 'ends_at')),
+            'description': 'Assign this template to a specific hotspot or leave blank for all hotspots. Only one template without a schedule can be active per hotspot; a scheduled one overrides it during its window.'
         }),
         ('Metadata', {
             'fields': ('created_by', 'created_at', 'updated_at'),
@@ -239,7 +239,7 @@ class CardContentAdmin(admin.ModelAdmin):
             'fields': ('icon', 'title', 'description')
         }),
         ('Display Settings', {
-            'fields': ('hotspot_name', 'order', 'is_active'),
+            'fields': ('hotspot_name', 'order', 'is_active', ('starts_at', 'ends_at')),
             'description': 'Cards will be displayed in order from lowest to highest number.'
         }),
         ('Metadata', {
@@ -274,7 +274,7 @@ class LandingPageURLAdmin(admin.ModelAdmin):
             'fields': ('title', 'url', 'hotspot_name')
         }),
         ('Settings', {
-            'fields': ('is_active', 'priority'),
+            'fields': ('is_active', 'priority', ('starts_at', 'ends_at')),
             'description': 'Only one landing URL can be active per hotspot at a time.'
         }),
         ('Analytics', {
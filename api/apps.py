@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from . import signals  # noqa: F401 — connect cache invalidation receivers
+        from backend import sqlite  # noqa: F401 — connect SQLite pragma receiver
@@ -0,0 +1,135 @@
+"""
+Bulk reorder / activate / deactivate for public content.
+
+apply_changes() takes a list of {"id", "order", "is_active"} changes for one
+model and applies them in a single transaction with bulk_update: one SELECT
+for the rows, one department-scope check for all of them, one UPDATE. Saving
+item by item runs one query per item and fires post_save each time, which
+bumps the public content version (api/signals.py) once per item.
+
+bulk_update fires no signals, so the caller gets the affected hotspot names
+back and the cache is invalidated once here, after the commit. The fast-path
+cache (api/fastpath.py) is versioned globally and default content (blank
+hotspot_name) is served to every hotspot, so one version bump covers every
+affected hotspot.
+
+Used by the bulk_update actions on the slide, card and background viewsets.
+"""
+
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import PermissionDenied
+
+from .models import PERMANENT, BackgroundImage, CardContent, SlideContent
+
+logger = logging.getLogger(__name__)
+
+BULK_MAX_ITEMS = 500
+
+# Fields a bulk change may set, per model (BackgroundImage has no order)
+BULK_FIELDS = {
+    SlideContent: ('order', 'is_active'),
+    CardContent: ('order', 'is_active'),
+    BackgroundImage: ('is_active',),
+}
+
+# One active permanent (unscheduled) row per hotspot, as enforced by the model's save()
+EXCLUSIVE_ACTIVE = (BackgroundImage,)
+
+
+def _parse_changes(model, changes):
+    """Validate the payload; return {id: {field: value}}."""
+    if not isinstance(changes, list) or not changes:
+        raise ValueError('changes ต้องเป็นรายการที่ไม่ว่าง')
+    if len(changes) > BULK_MAX_ITEMS:
+        raise ValueError(f'แก้ไขได้ครั้งละไม่เกิน {BULK_MAX_ITEMS} รายการ')
+
+    allowed_fields = BULK_FIELDS[model]
+    parsed = {}
+    for change in changes:
+        if not isinstance(change, dict):
+            raise ValueError('แต่ละรายการต้องเป็น object ที่มี id')
+        pk = change.get('id')
+        if isinstance(pk, bool) or not isinstance(pk, int):
+            raise ValueError('id ต้องเป็นตัวเลข')
+        if pk in parsed:
+            raise ValueError(f'id {pk} ซ้ำกัน')
+
+        unknown = set(change) - {'id', *allowed_fields}
+        if unknown:
+            raise ValueError(f'ไม่รองรับฟิลด์: {", ".join(sorted(unknown))}')
+        values = {field: change[field] for field in allowed_fields if field in change}
+        if not values:
+            raise ValueError(f'id {pk}: ต้องระบุ {" หรือ ".join(allowed_fields)}')
+        if 'order' in values and (isinstance(values['order'], bool) or not isinstance(values['order'], int)):
+            raise ValueError(f'id {pk}: order ต้องเป็นตัวเลข')
+        if 'is_active' in values and not isinstance(values['is_active'], bool):
+            raise ValueError(f'id {pk}: is_active ต้องเป็น true/false')
+        parsed[pk] = values
+    return parsed
+
+
+def apply_changes(queryset, changes, allowed):
+    """
+    Apply bulk changes to rows of queryset.model.
+
+    queryset limits which rows are visible to the user (the viewset's
+    get_queryset()); allowed is _get_allowed_hotspot_names(user) — None for
+    staff. Raises ValueError for a bad payload or unknown ids and
+    PermissionDenied when any row belongs to a hotspot outside allowed.
+    Returns (updated row count, sorted affected hotspot names; '' = default).
+    """
+    model = queryset.model
+    parsed = _parse_changes(model, changes)
+    exclusive = model in EXCLUSIVE_ACTIVE
+
+    with transaction.atomic():
+        rows = list(queryset.filter(pk__in=parsed))
+        missing = set(parsed) - {row.pk for row in rows}
+        if missing:
+            raise ValueError(f'ไม่พบรายการ id: {", ".join(str(pk) for pk in sorted(missing))}')
+
+        if allowed is not None:
+            allowed_set = set(allowed)
+            if any(row.hotspot_name and row.hotspot_name not in allowed_set for row in rows):
+                raise PermissionDenied("คุณไม่มีสิทธิ์จัดการ Hotspot นี้")
+
+        activated = {}  # hotspot_name -> activated permanent pk (exclusive models only)
+        now = timezone.now()
+        changed = []
+        for row in rows:
+            values = parsed[row.pk]
+            if exclusive and values.get('is_active') and not row.is_scheduled:
+                if row.hotspot_name in activated:
+                    raise ValueError(f'เปิดใช้งานได้ครั้งละ 1 รายการต่อ Hotspot ({row.hotspot_name or "ค่าเริ่มต้น"})')
+                activated[row.hotspot_name] = row.pk
+            if all(getattr(row, field) == value for field, value in values.items()):
+                continue
+            for field, value in values.items():
+                setattr(row, field, value)
+            row.updated_at = now
+            changed.append(row)
+
+        if changed:
+            model.objects.bulk_update(changed, [*BULK_FIELDS[model], 'updated_at'])
+        affected = {row.hotspot_name or '' for row in changed}
+        deactivated = 0
+        for hotspot_name, pk in activated.items():
+            count = model.objects.filter(
+                PERMANENT, hotspot_name=hotspot_name, is_active=True
+            ).exclude(pk=pk).update(is_active=False, updated_at=now)
+            if count:
+                deactivated += count
+                affected.add(hotspot_name or '')
+
+    affected = sorted(affected)
+    if affected:
+        from .fastpath import bump_content_version  # fastpath imports views, which imports this module
+        transaction.on_commit(bump_content_version)
+        logger.info(
+            f"[Bulk Content] {model.__name__}: {len(changed)} updated, {deactivated} deactivated "
+            f"({', '.join(h or 'default' for h in affected)})"
+        )
+    return len(changed), affected
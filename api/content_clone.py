@@ -0,0 +1,134 @@
+"""
+Clone one hotspot's public content to other hotspots.
+
+clone_content() copies the source hotspot's own active TemplateConfig,
+BackgroundImage and LandingPageURL plus its active SlideContent and
+CardContent to every target, with one bulk_create per model in a single
+transaction — five INSERTs however many targets there are. Image fields are
+copied by reference (the same file under MEDIA_ROOT); deleting a row never
+removes its file, so the clones stay valid when the source is edited.
+
+bulk_create and the deactivating update() fire no signals, so the public
+content version is bumped once after the commit, the landing URL cache of
+each target is dropped, and — when an origin is given — the fast-path cache
+is warmed for every target (api/fastpath.py warm()).
+
+Used by HotspotViewSet.clone_content and `python manage.py clone_hotspot_content`.
+"""
+
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import FileField
+
+from .models import BackgroundImage, CardContent, Hotspot, LandingPageURL, SlideContent, TemplateConfig
+
+logger = logging.getLogger(__name__)
+
+CLONE_MAX_TARGETS = 200
+
+# (model, field holding the creating user)
+CLONE_MODELS = (
+    (TemplateConfig, 'created_by'),
+    (BackgroundImage, 'uploaded_by'),
+    (LandingPageURL, 'created_by'),
+    (SlideContent, 'created_by'),
+    (CardContent, 'created_by'),
+)
+
+# Per-row state that belongs to the source, not to the content
+RESET_FIELDS = {
+    LandingPageURL: {'redirect_count': 0, 'last_redirected_at': None},
+}
+
+
+def _copy(row, hotspot_name, user_field, user):
+    fields = {}
+    for field in row._meta.concrete_fields:
+        if field.primary_key:
+            continue
+        value = getattr(row, field.attname)
+        # Share the stored file: pass its name, not the FieldFile bound to the source row
+        fields[field.attname] = value.name if isinstance(field, FileField) else value
+    fields.update(RESET_FIELDS.get(type(row), {}))
+    fields['hotspot_name'] = hotspot_name
+    if user is not None:
+        fields[f'{user_field}_id'] = user.pk
+    return type(row)(**fields)
+
+
+def _resolve_targets(source_name, target_names):
+    if not isinstance(target_names, list) or not target_names:
+        raise ValueError('targets ต้องเป็นรายการชื่อ Hotspot ที่ไม่ว่าง')
+    targets = []
+    for name in target_names:
+        if not isinstance(name, str) or not name:
+            raise ValueError('ชื่อ Hotspot ปลายทางไม่ถูกต้อง')
+        if name != source_name and name not in targets:
+            targets.append(name)
+    if not targets:
+        raise ValueError('ต้องมี Hotspot ปลายทางอย่างน้อย 1 แห่งที่ไม่ใช่ต้นทาง')
+    if len(targets) > CLONE_MAX_TARGETS:
+        raise ValueError(f'คัดลอกได้ครั้งละไม่เกิน {CLONE_MAX_TARGETS} Hotspot')
+
+    known = set(Hotspot.objects.filter(hotspot_name__in=targets).values_list('hotspot_name', flat=True))
+    unknown = [name for name in targets if name not in known]
+    if unknown:
+        raise ValueError(f'ไม่พบ Hotspot: {", ".join(unknown)}')
+    return targets
+
+
+def clone_content(source_name, target_names, user=None, replace=False, origin=None):
+    """
+    Copy source_name's active content to target_names.
+
+    Targets must exist as Hotspot rows. A target that already has active
+    content is refused unless replace is set, in which case its existing
+    rows are deactivated (kept, not deleted) before the copies are added.
+    Raises ValueError for bad input or conflicts.
+    Returns ({model name: rows created}, target names).
+    """
+    targets = _resolve_targets(source_name, target_names)
+
+    sources = []
+    for model, user_field in CLONE_MODELS:
+        # Scheduled rows (and their windows) come along with the permanent one
+        rows = list(model.objects.filter(hotspot_name=source_name, is_active=True))
+        sources.append((model, user_field, rows))
+    if not any(rows for _, _, rows in sources):
+        raise ValueError(f'Hotspot {source_name} ไม่มีเนื้อหาที่เปิดใช้งานให้คัดลอก')
+
+    created = {}
+    with transaction.atomic():
+        for model, _, _ in sources:
+            active = model.objects.filter(hotspot_name__in=targets, is_active=True)
+            if replace:
+                active.update(is_active=False)
+                continue
+            busy = sorted(set(active.values_list('hotspot_name', flat=True)))
+            if busy:
+                raise ValueError(f'Hotspot มีเนื้อหาอยู่แล้ว: {", ".join(busy)} (ใช้ replace เพื่อแทนที่)')
+
+        for model, user_field, rows in sources:
+            copies = [_copy(row, name, user_field, user) for name in targets for row in rows]
+            model.objects.bulk_create(copies)
+            created[model.__name__] = len(copies)
+
+        transaction.on_commit(lambda: _after_commit(targets, origin))
+
+    logger.info(
+        f"[Clone] {source_name} -> {len(targets)} hotspots: "
+        + ', '.join(f'{name} {count}' for name, count in created.items())
+    )
+    return created, targets
+
+
+def _after_commit(targets, origin):
+    from .fastpath import bump_content_version, warm  # fastpath imports views, which imports this module
+
+    bump_content_version()
+    cache.delete_many([f'landing_url_{name}' for name in targets])
+    if origin and settings.PUBLIC_API_FAST_PATH:
+        warm(origin, targets)
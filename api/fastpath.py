@@ -0,0 +1,325 @@
+"""
+Fast path for the hot public endpoints used by MikroTik login pages:
+login-background, slide-content, template-config and landing-url.
+
+These are plain Django views (no DRF content negotiation, authentication,
+throttling or Response rendering). Each response body is built once,
+encoded to JSON bytes exactly the way DRF's JSONRenderer would, and cached
+per (endpoint, hotspot, host). Content edits bump a cache version
+(see api/signals.py), and entries expire at the next publishing window
+boundary (api/schedule.py), so cached bytes never outlive the data they
+came from.
+Each process also keeps its own copy of recent responses; their keys embed
+the version read from the (possibly shared, see SHARED_CACHE) cache, so an
+edit made through any worker process takes effect in all of them at once.
+
+Uncommon requests (non-GET, template_id preview) and unexpected errors are
+delegated to the original DRF views in api/views.py, which stay the
+reference implementation. Enabled with PUBLIC_API_FAST_PATH (default on);
+compare both paths with `python manage.py bench_public_api`.
+"""
+
+import hashlib
+import json
+import logging
+import time
+from urllib.parse import urljoin, urlsplit
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+
+from backend.metrics import LANDING_URL_CACHE, PUBLIC_RESPONSE_CACHE
+
+from . import schedule
+from . import views as drf_views
+from .models import BackgroundImage, SlideContent, CardContent, TemplateConfig, LandingPageURL
+
+logger = logging.getLogger(__name__)
+
+CONTENT_VERSION_KEY = 'public_content_version'
+FAST_CACHE_TIMEOUT = 300  # seconds, same as the landing URL cache
+LOCAL_CACHE_MAX_ENTRIES = 512
+
+_local_cache = {}  # key -> (expires_at monotonic, (status, body)); per process
+
+
+def content_version():
+    """Current public content version (bumped on every content edit)"""
+    version = cache.get(CONTENT_VERSION_KEY)
+    if version is None:
+        cache.add(CONTENT_VERSION_KEY, 1, timeout=None)
+        version = cache.get(CONTENT_VERSION_KEY, 1)
+    return version
+
+
+def bump_content_version():
+    """Invalidate every cached fast-path response"""
+    try:
+        cache.incr(CONTENT_VERSION_KEY)
+    except ValueError:
+        cache.set(CONTENT_VERSION_KEY, 2, timeout=None)
+
+
+def encode_json(data):
+    """Encode like DRF's JSONRenderer (UNICODE_JSON, COMPACT_JSON, STRICT_JSON)"""
+    text = json.dumps(data, ensure_ascii=False, separators=(',', ':'), allow_nan=False)
+    return text.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029').encode('utf-8')
+
+
+def _cache_key(endpoint, request, hotspot_name):
+    # Absolute image URLs depend on scheme + host, so they are part of the key
+    origin = f"{request.scheme}://{request.get_host()}"
+    digest = hashlib.sha1(f"{origin}|{hotspot_name or ''}".encode('utf-8')).hexdigest()
+    return f'fastpath:{endpoint}:{content_version()}:{digest}'
+
+
+def _remember(key, cached, timeout):
+    if len(_local_cache) >= LOCAL_CACHE_MAX_ENTRIES:
+        _local_cache.clear()  # old versions pile up after edits; cheap to rebuild
+    _local_cache[key] = (time.monotonic() + timeout, cached)
+
+
+def _json_response(status_code, body):
+    return HttpResponse(body, status=status_code, content_type='application/json')
+
+
+def _cached(endpoint, builder, fallback_view):
+    """
+    Wrap a payload builder into a cached plain Django view.
+    builder(request, hotspot_name) -> (status_code, dict)
+    """
+    @csrf_exempt
+    def view(request):
+        if request.method != 'GET':
+            return fallback_view(request)
+
+        hotspot_name = request.GET.get('hotspot_name', None)
+        try:
+            key = _cache_key(endpoint, request, hotspot_name)
+            result = 'hit'
+            local = _local_cache.get(key)
+            if local and local[0] > time.monotonic():
+                cached = local[1]
+            else:
+                # Entries never outlive the next content window boundary (api/schedule.py)
+                timeout = schedule.cache_timeout(hotspot_name, FAST_CACHE_TIMEOUT)
+                cached = cache.get(key)
+                if cached is None:
+                    result = 'miss'
+                    status_code, data = builder(request, hotspot_name)
+                    cached = (status_code, encode_json(data))
+                    if timeout:
+                        cache.set(key, cached, timeout=timeout)
+                if timeout:
+                    _remember(key, cached, timeout)
+            PUBLIC_RESPONSE_CACHE.labels(endpoint, result).inc()
+            if endpoint == 'landing-url':
+                LANDING_URL_CACHE.labels(result).inc()
+            return _json_response(*cached)
+        except Exception as e:
+            logger.error(f"[FastPath] {endpoint} failed, falling back to DRF view: {str(e)}", exc_info=True)
+            return fallback_view(request)
+
+    view.__name__ = f'fast_{endpoint}'
+    view.__doc__ = f"Fast-path (cached, pre-encoded) version of {fallback_view.__name__}"
+    return view
+
+
+# ===============================================
+# Payload builders (same schema as api/views.py)
+# ===============================================
+
+def _absolute_url(request, field):
+    return request.build_absolute_uri(field.url) if field else None
+
+
+def _active_for_hotspot(model, hotspot_name, ordered=False):
+    """Hotspot-specific live rows, falling back to default (hotspot_name NULL) rows"""
+    qs = model.objects.live()
+    if ordered:
+        qs = qs.order_by('order')
+    if hotspot_name:
+        rows = list(qs.filter(hotspot_name=hotspot_name))
+        if rows:
+            return rows
+    return list(qs.filter(hotspot_name__isnull=True))
+
+
+def _first_active(model, hotspot_name):
+    qs = model.objects.live().scheduled_first()
+    obj = qs.filter(hotspot_name=hotspot_name).first() if hotspot_name else None
+    return obj or qs.filter(hotspot_name__isnull=True).first()
+
+
+def _invalid_hotspot_name(hotspot_name):
+    return hotspot_name and len(hotspot_name) > 100
+
+
+def build_background(request, hotspot_name):
+    if _invalid_hotspot_name(hotspot_name):
+        return 400, {'success': False, 'message': 'Invalid hotspot_name parameter'}
+
+    background = _first_active(BackgroundImage, hotspot_name)
+    if not background:
+        return 404, {'success': False, 'message': 'No active background image found'}
+    return 200, {
+        'success': True,
+        'imageUrl': _absolute_url(request, background.image),
+        'title': background.title,
+    }
+
+
+def build_slide_content(request, hotspot_name):
+    # Note: get_slide_content uses the model's default ordering (order, created_at)
+    if hotspot_name:
+        slides = list(SlideContent.objects.live().filter(hotspot_name=hotspot_name))
+        if not slides:
+            slides = list(SlideContent.objects.live().filter(hotspot_name__isnull=True))
+    else:
+        slides = list(SlideContent.objects.live().filter(hotspot_name__isnull=True))
+
+    if not slides:
+        return 404, {'success': False, 'message': 'No active slides found', 'slides': []}
+
+    slide_data = [
+        {'icon': slide.icon, 'title': slide.title, 'description': slide.description}
+        for slide in slides
+    ]
+    return 200, {'success': True, 'slides': slide_data, 'count': len(slide_data)}
+
+
+def build_template_config(request, hotspot_name):
+    if _invalid_hotspot_name(hotspot_name):
+        return 400, {'success': False, 'message': 'Invalid hotspot_name parameter'}
+
+    template_config = _first_active(TemplateConfig, hotspot_name)
+    if not template_config:
+        return 200, {
+            'success': True,
+            'template_name': 'Default Slideshow',
+            'left_panel_component': 'slideshow',
+            'slides': [],
+            'background': {},
+        }
+
+    data = {
+        'success': True,
+        'template_name': template_config.template_name,
+        'left_panel_component': template_config.left_panel_component,
+    }
+
+    if template_config.left_panel_component == 'slideshow':
+        data['slides'] = [
+            {
+                'icon': slide.icon,
+                'icon_image_url': _absolute_url(request, slide.icon_image),
+                'title': slide.title,
+                'description': slide.description,
+                'show_title': slide.show_title,
+                'show_description': slide.show_description,
+                'image_size': slide.image_size,
+                'show_link': slide.show_link,
+                'link_url': slide.link_url,
+                'link_text': slide.link_text,
+            }
+            for slide in _active_for_hotspot(SlideContent, hotspot_name, ordered=True)
+        ]
+    elif template_config.left_panel_component == 'cardgallery':
+        data['cards'] = [
+            {
+                'icon': card.icon,
+                'icon_image_url': _absolute_url(request, card.icon_image),
+                'title': card.title,
+                'description': card.description,
+            }
+            for card in _active_for_hotspot(CardContent, hotspot_name, ordered=True)
+        ]
+
+    background = _first_active(BackgroundImage, hotspot_name)
+    data['background'] = {
+        'imageUrl': _absolute_url(request, background.image),
+        'title': background.title,
+    } if background else {}
+    return 200, data
+
+
+def build_landing_url(request, hotspot_name):
+    if not hotspot_name:
+        return 400, {'success': False, 'message': 'hotspot_name parameter is required', 'fallback': True}
+    if len(hotspot_name) > 100:
+        return 400, {'success': False, 'message': 'Invalid hotspot_name parameter', 'fallback': True}
+
+    landing_url = LandingPageURL.objects.live().scheduled_first().filter(hotspot_name=hotspot_name).first()
+    if not landing_url:
+        return 200, {
+            'success': True,
+            'landing_url': None,
+            'fallback': True,
+            'message': f'No active landing URL configured for {hotspot_name}',
+        }
+
+    # Same semantics as get_landing_url: count once per cache fill
+    landing_url.redirect_count += 1
+    landing_url.last_redirected_at = timezone.now()
+    landing_url.save(update_fields=['redirect_count', 'last_redirected_at'])
+    return 200, {
+        'success': True,
+        'landing_url': landing_url.url,
+        'title': landing_url.title,
+        'fallback': False,
+    }
+
+
+fast_get_background_image = _cached('login-background', build_background, drf_views.get_background_image)
+fast_get_slide_content = _cached('slide-content', build_slide_content, drf_views.get_slide_content)
+fast_get_landing_url = _cached('landing-url', build_landing_url, drf_views.get_landing_url)
+_fast_template_config = _cached('template-config', build_template_config, drf_views.get_template_config)
+
+
+# Endpoints warm() pre-fills; landing-url is left out because a cache fill counts a redirect
+WARM_BUILDERS = (
+    ('template-config', build_template_config),
+    ('login-background', build_background),
+    ('slide-content', build_slide_content),
+)
+
+
+class _OriginRequest:
+    """Just enough of HttpRequest for _cache_key and the payload builders"""
+
+    def __init__(self, origin):
+        parts = urlsplit(origin)
+        self.scheme = parts.scheme or 'http'
+        self._host = parts.netloc
+
+    def get_host(self):
+        return self._host
+
+    def build_absolute_uri(self, location):
+        return urljoin(f'{self.scheme}://{self._host}/', location)
+
+
+def warm(origin, hotspot_names):
+    """
+    Pre-fill the shared cache for hotspot_names as requested from origin
+    (scheme://host, the address MikroTik login pages fetch from).
+    """
+    request = _OriginRequest(origin)
+    for hotspot_name in hotspot_names:
+        timeout = schedule.cache_timeout(hotspot_name, FAST_CACHE_TIMEOUT)
+        if not timeout:
+            continue
+        for endpoint, builder in WARM_BUILDERS:
+            status_code, data = builder(request, hotspot_name)
+            cache.set(_cache_key(endpoint, request, hotspot_name), (status_code, encode_json(data)), timeout=timeout)
+    logger.info(f"[FastPath] Warmed {len(WARM_BUILDERS)} endpoints for {len(hotspot_names)} hotspots ({origin})")
+
+
+@csrf_exempt
+def fast_get_template_config(request):
+    """Fast-path version of get_template_config (preview with template_id goes through DRF)"""
+    if request.GET.get('template_id'):
+        return drf_views.get_template_config(request)
+    return _fast_template_config(request)
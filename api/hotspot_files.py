@@ -0,0 +1,387 @@
+"""
+Hotspot file helpers: render login.html from hotspot/login_master.html, write
+it into {hotspot_name}/ folders, and build the ZIP bundles that are uploaded
+to MikroTik.
+
+Bundles are cached on disk under HOTSPOT_BUNDLE_CACHE_DIR, keyed by a hash of
+the master folder contents plus the hotspot name, so repeated downloads are
+streamed straight from disk without re-zipping.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import shutil
+import stat
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.utils import timezone
+
+from webapp.assets import asset_version
+
+logger = logging.getLogger(__name__)
+
+# Files in hotspot/ that are sources, not part of the uploaded bundle
+MASTER_SKIP_FILES = {'login.html', 'login_master.html', 'login.html.working-backup', 'README.md'}
+HOTSPOT_NAME_PLACEHOLDER = "'__HOTSPOT_NAME__'"
+HOTSPOT_NAME_PATTERN = re.compile(r"window\.HOTSPOT_NAME\s*=\s*['\"]([^'\"]+)['\"]")
+# login.css link in login_master.html (the login_css view, served from the asset
+# registry); ?v= is replaced with the content hash of the file that view serves
+LOGIN_CSS_PATTERN = re.compile(r"(/login\.css)(?:\?v=[\w.-]*)?(['\"])")
+
+BUNDLE_OPEN_ATTEMPTS = 3
+
+
+def _read_umask():
+    # os.umask() can only be read by setting it; done once at import, before request threads start
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return umask
+
+
+# Mode for newly created files, as open() would give them (mkstemp always uses 0600)
+NEW_FILE_MODE = 0o666 & ~_read_umask()
+
+_fingerprint_lock = threading.Lock()
+_fingerprint_memo = {}  # stat signature -> content digest
+# (master content, css version, stamped master): the template is mostly Thai text,
+# ~4 bytes per char in memory, so it is stamped once, not once per hotspot
+_stamped_master = (None, None, None)
+
+
+def master_dir():
+    return os.path.join(settings.BASE_DIR, 'hotspot')
+
+
+def master_template_path():
+    return os.path.join(master_dir(), 'login_master.html')
+
+
+def bundle_cache_dir():
+    return str(getattr(settings, 'HOTSPOT_BUNDLE_CACHE_DIR', os.path.join(settings.BASE_DIR, 'cache', 'hotspot_bundles')))
+
+
+def render_login_html(master_content, hotspot_name):
+    """
+    Substitute the __HOTSPOT_NAME__ placeholder in the master template and
+    version the login.css link by content hash, so routers and browsers can
+    cache the stylesheet long-term and still pick up every change.
+    """
+    return _stamp_login_css(master_content).replace(HOTSPOT_NAME_PLACEHOLDER, f"'{hotspot_name}'")
+
+
+def _stamp_login_css(master_content):
+    global _stamped_master
+    css_version = asset_version('login_css')
+    if not css_version:
+        return master_content
+    content, version, stamped = _stamped_master
+    if version == css_version and content == master_content:
+        return stamped
+    stamped = LOGIN_CSS_PATTERN.sub(lambda m: f'{m.group(1)}?v={css_version}{m.group(2)}', master_content)
+    _stamped_master = (master_content, css_version, stamped)
+    return stamped
+
+
+def login_html_path(hotspot_name):
+    return os.path.join(settings.BASE_DIR, hotspot_name, 'login.html')
+
+
+def read_master_template():
+    """Read login_master.html (raises FileNotFoundError)"""
+    with open(master_template_path(), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def configured_hotspot_name(content):
+    """Return the window.HOTSPOT_NAME value in a login.html, or None"""
+    match = HOTSPOT_NAME_PATTERN.search(content)
+    return match.group(1) if match else None
+
+
+def check_hotspot_files(hotspot_name):
+    """
+    Filesystem part of the hotspot health check.
+    Returns {'folder_exists', 'login_file_exists', 'config_matched'}.
+    """
+    login_file_path = login_html_path(hotspot_name)
+    folder_exists = os.path.isdir(os.path.dirname(login_file_path))
+    login_file_exists = os.path.isfile(login_file_path)
+
+    config_matched = False
+    if login_file_exists:
+        try:
+            with open(login_file_path, 'r', encoding='utf-8') as f:
+                config_matched = configured_hotspot_name(f.read()) == hotspot_name
+        except (OSError, UnicodeDecodeError) as e:
+            logger.error(f"[Hotspot Test] Error reading login.html for {hotspot_name}: {str(e)}")
+
+    return {
+        'folder_exists': folder_exists,
+        'login_file_exists': login_file_exists,
+        'config_matched': config_matched,
+    }
+
+
+def _set_replacement_mode(tmp_path, path):
+    """Give a mkstemp file (0600) the mode of the file it replaces, or NEW_FILE_MODE"""
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        mode = NEW_FILE_MODE
+    os.chmod(tmp_path, mode)
+
+
+def write_login_html(hotspot_name, generated, force=False):
+    """
+    Write {hotspot_name}/login.html atomically (temp file + rename), so MikroTik
+    never sees a truncated file. Skips the write when the existing file already
+    has the same content hash. Returns True if the file was written.
+    """
+    output_path = login_html_path(hotspot_name)
+    data = generated.encode('utf-8')
+
+    if not force and os.path.isfile(output_path):
+        with open(output_path, 'rb') as f:
+            if hashlib.sha256(f.read()).digest() == hashlib.sha256(data).digest():
+                return False
+
+    folder_path = os.path.dirname(output_path)
+    os.makedirs(folder_path, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=folder_path, prefix='.login.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        _set_replacement_mode(tmp_path, output_path)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return True
+
+
+def regenerate_login_pages(hotspots, force=False, max_workers=4):
+    """
+    Render login.html for every hotspot from a single read of login_master.html,
+    write them concurrently, and update the status fields with one bulk_update.
+
+    Returns a list of dicts: {'hotspot_name', 'written', 'error'}.
+    Raises FileNotFoundError if login_master.html is missing.
+    """
+    from .models import Hotspot
+
+    hotspots = list(hotspots)
+    master_content = read_master_template()
+
+    def render_one(hotspot):
+        generated = render_login_html(master_content, hotspot.hotspot_name)
+        try:
+            written = write_login_html(hotspot.hotspot_name, generated, force=force)
+            return {'hotspot_name': hotspot.hotspot_name, 'written': written, 'error': None,
+                    'config_matched': configured_hotspot_name(generated) == hotspot.hotspot_name}
+        except OSError as e:
+            logger.error(f"[Generate] Error writing login.html for {hotspot.hotspot_name}: {str(e)}")
+            return {'hotspot_name': hotspot.hotspot_name, 'written': False, 'error': str(e),
+                    'config_matched': False}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        results = list(pool.map(render_one, hotspots))
+
+    now = timezone.now()
+    for hotspot, result in zip(hotspots, results):
+        ok = result['error'] is None
+        hotspot.folder_exists = ok or os.path.isdir(os.path.dirname(login_html_path(hotspot.hotspot_name)))
+        hotspot.login_file_exists = ok or os.path.isfile(login_html_path(hotspot.hotspot_name))
+        hotspot.config_matched = result.pop('config_matched')
+        hotspot.last_checked = now
+    Hotspot.objects.bulk_update(hotspots, ['folder_exists', 'login_file_exists', 'config_matched', 'last_checked'])
+
+    written = sum(1 for r in results if r['written'])
+    logger.info(f"[Generate] Bulk regenerate: {written} written, {len(results) - written} unchanged/failed")
+    return results
+
+
+def _bundle_files():
+    """Supporting files copied from hotspot/ into every bundle: [(abs_path, arcname)], sorted"""
+    root_dir = master_dir()
+    files = []
+    for root, dirs, filenames in os.walk(root_dir):
+        dirs.sort()
+        for filename in sorted(filenames):
+            if root == root_dir and filename in MASTER_SKIP_FILES:
+                continue
+            abs_path = os.path.join(root, filename)
+            files.append((abs_path, os.path.relpath(abs_path, root_dir).replace(os.sep, '/')))
+    return files
+
+
+def master_fingerprint():
+    """
+    Content hash of login_master.html + supporting files.
+    Re-hashes file contents only when a file's (size, mtime) changes.
+    """
+    entries = [(master_template_path(), 'login_master.html')] + _bundle_files()
+    signature = tuple(
+        (arcname, st.st_size, st.st_mtime_ns)
+        for abs_path, arcname in entries
+        for st in [os.stat(abs_path)]
+    )
+
+    digest = _fingerprint_memo.get(signature)
+    if digest:
+        return digest
+
+    with _fingerprint_lock:
+        h = hashlib.sha256()
+        for abs_path, arcname in entries:
+            h.update(arcname.encode('utf-8') + b'\0')
+            with open(abs_path, 'rb') as f:
+                h.update(hashlib.sha256(f.read()).digest())
+        digest = h.hexdigest()
+        _fingerprint_memo.clear()
+        _fingerprint_memo[signature] = digest
+    return digest
+
+
+def bundle_key(hotspot_name, fingerprint=None):
+    fingerprint = fingerprint or master_fingerprint()
+    # login.html embeds the login.css hash, so a stylesheet change is a new bundle
+    key = f"{fingerprint}:{asset_version('login_css')}:{hotspot_name}"
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:20]
+
+
+def _atomic_write_zip(path, write_entries):
+    """Write a ZIP to a temp file in the same directory, then rename into place"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            with zipfile.ZipFile(f, 'w', zipfile.ZIP_DEFLATED) as zf:
+                write_entries(zf)
+        _set_replacement_mode(tmp_path, path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _prune(name, keep_path):
+    """Remove older cached bundles for the same name ({name}-{key}.zip)"""
+    cache_dir = os.path.dirname(keep_path)
+    for filename in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, filename)
+        if filename.endswith('.zip') and filename.rsplit('-', 1)[0] == name and path != keep_path:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def get_hotspot_bundle(hotspot_name, fingerprint=None, master_content=None):
+    """
+    Return the path of the cached ZIP bundle for hotspot_name, building it if needed.
+    Raises FileNotFoundError if login_master.html is missing.
+    The file can be pruned by a concurrent build at any time: use open_hotspot_bundle() to read it.
+    """
+    fingerprint = fingerprint or master_fingerprint()
+    key = bundle_key(hotspot_name, fingerprint)
+    path = os.path.join(bundle_cache_dir(), f'{hotspot_name}-{key}.zip')
+    if os.path.isfile(path):
+        return path
+
+    if master_content is None:
+        master_content = read_master_template()
+    generated = render_login_html(master_content, hotspot_name)
+    supporting_files = _bundle_files()
+
+    def write_entries(zf):
+        zf.writestr('login.html', generated.encode('utf-8'))
+        for abs_path, arcname in supporting_files:
+            zf.write(abs_path, arcname)
+
+    _atomic_write_zip(path, write_entries)
+    _prune(hotspot_name, path)
+    logger.info(f"[Bundle] Built {os.path.basename(path)}")
+    return path
+
+
+def _open_bundle(build):
+    """
+    Open the bundle whose path build() returns. An open handle stays readable
+    when _prune() removes the file; a bundle pruned between build() and open()
+    (another request built a newer key) is looked up again.
+    """
+    for attempt in range(BUNDLE_OPEN_ATTEMPTS):
+        path = build(attempt)
+        try:
+            return open(path, 'rb')
+        except FileNotFoundError:
+            if attempt == BUNDLE_OPEN_ATTEMPTS - 1:
+                raise
+            logger.info(f"[Bundle] {os.path.basename(path)} was pruned before it was opened, retrying")
+
+
+def open_hotspot_bundle(hotspot_name, fingerprint=None, master_content=None):
+    """Open (binary) the cached ZIP bundle for hotspot_name, building it if needed"""
+    def build(attempt):
+        if attempt:
+            # Pruned by a newer build: the master folder changed since fingerprint was taken
+            return get_hotspot_bundle(hotspot_name)
+        return get_hotspot_bundle(hotspot_name, fingerprint, master_content)
+
+    return _open_bundle(build)
+
+
+def open_all_hotspots_bundle(hotspot_names, max_workers=4):
+    """
+    Build (in parallel) every hotspot bundle and pack them into one archive:
+    hotspot_<name>.zip per hotspot, stored without recompression.
+    The combined archive is cached too, keyed by all member bundle keys.
+    Returns the open (binary) archive.
+    """
+    hotspot_names = sorted(hotspot_names)
+    return _open_bundle(lambda attempt: _build_all_hotspots_bundle(hotspot_names, max_workers))
+
+
+def _build_all_hotspots_bundle(hotspot_names, max_workers):
+    fingerprint = master_fingerprint()
+    master_content = read_master_template()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        members = list(pool.map(
+            lambda name: open_hotspot_bundle(name, fingerprint, master_content),
+            hotspot_names,
+        ))
+    try:
+        combined_key = hashlib.sha256(
+            '|'.join(os.path.basename(f.name) for f in members).encode('utf-8')
+        ).hexdigest()[:20]
+        path = os.path.join(bundle_cache_dir(), f'_all-{combined_key}.zip')
+        if os.path.isfile(path):
+            return path
+
+        def write_entries(zf):
+            # From the open handles: a member pruned meanwhile is still readable
+            for name, member in zip(hotspot_names, members):
+                info = zipfile.ZipInfo(f'hotspot_{name}.zip', time.localtime(os.fstat(member.fileno()).st_mtime)[:6])
+                info.external_attr = 0o644 << 16
+                with zf.open(info, 'w') as dest:
+                    shutil.copyfileobj(member, dest)
+
+        _atomic_write_zip(path, write_entries)
+    finally:
+        for member in members:
+            member.close()
+    _prune('_all', path)
+    logger.info(f"[Bundle] Built combined archive for {len(hotspot_names)} hotspots")
+    return path
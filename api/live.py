@@ -0,0 +1,264 @@
+"""
+Live impression feed for the monitoring dashboard.
+
+track_impression publishes every recorded impression into a ring buffer;
+/api/live/stream/ (Server-Sent Events) and /api/live/poll/ (long-poll
+fallback) hand new entries to the dashboard, so it shows activity as it
+happens without re-running the impression-statistics aggregates.
+
+Two buffers, chosen by SHARED_CACHE:
+  - RingBuffer: in-process deque + Condition (single Waitress process);
+    waiting readers are woken as soon as an event is appended
+  - SharedRingBuffer: events stored in the shared cache under a sequence
+    number from cache.incr(), so a dashboard connected to one worker sees
+    impressions ingested by every worker; readers poll the sequence
+
+Sequence numbers start from the current time in milliseconds, so they keep
+increasing across restarts and a reconnecting client's Last-Event-ID stays
+meaningful.
+
+Per-hotspot counters for today live in the cache (`live:count:<date>:<hotspot>`),
+seeded from the database the first time they are read and incremented by
+publish(); each event carries its hotspot's updated counters.
+
+Each open stream or long-poll holds a Waitress thread, so at most
+LIVE_FEED_MAX_CONNECTIONS wait at once per process; extra long-polls answer
+immediately and extra streams get 503 (the client falls back to polling).
+"""
+
+import collections
+import json
+import threading
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+
+BUFFER_SIZE = getattr(settings, 'LIVE_FEED_BUFFER_SIZE', 500)
+STREAM_SECONDS = getattr(settings, 'LIVE_FEED_STREAM_SECONDS', 55)  # then the browser reconnects with Last-Event-ID
+HEARTBEAT_SECONDS = 15
+RETRY_MS = 3000
+SHARED_POLL_INTERVAL = 0.5  # seconds between sequence checks in SharedRingBuffer.wait()
+EVENT_TTL = 600
+COUNTER_TTL = 60 * 60 * 48
+
+SEQ_KEY = 'live:seq'
+
+
+def _initial_seq():
+    return int(time.time() * 1000)
+
+
+class RingBuffer:
+    """Most recent BUFFER_SIZE events of this process"""
+
+    def __init__(self, size=BUFFER_SIZE):
+        self._events = collections.deque(maxlen=size)
+        self._condition = threading.Condition()
+        self._seq = _initial_seq()
+
+    def append(self, event):
+        with self._condition:
+            self._seq += 1
+            event['seq'] = self._seq
+            self._events.append(event)
+            self._condition.notify_all()
+        return event['seq']
+
+    def latest_seq(self):
+        return self._seq
+
+    def since(self, seq):
+        with self._condition:
+            return [event for event in self._events if event['seq'] > seq]
+
+    def wait(self, seq, timeout):
+        """Block until an event newer than seq exists or timeout passes; True if there is one"""
+        with self._condition:
+            return self._condition.wait_for(lambda: self._seq > seq, timeout)
+
+
+class SharedRingBuffer:
+    """Ring buffer in the shared cache (multi-process serving)"""
+
+    def __init__(self, size=BUFFER_SIZE):
+        self.size = size
+
+    def append(self, event):
+        cache.add(SEQ_KEY, _initial_seq(), None)
+        try:
+            seq = cache.incr(SEQ_KEY)
+        except ValueError:  # cleared between add() and incr()
+            cache.add(SEQ_KEY, _initial_seq(), None)
+            seq = cache.incr(SEQ_KEY)
+        event['seq'] = seq
+        cache.set(f'live:event:{seq}', event, EVENT_TTL)
+        return seq
+
+    def latest_seq(self):
+        return cache.get(SEQ_KEY) or 0
+
+    def since(self, seq):
+        latest = self.latest_seq()
+        first = max(seq + 1, latest - self.size + 1)
+        if first > latest:
+            return []
+        found = cache.get_many([f'live:event:{n}' for n in range(first, latest + 1)])
+        return sorted(found.values(), key=lambda event: event['seq'])
+
+    def wait(self, seq, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            if self.latest_seq() > seq:
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(SHARED_POLL_INTERVAL, remaining))
+
+
+feed = SharedRingBuffer() if settings.SHARED_CACHE else RingBuffer()
+
+# Threads currently blocked in a stream or long-poll (per process)
+connection_slots = threading.BoundedSemaphore(getattr(settings, 'LIVE_FEED_MAX_CONNECTIONS', 2))
+
+
+# ===============================================
+# Counters
+# ===============================================
+
+def _counter_keys(day, hotspot_name):
+    return f'live:count:{day}:{hotspot_name}', f'live:unique:{day}:{hotspot_name}'
+
+
+def counters(hotspot_names):
+    """{hotspot_name: {'impressions': n, 'unique': n}} for today; seeds missing ones from the DB"""
+    from .models import PageImpression
+
+    day = timezone.localdate().isoformat()
+    keys = {name: _counter_keys(day, name) for name in hotspot_names}
+    found = cache.get_many([key for pair in keys.values() for key in pair])
+    missing = [name for name, (total_key, unique_key) in keys.items() if total_key not in found or unique_key not in found]
+    if missing:
+        today = timezone.make_aware(datetime.combine(timezone.localdate(), datetime.min.time()))
+        rows = PageImpression.objects.filter(viewed_at__gte=today, hotspot_name__in=missing).order_by().values(
+            'hotspot_name'
+        ).annotate(impressions=Count('id'), unique=Count('id', filter=Q(is_unique_today=True)))
+        seeded = {row['hotspot_name']: row for row in rows}
+        for name in missing:
+            row = seeded.get(name, {'impressions': 0, 'unique': 0})
+            total_key, unique_key = keys[name]
+            # add(): another process may have seeded (and incremented) it already
+            cache.add(total_key, row['impressions'], COUNTER_TTL)
+            cache.add(unique_key, row['unique'], COUNTER_TTL)
+        found = cache.get_many([key for pair in keys.values() for key in pair])
+    return {
+        name: {'impressions': found.get(total_key, 0), 'unique': found.get(unique_key, 0)}
+        for name, (total_key, unique_key) in keys.items()
+    }
+
+
+def _incr(key):
+    # Unseeded counters are left alone: the seed query will include this row
+    try:
+        return cache.incr(key)
+    except ValueError:
+        return None
+
+
+# ===============================================
+# Publish / read
+# ===============================================
+
+def publish_impression(hotspot_name, mac_hash, ip_address, device_type, time_on_page, is_unique_today):
+    """Called by track_impression after the row is committed"""
+    total_key, unique_key = _counter_keys(timezone.localdate().isoformat(), hotspot_name)
+    event = {
+        'hotspot_name': hotspot_name,
+        'viewed_at': timezone.localtime().isoformat(),
+        'device_type': device_type,
+        'ip_address': ip_address,
+        'time_on_page': time_on_page,
+        'is_unique_today': is_unique_today,
+        'mac_hash_short': mac_hash[:16] + '...',
+        'today_impressions': _incr(total_key),
+        'today_unique': _incr(unique_key) if is_unique_today else cache.get(unique_key),
+    }
+    return feed.append(event)
+
+
+def visible(events, allowed=None, hotspot=None):
+    """Filter events by department scope (allowed hotspot names, None = all) and the hotspot filter"""
+    return [
+        event for event in events
+        if (allowed is None or event['hotspot_name'] in allowed)
+        and (not hotspot or hotspot == 'all' or event['hotspot_name'] == hotspot)
+    ]
+
+
+def backlog(after=None, limit=20):
+    """Events after seq `after`, or the newest `limit` events for a fresh client"""
+    if after is None:
+        return feed.since(feed.latest_seq() - BUFFER_SIZE)[-limit:]
+    return feed.since(after)
+
+
+def wait_for_events(seq, timeout, allowed=None, hotspot=None):
+    """Long-poll: (visible events after seq, new seq), waiting up to timeout for one to arrive"""
+    deadline = time.monotonic() + timeout
+    while True:
+        new = feed.since(seq)
+        if new:
+            seq = new[-1]['seq']
+        events = visible(new, allowed, hotspot)
+        remaining = deadline - time.monotonic()
+        if events or remaining <= 0 or not feed.wait(seq, remaining):
+            return events, seq
+
+
+def _sse(event, data, event_id=None):
+    lines = [f'id: {event_id}'] if event_id is not None else []
+    lines += [f'event: {event}', f'data: {json.dumps(data, ensure_ascii=False)}']
+    return '\n'.join(lines) + '\n\n'
+
+
+class EventStream:
+    """
+    Iterable body of a text/event-stream response. Holds a connection slot
+    (acquired by the caller) and releases it on close() — including when the
+    client disconnects before the body is ever iterated.
+    """
+
+    def __init__(self, snapshot, after=None, allowed=None, hotspot=None):
+        self.snapshot = snapshot
+        self.after = after
+        self.allowed = allowed
+        self.hotspot = hotspot
+        self._released = False
+
+    def __iter__(self):
+        yield f'retry: {RETRY_MS}\n\n'
+        yield _sse('counters', self.snapshot)
+        seq = feed.latest_seq() if self.after is None else self.after
+        for event in visible(backlog(self.after), self.allowed, self.hotspot):
+            seq = max(seq, event['seq'])
+            yield _sse('impression', event, event['seq'])
+
+        deadline = time.monotonic() + STREAM_SECONDS
+        while (remaining := deadline - time.monotonic()) > 0:
+            if not feed.wait(seq, min(HEARTBEAT_SECONDS, remaining)):
+                yield ': keepalive\n\n'
+                continue
+            new = feed.since(seq)
+            if new:
+                seq = new[-1]['seq']
+            for event in visible(new, self.allowed, self.hotspot):
+                yield _sse('impression', event, event['seq'])
+
+    def close(self):
+        if not self._released:
+            self._released = True
+            connection_slots.release()
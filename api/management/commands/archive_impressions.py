@@ -0,0 +1,100 @@
+"""
+Management command to archive old PageImpression rows (tiered retention, api/retention.py).
+Usage:
+  python manage.py archive_impressions                       # archive + delete months older than IMPRESSION_RETENTION_MONTHS
+  python manage.py archive_impressions --months 6
+  python manage.py archive_impressions --month 2024-03 [--keep-rows]
+  python manage.py archive_impressions --dry-run
+  python manage.py archive_impressions --list
+
+Run it monthly (e.g. from cron / Task Scheduler) before backup.bat. Rows are
+only deleted after the archive file has been read back and matched against
+the HourlyTraffic rollups (`rebuild_hourly_traffic` if those are stale). With the PostgreSQL profile, emptied months can
+then be detached with `impression_partitions --detach-before`.
+"""
+
+import os
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api import retention
+from api.models import PageImpression
+from api.partitions import month_start
+
+
+class Command(BaseCommand):
+    help = 'Archive PageImpression rows older than the retention window to compressed monthly files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, default=None,
+                            help='Months kept in the database, current one included (default: IMPRESSION_RETENTION_MONTHS)')
+        parser.add_argument('--month', metavar='YYYY-MM', help='Archive only this month')
+        parser.add_argument('--keep-rows', action='store_true', help='Write and verify the archive but do not delete rows')
+        parser.add_argument('--chunk-size', type=int, default=None,
+                            help='Rows deleted per transaction (default: IMPRESSION_ARCHIVE_CHUNK)')
+        parser.add_argument('--pause', type=float, default=0.05,
+                            help='Seconds to sleep between delete chunks so inserts can take the write lock')
+        parser.add_argument('--dry-run', action='store_true', help='Show what would be archived without changing anything')
+        parser.add_argument('--list', action='store_true', help='List archived months and exit')
+
+    def handle(self, *args, **options):
+        if options['list']:
+            self._list()
+            return
+
+        if options['month']:
+            try:
+                months = [datetime.strptime(options['month'], '%Y-%m').date()]
+            except ValueError:
+                raise CommandError('--month must be YYYY-MM')
+            if months[0] >= month_start(timezone.localdate()):
+                raise CommandError('Refusing to archive the current or future months')
+        else:
+            if options['months'] is not None and options['months'] < 1:
+                raise CommandError('--months must be at least 1')
+            months = retention.months_to_archive(options['months'])
+
+        if not months:
+            self.stdout.write(f'Nothing to archive before {retention.retention_cutoff(options["months"]):%Y-%m}')
+            return
+
+        for month in months:
+            if options['dry_run']:
+                start, end = retention.month_bounds(month)
+                rows = PageImpression.objects.filter(viewed_at__gte=start, viewed_at__lt=end).count()
+                self.stdout.write(f'[dry-run] would archive {month:%Y-%m} ({rows} rows)')
+                continue
+            self._archive(month, options)
+
+    def _archive(self, month, options):
+        def on_chunk(deleted, total):
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        try:
+            result = retention.archive_month(
+                month,
+                delete=not options['keep_rows'],
+                chunk_size=options['chunk_size'],
+                on_chunk=on_chunk,
+            )
+        except retention.ArchiveVerificationError as e:
+            raise CommandError(f'Verification failed, no rows deleted: {e}')
+
+        size_kb = os.path.getsize(result['path']) / 1024
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {month:%Y-%m}: {result['archived']} rows archived ({size_kb:.1f} KB), {result['deleted']} deleted"
+        ))
+
+    def _list(self):
+        months = retention.archived_months()
+        if not months:
+            self.stdout.write(f'No archives in {retention.archive_dir()}')
+            return
+        for month in months:
+            info = retention.archive_info(month)
+            size_kb = os.path.getsize(retention.archive_path(month)) / 1024
+            self.stdout.write(f"{month:%Y-%m}  {info['rows']:>10} rows {size_kb:>10.1f} KB  v{info['version']}")
@@ -0,0 +1,425 @@
+"""
+Management command: captive-portal burst load generator and latency benchmark,
+run against a Waitress server started in this process.
+Usage:
+  python manage.py bench_portal_load [--clients 600] [--concurrency 32] [--burst 150] [--burst-interval 2]
+                                     [--hotspots hotspot:3,hotspot_lab:1] [--returning 0.2] [--no-beacon]
+                                     [--threads 8] [--seed 1] [--label v1.4] [--output report.json] [--keep-data]
+
+Each synthetic client does what a MikroTik login page does when it opens:
+GET template-config, login-background and landing-url for its hotspot, POST
+track-impression, then the unload beacon (a second track-impression carrying
+the final time_on_page). Clients arrive in bursts of --burst every
+--burst-interval seconds (devices joining the Wi-Fi together), and are played
+by --concurrency client threads over keep-alive connections. The server is
+Waitress with --threads threads, with the SQLite single writer started as in
+deploy/waitress_serve.py, so the numbers include the real middleware stack.
+
+One JSON report goes to stdout (and --output FILE): throughput, p50/p95/p99
+latency overall and per endpoint, error rates by status, and DB lock waits
+(write statements — BEGIN IMMEDIATE, INSERT, UPDATE, DELETE — that took at
+least --lock-wait-ms, plus "database is locked" errors). Run with the same
+arguments and --seed to compare versions.
+
+The impressions it records are deleted afterwards and the HourlyTraffic
+rollups for the run rebuilt, unless --keep-data.
+"""
+
+import hashlib
+import http.client
+import json
+import platform
+import queue
+import random
+import subprocess
+import threading
+import time
+from statistics import mean
+from urllib.parse import quote
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.db.backends.signals import connection_created
+from django.urls import reverse
+from django.utils import timezone
+from waitress import wasyncore
+from waitress.server import create_server
+
+from api import rollups
+from api.live import _counter_keys
+from api.models import Hotspot, PageImpression
+from backend import sqlite
+
+ENDPOINTS = ('template-config', 'login-background', 'landing-url', 'track-impression', 'beacon')
+WRITE_PREFIXES = ('BEGIN', 'INSERT', 'UPDATE', 'DELETE')
+USER_AGENTS = (
+    ('Mozilla/5.0 (iPhone; CPU iPhone OS 17_5 like Mac OS X) AppleWebKit/605.1.15 Mobile/15E148 Safari/604.1', 45),
+    ('Mozilla/5.0 (Linux; Android 14; SM-A546E) AppleWebKit/537.36 Chrome/126.0 Mobile Safari/537.36', 35),
+    ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/126.0 Safari/537.36', 12),
+    ('Mozilla/5.0 (iPad; CPU OS 17_5 like Mac OS X) AppleWebKit/605.1.15 Mobile/15E148 Safari/604.1', 8),
+)
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def _latency_summary(values):
+    return {
+        'p50_ms': round(_percentile(values, 50), 2),
+        'p95_ms': round(_percentile(values, 95), 2),
+        'p99_ms': round(_percentile(values, 99), 2),
+        'max_ms': round(max(values), 2) if values else 0.0,
+        'mean_ms': round(mean(values), 2) if values else 0.0,
+    }
+
+
+class _LockWaitRecorder:
+    """execute_wrapper for every DB connection the server opens: times write statements"""
+
+    def __init__(self, threshold_ms):
+        self.threshold_ms = threshold_ms
+        self._lock = threading.Lock()
+        self.writes = 0
+        self.waits = 0
+        self.wait_ms = 0.0
+        self.max_ms = 0.0
+        self.locked_errors = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        if not sql.lstrip()[:6].upper().startswith(WRITE_PREFIXES):
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        locked = False
+        try:
+            return execute(sql, params, many, context)
+        except OperationalError as e:
+            locked = 'locked' in str(e)
+            raise
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with self._lock:
+                self.writes += 1
+                self.locked_errors += locked
+                if elapsed_ms >= self.threshold_ms:
+                    self.waits += 1
+                    self.wait_ms += elapsed_ms
+                self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def connection_created(self, sender, connection, **kwargs):
+        # Fires on every reconnect of a thread's DatabaseWrapper, which keeps its wrappers
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+    def as_dict(self):
+        return {
+            'write_statements': self.writes,
+            'lock_waits': self.waits,
+            'lock_wait_ms_total': round(self.wait_ms, 1),
+            'write_ms_max': round(self.max_ms, 1),
+            'locked_errors': self.locked_errors,
+            'threshold_ms': self.threshold_ms,
+        }
+
+
+class _Results:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {name: [] for name in ENDPOINTS}
+        self.errors = {name: {} for name in ENDPOINTS}
+        self.clients = 0
+
+    def add(self, endpoint, latency_ms, error=None):
+        with self._lock:
+            self.latencies[endpoint].append(latency_ms)
+            if error is not None:
+                self.errors[endpoint][error] = self.errors[endpoint].get(error, 0) + 1
+
+
+class Command(BaseCommand):
+    help = 'Simulate captive-portal login bursts against an in-process Waitress server and report latency as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=600, help='Synthetic login-page loads (default: 600)')
+        parser.add_argument('--concurrency', type=int, default=32, help='Concurrent client threads (default: 32)')
+        parser.add_argument('--burst', type=int, default=150, help='Clients arriving together (default: 150)')
+        parser.add_argument('--burst-interval', type=float, default=2.0,
+                            help='Seconds between bursts; 0 = all clients at once (default: 2)')
+        parser.add_argument('--hotspots', default='',
+                            help='Hotspot mix as name[:weight],... (default: all active hotspots, equal weight)')
+        parser.add_argument('--returning', type=float, default=0.2,
+                            help='Share of clients reusing an earlier device MAC (default: 0.2)')
+        parser.add_argument('--no-beacon', action='store_true', help='Skip the unload beacon POST')
+        parser.add_argument('--threads', type=int, default=int(getattr(settings, 'WAITRESS_THREADS', 8)),
+                            help='Waitress threads (default: 8, as deploy/waitress_serve.py)')
+        parser.add_argument('--timeout', type=float, default=30.0, help='Client socket timeout in seconds')
+        parser.add_argument('--lock-wait-ms', type=float, default=50.0,
+                            help='Write statements at least this slow count as lock waits (default: 50)')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed for the client mix (default: 1)')
+        parser.add_argument('--label', default='', help='Free-form label stored in the report (e.g. a version)')
+        parser.add_argument('--output', metavar='FILE', help='Also write the JSON report to FILE')
+        parser.add_argument('--keep-data', action='store_true', help='Keep the impressions the run recorded')
+
+    def handle(self, *args, **options):
+        if options['clients'] < 1 or options['concurrency'] < 1 or options['burst'] < 1:
+            raise CommandError('--clients, --concurrency and --burst must be positive')
+        if not 0 <= options['returning'] < 1:
+            raise CommandError('--returning must be in [0, 1)')
+
+        mix = self._hotspot_mix(options['hotspots'])
+        clients = self._clients(options['clients'], mix, options['returning'], options['seed'])
+        paths = {name: reverse(name) for name in ENDPOINTS if name != 'beacon'}
+
+        recorder = _LockWaitRecorder(options['lock_wait_ms'])
+        results = _Results()
+        started_at = timezone.now()
+        connection.close()
+        connection_created.connect(recorder.connection_created)
+        writer_started = getattr(settings, 'SQLITE_SINGLE_WRITER', False) and sqlite.start_writer() is not None
+        server, server_thread = self._start_server(options['threads'], options['concurrency'])
+        try:
+            port = server.effective_port
+            self.stderr.write(f"Waitress on 127.0.0.1:{port} ({options['threads']} threads); "
+                              f"{len(clients)} clients, {options['concurrency']} concurrent, bursts of {options['burst']}")
+            elapsed = self._run(clients, paths, port, options, results)
+        finally:
+            # Close every channel from inside the server loop; it returns once its map is empty
+            server.trigger.pull_trigger(lambda: wasyncore.close_all(server._map))
+            server_thread.join(timeout=10)
+            server.task_dispatcher.shutdown()
+            if writer_started:
+                sqlite.stop_writer()
+            connection_created.disconnect(recorder.connection_created)
+            connection.close()
+
+        report = self._report(results, recorder, elapsed, options, mix, started_at)
+        if not options['keep_data']:
+            removed = self._cleanup(clients, started_at)
+            self.stderr.write(f'Removed {removed} load-test impressions')
+
+        payload = json.dumps(report, indent=2, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(payload + '\n')
+        self.stdout.write(payload)
+        self.stderr.write(
+            f"{report['throughput_rps']:.1f} req/s, p95 {report['latency']['p95_ms']} ms, "
+            f"p99 {report['latency']['p99_ms']} ms, errors {report['errors']['total']}, "
+            f"lock waits {report['db']['lock_waits']}"
+        )
+
+    # ===============================================
+    # Setup
+    # ===============================================
+
+    def _hotspot_mix(self, spec):
+        mix = []
+        for item in filter(None, (part.strip() for part in spec.split(','))):
+            name, _, weight = item.partition(':')
+            try:
+                mix.append((name, float(weight) if weight else 1.0))
+            except ValueError:
+                raise CommandError(f'Invalid hotspot weight: {item}')
+        if not mix:
+            mix = [(name, 1.0) for name in Hotspot.objects.filter(is_active=True).values_list('hotspot_name', flat=True)]
+        return mix or [('hotspot', 1.0)]
+
+    def _clients(self, count, mix, returning, seed):
+        """(hotspot_name, mac, user_agent, ip, time_on_page) per client, deterministic for a seed"""
+        rng = random.Random(seed)
+        names, weights = zip(*mix)
+        agents, agent_weights = zip(*USER_AGENTS)
+        clients, macs = [], []
+        for i in range(count):
+            if macs and rng.random() < returning:
+                mac = rng.choice(macs)
+            else:
+                mac = '02:' + ':'.join(f'{rng.randrange(256):02X}' for _ in range(5))  # locally administered
+                macs.append(mac)
+            clients.append((
+                rng.choices(names, weights)[0],
+                mac,
+                rng.choices(agents, agent_weights)[0],
+                f'10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}',
+                rng.randint(3, 120),
+            ))
+        return clients
+
+    def _start_server(self, threads, concurrency):
+        from backend.wsgi import application
+
+        # Waitress drops X-Forwarded-For from untrusted peers; trust it from the
+        # client threads so each synthetic device has its own address (and its
+        # own AnonRateThrottle bucket), as distinct phones would
+        server = create_server(
+            application, host='127.0.0.1', port=0, threads=threads,
+            connection_limit=max(100, concurrency * 2), url_scheme='https',
+            trusted_proxy='127.0.0.1', trusted_proxy_headers={'x-forwarded-for'},
+            clear_untrusted_proxy_headers=True,
+        )
+        thread = threading.Thread(target=server.run, name='bench-waitress', daemon=True)
+        thread.start()
+        return server, thread
+
+    # ===============================================
+    # Load
+    # ===============================================
+
+    def _run(self, clients, paths, port, options, results):
+        jobs = queue.Queue()
+        host = next((h.lstrip('.') for h in settings.ALLOWED_HOSTS if h not in ('*', '')), 'localhost')
+
+        def worker():
+            conn = None
+            while True:
+                client = jobs.get()
+                if client is None:
+                    break
+                conn = self._play(conn, client, paths, port, host, options, results)
+            if conn is not None:
+                conn.close()
+
+        threads = [threading.Thread(target=worker, name=f'bench-client-{i}') for i in range(options['concurrency'])]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for offset in range(0, len(clients), options['burst']):
+            if offset and options['burst_interval']:
+                time.sleep(options['burst_interval'])
+            for client in clients[offset:offset + options['burst']]:
+                jobs.put(client)
+        for _ in threads:
+            jobs.put(None)
+        for t in threads:
+            t.join()
+        return time.perf_counter() - start
+
+    def _play(self, conn, client, paths, port, host, options, results):
+        """One login-page load; returns the (keep-alive) connection for the next client of this thread"""
+        hotspot_name, mac, user_agent, ip, time_on_page = client
+        headers = {'Host': host, 'User-Agent': user_agent, 'X-Forwarded-For': ip}
+        query = '?hotspot_name=' + quote(hotspot_name)
+        steps = [
+            ('template-config', 'GET', paths['template-config'] + query, None),
+            ('login-background', 'GET', paths['login-background'] + query, None),
+            ('landing-url', 'GET', paths['landing-url'] + query, None),
+            ('track-impression', 'POST', paths['track-impression'], {
+                'hotspot_name': hotspot_name, 'mac': mac, 'ip': ip, 'user_agent': user_agent, 'time_on_page': 2,
+            }),
+        ]
+        if not options['no_beacon']:
+            steps.append(('beacon', 'POST', paths['track-impression'], {
+                'hotspot_name': hotspot_name, 'mac': mac, 'ip': ip, 'user_agent': user_agent,
+                'time_on_page': time_on_page,
+            }))
+
+        for endpoint, method, path, data in steps:
+            if conn is None:
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=options['timeout'])
+            body = json.dumps(data) if data is not None else None
+            request_headers = dict(headers, **({'Content-Type': 'application/json'} if body else {}))
+            start = time.perf_counter()
+            try:
+                conn.request(method, path, body=body, headers=request_headers)
+                response = conn.getresponse()
+                response.read()
+                error = None if 200 <= response.status < 300 else str(response.status)
+                if response.will_close:
+                    conn.close()
+                    conn = None
+            except (OSError, http.client.HTTPException) as e:
+                error = 'timeout' if isinstance(e, TimeoutError) else 'connection'
+                conn.close()
+                conn = None
+            results.add(endpoint, (time.perf_counter() - start) * 1000, error)
+        return conn
+
+    # ===============================================
+    # Report / cleanup
+    # ===============================================
+
+    def _report(self, results, recorder, elapsed, options, mix, started_at):
+        all_latencies = [value for values in results.latencies.values() for value in values]
+        by_status = {}
+        endpoints = {}
+        for name in ENDPOINTS:
+            latencies = results.latencies[name]
+            if not latencies:
+                continue
+            errors = sum(results.errors[name].values())
+            for status, count in results.errors[name].items():
+                by_status[status] = by_status.get(status, 0) + count
+            endpoints[name] = {
+                'requests': len(latencies),
+                'errors': errors,
+                'error_rate': round(errors / len(latencies), 4),
+                'errors_by_status': results.errors[name],
+                **_latency_summary(latencies),
+            }
+        total_errors = sum(by_status.values())
+        return {
+            'label': options['label'],
+            'version': _git_version(),
+            'started_at': started_at.isoformat(),
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'sqlite_production': getattr(settings, 'SQLITE_PRODUCTION', False),
+                'sqlite_single_writer': getattr(settings, 'SQLITE_SINGLE_WRITER', False),
+                'public_api_fast_path': getattr(settings, 'PUBLIC_API_FAST_PATH', False),
+                'shared_cache': getattr(settings, 'SHARED_CACHE', False),
+            },
+            'config': {
+                'clients': options['clients'],
+                'concurrency': options['concurrency'],
+                'burst': options['burst'],
+                'burst_interval': options['burst_interval'],
+                'waitress_threads': options['threads'],
+                'beacon': not options['no_beacon'],
+                'returning': options['returning'],
+                'seed': options['seed'],
+                'hotspots': dict(mix),
+            },
+            'seconds': round(elapsed, 3),
+            'requests': len(all_latencies),
+            'throughput_rps': round(len(all_latencies) / elapsed, 1) if elapsed else 0.0,
+            'clients_per_second': round(options['clients'] / elapsed, 1) if elapsed else 0.0,
+            'latency': _latency_summary(all_latencies),
+            'endpoints': endpoints,
+            'errors': {
+                'total': total_errors,
+                'rate': round(total_errors / len(all_latencies), 4) if all_latencies else 0.0,
+                'by_status': by_status,
+            },
+            'db': recorder.as_dict(),
+        }
+
+    def _cleanup(self, clients, started_at):
+        mac_hashes = sorted({hashlib.sha256(mac.encode()).hexdigest() for _, mac, _, _, _ in clients})
+        removed = 0
+        for i in range(0, len(mac_hashes), 500):
+            removed += PageImpression.objects.filter(
+                viewed_at__gte=started_at, mac_hash__in=mac_hashes[i:i + 500]
+            ).delete()[0]
+        rollups.rebuild(timezone.localdate(started_at), timezone.localdate())
+        # Today's live dashboard counters are re-seeded from the database on next read
+        day = timezone.localdate().isoformat()
+        cache.delete_many([key for name in {c[0] for c in clients} for key in _counter_keys(day, name)])
+        return removed
+
+
+def _git_version():
+    try:
+        return subprocess.run(
+            ['git', 'describe', '--always', '--dirty'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
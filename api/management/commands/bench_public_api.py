@@ -0,0 +1,119 @@
+"""
+Management command to compare per-request CPU time of the public API fast path
+(api/fastpath.py) against the original DRF views.
+Usage: python manage.py bench_public_api [--hotspot NAME] [--requests 500] [--seed] [--json]
+"""
+
+import json
+import time
+from statistics import median
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+
+from api import views as drf_views
+from api import fastpath
+from api.models import BackgroundImage, SlideContent, TemplateConfig, LandingPageURL
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Benchmark DRF vs fast-path JSON responses for the public MikroTik endpoints'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hotspot', default='hotspot', help='hotspot_name to request (default: hotspot)')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per endpoint and path (default: 500)')
+        parser.add_argument('--seed', action='store_true',
+                            help='Create demo content for the run and roll it back afterwards')
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                if options['seed']:
+                    self._seed(options['hotspot'])
+                results = self._run(options['hotspot'], options['requests'])
+                if options['seed']:
+                    raise _Rollback()
+        except _Rollback:
+            pass
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(f"{'endpoint':<18} {'DRF cpu µs':>11} {'fast cpu µs':>12} {'speedup':>8}  same body")
+        for row in results:
+            self.stdout.write(
+                f"{row['endpoint']:<18} {row['drf_cpu_us']:>11.1f} {row['fast_cpu_us']:>12.1f} "
+                f"{row['speedup']:>7.1f}x  {'yes' if row['identical'] else 'NO'}"
+            )
+
+    def _seed(self, hotspot_name):
+        template = TemplateConfig(template_name='Bench', left_panel_component='slideshow',
+                                  hotspot_name=hotspot_name, is_active=True)
+        template.save()
+        SlideContent.objects.bulk_create([
+            SlideContent(title=f'Slide {i}', description='Benchmark slide ' * 5,
+                         hotspot_name=hotspot_name, order=i, is_active=True)
+            for i in range(8)
+        ])
+        # bulk_create skips BackgroundImage.save() (which opens the image with Pillow)
+        BackgroundImage.objects.bulk_create([
+            BackgroundImage(title='Bench', image='backgrounds/bench.jpg', hotspot_name=hotspot_name, is_active=True)
+        ])
+        LandingPageURL.objects.create(title='Bench', url='https://example.com/', hotspot_name=hotspot_name, is_active=True)
+
+    def _run(self, hotspot_name, n):
+        factory = RequestFactory()
+        endpoints = [
+            ('login-background', '/api/login-background/', drf_views.get_background_image, fastpath.fast_get_background_image),
+            ('slide-content', '/api/slide-content/', drf_views.get_slide_content, fastpath.fast_get_slide_content),
+            ('template-config', '/api/template-config/', drf_views.get_template_config, fastpath.fast_get_template_config),
+            ('landing-url', '/api/landing-url/', drf_views.get_landing_url, fastpath.fast_get_landing_url),
+        ]
+
+        results = []
+        for name, url, drf_view, fast_view in endpoints:
+            def make_request(i):
+                # Distinct client IPs so DRF's AnonRateThrottle measures real work, not 429s
+                return factory.get(url, {'hotspot_name': hotspot_name},
+                                   REMOTE_ADDR=f'10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}')
+
+            drf_body = self._render(drf_view(make_request(0)))
+            fast_body = self._render(fast_view(make_request(0)))
+            drf_cpu, drf_wall = self._measure(drf_view, make_request, n)
+            fast_cpu, fast_wall = self._measure(fast_view, make_request, n)
+
+            results.append({
+                'endpoint': name,
+                'requests': n,
+                'drf_cpu_us': drf_cpu,
+                'fast_cpu_us': fast_cpu,
+                'drf_wall_median_us': drf_wall,
+                'fast_wall_median_us': fast_wall,
+                'speedup': drf_cpu / fast_cpu if fast_cpu else 0.0,
+                'identical': drf_body == fast_body,
+            })
+        return results
+
+    @staticmethod
+    def _render(response):
+        if hasattr(response, 'render'):
+            response.render()
+        return response.content
+
+    def _measure(self, view, make_request, n):
+        requests = [make_request(i + 1) for i in range(n)]
+        wall = []
+        cpu_start = time.process_time_ns()
+        for request in requests:
+            t0 = time.perf_counter_ns()
+            self._render(view(request))
+            wall.append(time.perf_counter_ns() - t0)
+        cpu_total = time.process_time_ns() - cpu_start
+        return cpu_total / n / 1000, median(wall) / 1000
@@ -0,0 +1,159 @@
+"""
+Management command to benchmark concurrent track_impression throughput on SQLite,
+with stock settings (rollback journal, no pragmas, inline writes) and with
+SQLite production mode (WAL + pragmas + single writer, see backend/sqlite.py).
+Usage: python manage.py bench_track_impression [--threads 16] [--requests 2000] [--mode both] [--json]
+
+Benchmark rows use hotspot_name '__bench__' and are deleted afterwards.
+"""
+
+import json
+import logging
+import threading
+import time
+from statistics import median
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory, override_settings
+
+from api.models import HourlyTraffic, PageImpression
+from api.views import track_impression
+from backend import sqlite
+
+BENCH_HOTSPOT = '__bench__'
+
+
+class _LockedErrorCounter(logging.Handler):
+    """track_impression turns DB errors into a 500; count the 'database is locked' ones from its log"""
+
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.count = 0
+
+    def emit(self, record):
+        if 'locked' in record.getMessage():
+            self.count += 1
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark concurrent track_impression throughput (stock SQLite vs production mode)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16, help='Concurrent request threads (default: 16)')
+        parser.add_argument('--requests', type=int, default=2000, help='Total requests per mode (default: 2000)')
+        parser.add_argument('--mode', choices=['baseline', 'production', 'both'], default='both')
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('This benchmark targets the SQLite backend')
+
+        modes = ['baseline', 'production'] if options['mode'] == 'both' else [options['mode']]
+        results = []
+        try:
+            for mode in modes:
+                results.append(self._run_mode(mode, options['threads'], options['requests']))
+        finally:
+            deleted, _ = PageImpression.objects.filter(hotspot_name=BENCH_HOTSPOT).delete()
+            HourlyTraffic.objects.filter(hotspot_name=BENCH_HOTSPOT).delete()
+            self.stderr.write(f'Removed {deleted} benchmark rows')
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(f"{'mode':<11} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7} {'locked':>7}")
+        for row in results:
+            self.stdout.write(
+                f"{row['mode']:<11} {row['throughput']:>8.1f} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} "
+                f"{row['p99_ms']:>8.1f} {row['errors']:>7} {row['locked']:>7}"
+            )
+
+    def _run_mode(self, mode, n_threads, n_requests):
+        production = mode == 'production'
+        with override_settings(SQLITE_PRODUCTION=production):
+            connection.close()
+            with connection.cursor() as cursor:
+                # journal_mode is persistent in the database file, so reset it explicitly
+                cursor.execute(f"PRAGMA journal_mode = {'WAL' if production else 'DELETE'}")
+            if production:
+                sqlite.start_writer()
+            try:
+                latencies, errors, locked, elapsed = self._hammer(n_threads, n_requests)
+            finally:
+                sqlite.stop_writer()
+                connection.close()
+
+        return {
+            'mode': mode,
+            'threads': n_threads,
+            'requests': n_requests,
+            'seconds': round(elapsed, 3),
+            'throughput': n_requests / elapsed if elapsed else 0.0,
+            'p50_ms': median(latencies) if latencies else 0.0,
+            'p95_ms': _percentile(latencies, 95),
+            'p99_ms': _percentile(latencies, 99),
+            'errors': errors,
+            'locked': locked,
+        }
+
+    def _hammer(self, n_threads, n_requests):
+        factory = RequestFactory()
+        latencies = []
+        counters = {'errors': 0}
+        lock = threading.Lock()
+        next_index = iter(range(n_requests))
+
+        def worker():
+            local_latencies = []
+            local_errors = 0
+            try:
+                while True:
+                    with lock:
+                        i = next(next_index, None)
+                    if i is None:
+                        break
+                    request = factory.post(
+                        '/api/track-impression/',
+                        data=json.dumps({
+                            'hotspot_name': BENCH_HOTSPOT,
+                            'mac': f'02:00:00:{(i >> 16) & 255:02X}:{(i >> 8) & 255:02X}:{i & 255:02X}',
+                            'user_agent': 'Mozilla/5.0 (iPhone)' if i % 3 else 'Mozilla/5.0 (Windows NT 10.0)',
+                        }),
+                        content_type='application/json',
+                        REMOTE_ADDR=f'10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}',  # avoid throttling
+                    )
+                    t0 = time.perf_counter()
+                    response = track_impression(request)
+                    local_latencies.append((time.perf_counter() - t0) * 1000)
+                    if response.status_code != 201:
+                        local_errors += 1
+            finally:
+                connection.close()
+                with lock:
+                    latencies.extend(local_latencies)
+                    counters['errors'] += local_errors
+
+        locked = _LockedErrorCounter()
+        views_logger = logging.getLogger('api.views')
+        views_logger.addHandler(locked)
+        threads = [threading.Thread(target=worker) for _ in range(n_threads)]
+        start = time.perf_counter()
+        try:
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        finally:
+            elapsed = time.perf_counter() - start
+            views_logger.removeHandler(locked)
+
+        return latencies, counters['errors'], locked.count, elapsed
@@ -0,0 +1,57 @@
+"""
+Management command to copy one hotspot's active content to other hotspots
+Usage: python manage.py clone_hotspot_content SOURCE [TARGET ...] [--all-empty] [--replace] [--origin https://portal.example.ac.th]
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from api.content_clone import CLONE_MODELS, clone_content
+from api.models import Hotspot
+
+
+class Command(BaseCommand):
+    help = "Copy a hotspot's active template, background, landing URL, slides and cards to other hotspots"
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help='Hotspot to copy from')
+        parser.add_argument('targets', nargs='*', help='Hotspots to copy to')
+        parser.add_argument(
+            '--all-empty',
+            action='store_true',
+            help='Also copy to every active hotspot that has no active content yet',
+        )
+        parser.add_argument(
+            '--replace',
+            action='store_true',
+            help='Deactivate content the targets already have instead of refusing them',
+        )
+        parser.add_argument(
+            '--origin',
+            help='scheme://host MikroTik login pages fetch the API from; warms the public cache for each target',
+        )
+
+    def handle(self, *args, **options):
+        source = options['source']
+        if not Hotspot.objects.filter(hotspot_name=source).exists():
+            raise CommandError(f'Hotspot not found: {source}')
+
+        targets = list(options['targets'])
+        if options['all_empty']:
+            busy = set()
+            for model, _ in CLONE_MODELS:
+                busy.update(model.objects.filter(is_active=True, hotspot_name__isnull=False).values_list('hotspot_name', flat=True))
+            targets += Hotspot.objects.filter(is_active=True).exclude(hotspot_name__in=busy).values_list('hotspot_name', flat=True)
+        if not targets:
+            raise CommandError('Give at least one target hotspot (or --all-empty)')
+
+        try:
+            created, targets = clone_content(
+                source, targets, replace=options['replace'], origin=options['origin'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        for name in targets:
+            self.stdout.write(self.style.SUCCESS(f'  ✓ {name}'))
+        self.stdout.write('\n' + '  '.join(f'{model}: {count}' for model, count in created.items()))
+        if not options['origin']:
+            self.stdout.write('Public cache not warmed (no --origin); it fills on the first request')
@@ -0,0 +1,287 @@
+"""
+Management command to fill the database with synthetic PageImpression rows for scale testing.
+Usage:
+  python manage.py generate_impressions                                  # one semester (120 days) up to yesterday
+  python manage.py generate_impressions --days 120 --per-day 20000 --devices 40000 --rollups
+  python manage.py generate_impressions --hotspots hotspot:5,hotspot_lab:2,hotspot_wifi:1 --seed 7 --replace
+
+Traffic is modelled, not uniform:
+  - hotspot popularity: --hotspots weights, or Zipf-like weights over the
+    active hotspots (the first is the busiest)
+  - diurnal and weekly cycles: an opening-hours profile per hour, quieter
+    weekends, plus a little day-to-day noise
+  - repeat visits: a fixed device population with heavy-tailed (Pareto)
+    activity, each device with a home hotspot and --roaming visits elsewhere
+  - device-type mix and user agents per device (mobile / desktop / tablet)
+  - time_on_page: log-normal around 20 s, longer on desktops; a share of
+    impressions never sends the unload beacon (time_on_page is null)
+
+The same --seed and arguments always produce the same rows (MAC hashes are
+derived from the seed, never from real devices), so benchmark databases are
+reproducible. Rows are written with bulk_create, one transaction per day and
+--batch-size rows per INSERT (Django caps SQLite statements at 999 parameters,
+i.e. ~99 rows, so there the per-day transaction is what keeps it fast).
+--rollups then rebuilds HourlyTraffic for the range (api/rollups.py) and
+writes DailyReachStats for the generated days.
+"""
+
+import math
+import random
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from hashlib import sha256
+from itertools import accumulate
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from api import rollups
+from api.live import _counter_keys
+from api.models import DailyReachStats, Hotspot, PageImpression
+from api.retention import DEVICE_COUNT_FIELDS
+
+# Share of the day's traffic per local hour (library opening hours, lunch and afternoon peaks)
+HOURLY_PROFILE = (
+    0.2, 0.1, 0.1, 0.1, 0.1, 0.2, 0.5, 1.5, 4.0, 7.0, 8.5, 8.0,
+    7.0, 8.0, 8.5, 8.0, 7.0, 5.5, 4.0, 3.0, 2.0, 1.2, 0.7, 0.4,
+)
+WEEKDAY_FACTOR = (1.0, 1.0, 1.0, 1.0, 0.9, 0.55, 0.35)  # Monday first
+DEVICE_MIX = (
+    ('mobile', 0.72, (
+        'Mozilla/5.0 (iPhone; CPU iPhone OS 17_5 like Mac OS X) AppleWebKit/605.1.15 Mobile/15E148 Safari/604.1',
+        'Mozilla/5.0 (Linux; Android 14; SM-A546E) AppleWebKit/537.36 Chrome/126.0 Mobile Safari/537.36',
+        'Mozilla/5.0 (Linux; Android 13; Redmi Note 12) AppleWebKit/537.36 Chrome/125.0 Mobile Safari/537.36',
+    )),
+    ('desktop', 0.19, (
+        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/126.0 Safari/537.36',
+        'Mozilla/5.0 (Macintosh; Intel Mac OS X 14_5) AppleWebKit/605.1.15 Version/17.5 Safari/605.1.15',
+    )),
+    ('tablet', 0.09, (
+        'Mozilla/5.0 (iPad; CPU OS 17_5 like Mac OS X) AppleWebKit/605.1.15 Mobile/15E148 Safari/604.1',
+    )),
+)
+ACTIVITY_ALPHA = 1.3      # Pareto shape of per-device visit frequency (lower = heavier repeat visitors)
+DAILY_NOISE = 0.15        # sigma of the log-normal day-to-day factor
+TIME_ON_PAGE_MEDIAN = 20  # seconds
+TIME_ON_PAGE_SIGMA = 0.9
+TIME_ON_PAGE_MAX = 900
+NO_BEACON_SHARE = 0.15    # impressions without a final time_on_page
+
+
+class Command(BaseCommand):
+    help = 'Generate deterministic synthetic PageImpression rows (realistic traffic shape) for scale testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=120, help='Days of traffic to generate (default: 120)')
+        parser.add_argument('--end', metavar='YYYY-MM-DD', help='Last local date (default: yesterday)')
+        parser.add_argument('--per-day', type=int, default=20000,
+                            help='Mean impressions on a weekday, all hotspots together (default: 20000)')
+        parser.add_argument('--hotspots', default='',
+                            help='Hotspot popularity as name[:weight],... (default: active hotspots, Zipf weights)')
+        parser.add_argument('--devices', type=int, default=40000, help='Device population (default: 40000)')
+        parser.add_argument('--roaming', type=float, default=0.1,
+                            help='Share of impressions from devices away from their home hotspot (default: 0.1)')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed (default: 1)')
+        parser.add_argument('--batch-size', type=int, default=10000, help='Rows per bulk_create statement (default: 10000)')
+        parser.add_argument('--replace', action='store_true',
+                            help='Delete existing impressions of these hotspots in the date range first')
+        parser.add_argument('--rollups', action='store_true',
+                            help='Rebuild HourlyTraffic and write DailyReachStats for the range afterwards')
+
+    def handle(self, *args, **options):
+        if options['days'] < 1 or options['per_day'] < 1 or options['devices'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--days, --per-day, --devices and --batch-size must be positive')
+        if not 0 <= options['roaming'] < 1:
+            raise CommandError('--roaming must be in [0, 1)')
+        try:
+            end_date = (datetime.strptime(options['end'], '%Y-%m-%d').date() if options['end']
+                        else timezone.localdate() - timedelta(days=1))
+        except ValueError:
+            raise CommandError('--end must be YYYY-MM-DD')
+        start_date = end_date - timedelta(days=options['days'] - 1)
+
+        rng = random.Random(options['seed'])
+        hotspots = self._hotspot_mix(options['hotspots'])
+        names = [name for name, _ in hotspots]
+        devices, pools = self._devices(rng, options['devices'], hotspots, options['seed'])
+
+        if options['replace']:
+            removed = self._delete_range(names, start_date, end_date)
+            self.stdout.write(f'Removed {removed} existing impressions')
+
+        self.stdout.write(
+            f'Generating {start_date} - {end_date} for {len(names)} hotspots, '
+            f'~{options["per_day"]}/weekday, {len(devices)} devices (seed {options["seed"]})'
+        )
+        total_share = sum(weight for _, weight in hotspots)
+        daily_stats = {} if options['rollups'] else None
+        total = 0
+        started = time.monotonic()
+        day = start_date
+        while day <= end_date:
+            day_mean = options['per_day'] * WEEKDAY_FACTOR[day.weekday()] * rng.lognormvariate(0, DAILY_NOISE)
+            rows = []
+            for name, weight in hotspots:
+                count = _poisson(rng, day_mean * weight / total_share)
+                hotspot_rows = self._day_rows(rng, name, day, count, devices, pools, options['roaming'])
+                if daily_stats is not None and hotspot_rows:
+                    daily_stats[(name, day)] = _daily_stats(hotspot_rows)
+                rows.extend(hotspot_rows)
+            with transaction.atomic():
+                PageImpression.objects.bulk_create(rows, batch_size=options['batch_size'])
+            total += len(rows)
+            if day.day == 1 or day == end_date:
+                elapsed = time.monotonic() - started
+                self.stdout.write(f'  {day}: {total} rows ({total / elapsed:.0f} rows/s)')
+            day += timedelta(days=1)
+
+        if options['rollups']:
+            self._write_rollups(start_date, end_date, names, daily_stats)
+
+        # Today's live dashboard counters are re-seeded from the database on next read
+        today = timezone.localdate()
+        if start_date <= today <= end_date:
+            cache.delete_many([key for name in names for key in _counter_keys(today.isoformat(), name)])
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Generated {total} impressions in {elapsed:.1f}s ({total / elapsed if elapsed else 0:.0f} rows/s)'
+        ))
+
+    # ===============================================
+    # Model
+    # ===============================================
+
+    def _hotspot_mix(self, spec):
+        mix = []
+        for item in filter(None, (part.strip() for part in spec.split(','))):
+            name, _, weight = item.partition(':')
+            try:
+                mix.append((name, float(weight) if weight else 1.0))
+            except ValueError:
+                raise CommandError(f'Invalid hotspot weight: {item}')
+        if not mix:
+            names = list(Hotspot.objects.filter(is_active=True).order_by('id').values_list('hotspot_name', flat=True))
+            mix = [(name, 1 / (rank + 1) ** 1.1) for rank, name in enumerate(names or ['hotspot'])]
+        if any(weight <= 0 for _, weight in mix):
+            raise CommandError('Hotspot weights must be positive')
+        return mix
+
+    def _devices(self, rng, count, hotspots, seed):
+        """
+        devices: [(mac_hash, device_type, user_agent, ip_address, time_factor)]
+        pools: {hotspot_name | None: (device indexes, cumulative activity weights)};
+        None is the whole population, for roaming visits
+        """
+        names = [name for name, _ in hotspots]
+        weights = [weight for _, weight in hotspots]
+        types = [(device_type, share, agents) for device_type, share, agents in DEVICE_MIX]
+        devices, homes, activity = [], {name: [] for name in names}, []
+        for index in range(count):
+            device_type, _, agents = rng.choices(types, weights=[share for _, share, _ in types])[0]
+            devices.append((
+                sha256(f'synthetic:{seed}:{index}'.encode()).hexdigest(),
+                device_type,
+                rng.choice(agents),
+                f'10.{64 + (index >> 16) % 64}.{(index >> 8) & 255}.{index & 255}',
+                1.4 if device_type == 'desktop' else 1.0,
+            ))
+            activity.append(rng.paretovariate(ACTIVITY_ALPHA))
+            homes[rng.choices(names, weights=weights)[0]].append(index)
+
+        pools = {None: (list(range(count)), list(accumulate(activity)))}
+        for name, members in homes.items():
+            members = members or pools[None][0]
+            pools[name] = (members, list(accumulate(activity[i] for i in members)))
+        return devices, pools
+
+    def _day_rows(self, rng, hotspot_name, day, count, devices, pools, roaming):
+        """One hotspot's impressions for one local day, in time order, with is_unique_today set"""
+        if not count:
+            return []
+        home, everyone = pools[hotspot_name], pools[None]
+        seen = set()
+        rows = []
+        for hour, in_hour in sorted(Counter(rng.choices(range(24), weights=HOURLY_PROFILE, k=count)).items()):
+            hour_start = timezone.make_aware(datetime.combine(day, datetime.min.time()) + timedelta(hours=hour))
+            roam = sum(1 for _ in range(in_hour) if rng.random() < roaming)
+            picks = rng.choices(home[0], cum_weights=home[1], k=in_hour - roam)
+            picks += rng.choices(everyone[0], cum_weights=everyone[1], k=roam)
+            for offset, index in sorted(zip((rng.random() * 3600 for _ in picks), picks)):
+                mac_hash, device_type, user_agent, ip_address, time_factor = devices[index]
+                time_on_page = None
+                if rng.random() >= NO_BEACON_SHARE:
+                    seconds = rng.lognormvariate(math.log(TIME_ON_PAGE_MEDIAN * time_factor), TIME_ON_PAGE_SIGMA)
+                    time_on_page = max(1, min(TIME_ON_PAGE_MAX, round(seconds)))
+                # local_date / local_hour are known here; same values set_local_time() would compute
+                rows.append(PageImpression(
+                    hotspot_name=hotspot_name,
+                    viewed_at=hour_start + timedelta(seconds=offset),
+                    local_date=day,
+                    local_hour=hour,
+                    mac_hash=mac_hash,
+                    ip_address=ip_address,
+                    device_type=device_type,
+                    user_agent=user_agent,
+                    time_on_page=time_on_page,
+                    is_unique_today=mac_hash not in seen,
+                ))
+                seen.add(mac_hash)
+        return rows
+
+    # ===============================================
+    # Storage
+    # ===============================================
+
+    def _delete_range(self, names, start_date, end_date, chunk_size=2000):
+        ids = list(PageImpression.objects.filter(
+            hotspot_name__in=names, local_date__gte=start_date, local_date__lte=end_date,
+        ).values_list('id', flat=True))
+        removed = 0
+        for i in range(0, len(ids), chunk_size):
+            removed += PageImpression.objects.filter(id__in=ids[i:i + chunk_size]).delete()[0]
+        return removed
+
+    def _write_rollups(self, start_date, end_date, names, daily_stats):
+        written = sum(rollups.rebuild(first, last) for first, last in rollups.month_ranges(start_date, end_date))
+        with transaction.atomic():
+            DailyReachStats.objects.filter(hotspot_name__in=names, date__gte=start_date, date__lte=end_date).delete()
+            DailyReachStats.objects.bulk_create([
+                DailyReachStats(hotspot_name=name, date=day, **values)
+                for (name, day), values in daily_stats.items()
+            ], batch_size=500)
+        self.stdout.write(f'Rollups: {written} hourly rows, {len(daily_stats)} daily rows')
+
+
+def _poisson(rng, mean):
+    """Poisson sample; normal approximation for large means"""
+    if mean <= 0:
+        return 0
+    if mean > 500:
+        return max(0, round(rng.gauss(mean, math.sqrt(mean))))
+    limit, k, product = math.exp(-mean), 0, rng.random()
+    while product > limit:
+        k += 1
+        product *= rng.random()
+    return k
+
+
+def _daily_stats(rows):
+    """DailyReachStats values for one hotspot-day (as retention.DailyRollups computes them)"""
+    types = Counter(DEVICE_COUNT_FIELDS.get(row.device_type, 'unknown_count') for row in rows)
+    times = [row.time_on_page for row in rows if row.time_on_page is not None]
+    hours = Counter(str(row.local_hour) for row in rows)
+    return {
+        'total_impressions': len(rows),
+        'unique_devices': len({row.mac_hash for row in rows}),
+        'mobile_count': types['mobile_count'],
+        'desktop_count': types['desktop_count'],
+        'tablet_count': types['tablet_count'],
+        'unknown_count': types['unknown_count'],
+        'avg_time_on_page': round(sum(times) / len(times), 1) if times else 0.0,
+        'total_time_on_page': sum(times),
+        'hourly_data': dict(sorted(hours.items(), key=lambda item: int(item[0]))),
+    }
@@ -0,0 +1,108 @@
+"""
+Management command to maintain monthly PageImpression partitions (PostgreSQL profile).
+Usage:
+  python manage.py impression_partitions                   # create partitions through IMPRESSION_PARTITIONS_AHEAD months
+  python manage.py impression_partitions --ahead 6
+  python manage.py impression_partitions --list
+  python manage.py impression_partitions --check-ids
+  python manage.py impression_partitions --detach-before 2025-01 [--drop] [--concurrently] [--dry-run]
+
+Run it monthly (e.g. from cron / Task Scheduler). Detached partitions keep their
+data as standalone tables (api_pageimpression_yYYYYmMM) until dropped.
+--concurrently needs the DEFAULT partition dropped first (see api/partitions.py).
+"""
+
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from api import partitions
+
+
+class Command(BaseCommand):
+    help = 'Create upcoming and detach old monthly PageImpression partitions (PostgreSQL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ahead', type=int, default=None,
+                            help='Months ahead of the current one to create (default: IMPRESSION_PARTITIONS_AHEAD)')
+        parser.add_argument('--list', action='store_true', help='List partitions and exit')
+        parser.add_argument('--check-ids', action='store_true',
+                            help='List ids stored in more than one partition and exit (should be none)')
+        parser.add_argument('--detach-before', metavar='YYYY-MM',
+                            help='Detach partitions for months before this one')
+        parser.add_argument('--drop', action='store_true', help='Drop partitions after detaching them')
+        parser.add_argument('--concurrently', action='store_true',
+                            help='DETACH ... CONCURRENTLY (does not block inserts; requires no DEFAULT partition)')
+        parser.add_argument('--dry-run', action='store_true', help='Show what would be detached without changing anything')
+
+    def handle(self, *args, **options):
+        if not partitions.is_supported(connection):
+            raise CommandError('Partitioning requires the PostgreSQL profile (DB_ENGINE=postgresql)')
+        if not partitions.is_partitioned(connection):
+            raise CommandError(f'{partitions.TABLE} is not partitioned — run migrate first')
+
+        if options['list']:
+            self._list()
+            return
+        if options['check_ids']:
+            self._check_ids()
+            return
+
+        ahead = options['ahead'] if options['ahead'] is not None else getattr(settings, 'IMPRESSION_PARTITIONS_AHEAD', 3)
+        current = partitions.month_start(timezone.localdate())
+        created = partitions.ensure_partitions(connection, current, partitions.add_months(current, ahead))
+        for name in created:
+            self.stdout.write(self.style.SUCCESS(f'✓ Created {name}'))
+        if not created:
+            self.stdout.write(f'Partitions up to {partitions.add_months(current, ahead):%Y-%m} already exist')
+
+        if options['detach_before']:
+            self._detach(options)
+
+    def _list(self):
+        for part in partitions.list_partitions(connection):
+            self.stdout.write(
+                f"{part['name']:<36} ~{part['rows']:>10} rows {part['bytes'] / 1024 / 1024:>9.1f} MB  {part['bound']}"
+            )
+
+    def _check_ids(self):
+        duplicates = partitions.duplicate_ids(connection)
+        if not duplicates:
+            self.stdout.write(self.style.SUCCESS(f'✓ No duplicate ids in {partitions.TABLE}'))
+            return
+        for pk, rows in duplicates:
+            self.stdout.write(self.style.ERROR(f'✗ id {pk}: {rows} rows'))
+        raise CommandError('Duplicate ids found: they were inserted explicitly, not from the id sequence')
+
+    def _detach(self, options):
+        try:
+            cutoff = datetime.strptime(options['detach_before'], '%Y-%m').date()
+        except ValueError:
+            raise CommandError('--detach-before must be YYYY-MM')
+        if cutoff > partitions.month_start(timezone.localdate()):
+            raise CommandError('Refusing to detach the current or future months')
+        if options['concurrently'] and partitions.has_default_partition(connection):
+            raise CommandError(
+                f'PostgreSQL refuses DETACH CONCURRENTLY while {partitions.DEFAULT_PARTITION} exists: '
+                'detach without --concurrently, or drop the (empty) DEFAULT partition first'
+            )
+
+        old = [p for p in partitions.list_partitions(connection) if p['month'] and p['month'] < cutoff]
+        if not old:
+            self.stdout.write(f'No partitions before {cutoff:%Y-%m}')
+            return
+
+        for part in old:
+            action = 'detach + drop' if options['drop'] else 'detach'
+            if options['dry_run']:
+                self.stdout.write(f"[dry-run] would {action} {part['name']} (~{part['rows']} rows)")
+                continue
+            partitions.detach_partition(connection, part['name'], concurrently=options['concurrently'])
+            if options['drop']:
+                partitions.drop_table(connection, part['name'])
+                self.stdout.write(self.style.WARNING(f"✗ Dropped {part['name']}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"✓ Detached {part['name']} (kept as a standalone table)"))
@@ -0,0 +1,54 @@
+"""
+Management command to recompute the HourlyTraffic rollups (api/rollups.py).
+Usage:
+  python manage.py rebuild_hourly_traffic                          # everything, database + archives
+  python manage.py rebuild_hourly_traffic --days 30
+  python manage.py rebuild_hourly_traffic --start 2025-01-01 --end 2025-03-31
+
+Rollups are kept current at ingest; run this after restoring a backup, after
+importing or generating impressions outside track_impression, or once after
+migration 0017 to fold in months already moved out by archive_impressions.
+Each month is rebuilt in its own transaction.
+"""
+
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api import rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute HourlyTraffic rollups from PageImpression rows and the impression archives'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', metavar='YYYY-MM-DD', help='First local date to rebuild')
+        parser.add_argument('--end', metavar='YYYY-MM-DD', help='Last local date to rebuild (default: today)')
+        parser.add_argument('--days', type=int, default=None, help='Rebuild the last N days, today included')
+
+    def handle(self, *args, **options):
+        try:
+            end_date = datetime.strptime(options['end'], '%Y-%m-%d').date() if options['end'] else timezone.localdate()
+            start_date = datetime.strptime(options['start'], '%Y-%m-%d').date() if options['start'] else None
+        except ValueError:
+            raise CommandError('--start/--end must be YYYY-MM-DD')
+
+        if options['days'] is not None:
+            if options['days'] < 1:
+                raise CommandError('--days must be at least 1')
+            start_date = end_date - timedelta(days=options['days'] - 1)
+        if start_date is None:
+            start_date = rollups.first_date()
+            if start_date is None:
+                self.stdout.write('No impressions to roll up')
+                return
+        if start_date > end_date:
+            raise CommandError('--start must not be after --end')
+
+        total = 0
+        for first, last in rollups.month_ranges(start_date, end_date):
+            written = rollups.rebuild(first, last)
+            total += written
+            self.stdout.write(f'{first:%Y-%m}: {written} hourly rows')
+        self.stdout.write(self.style.SUCCESS(f'✓ Rebuilt {start_date} - {end_date}: {total} hourly rows'))
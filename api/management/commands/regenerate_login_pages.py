@@ -0,0 +1,63 @@
+"""
+Management command to regenerate login.html for all hotspots from hotspot/login_master.html
+Usage: python manage.py regenerate_login_pages [--hotspot NAME ...] [--include-inactive] [--force]
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from api.models import Hotspot
+from api.hotspot_files import master_template_path, regenerate_login_pages
+import os
+
+
+class Command(BaseCommand):
+    help = 'Regenerate login.html for all hotspots (concurrent, atomic, skips unchanged files)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hotspot',
+            action='append',
+            dest='hotspots',
+            help='Only regenerate this hotspot (can be given multiple times)',
+        )
+        parser.add_argument(
+            '--include-inactive',
+            action='store_true',
+            help='Also regenerate hotspots marked inactive',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Rewrite files even if their content is unchanged',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Number of concurrent writers (default: 4)',
+        )
+
+    def handle(self, *args, **options):
+        if not os.path.isfile(master_template_path()):
+            raise CommandError(f'login_master.html not found: {master_template_path()}')
+
+        hotspots = Hotspot.objects.all()
+        if not options['include_inactive']:
+            hotspots = hotspots.filter(is_active=True)
+        if options['hotspots']:
+            hotspots = hotspots.filter(hotspot_name__in=options['hotspots'])
+
+        results = regenerate_login_pages(hotspots, force=options['force'], max_workers=options['workers'])
+
+        for result in results:
+            if result['error']:
+                self.stdout.write(self.style.ERROR(f"  ✗ {result['hotspot_name']}: {result['error']}"))
+            elif result['written']:
+                self.stdout.write(self.style.SUCCESS(f"  ✓ {result['hotspot_name']}: written"))
+            else:
+                self.stdout.write(f"  - {result['hotspot_name']}: unchanged")
+
+        written = sum(1 for r in results if r['written'])
+        failed = sum(1 for r in results if r['error'])
+        self.stdout.write(f'\nWritten: {written}  Unchanged: {len(results) - written - failed}  Failed: {failed}')
+        if failed:
+            raise CommandError(f'{failed} hotspot(s) failed')
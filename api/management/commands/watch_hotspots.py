@@ -0,0 +1,34 @@
+"""
+Management command to run the hotspot folder watcher in the foreground
+Usage: python manage.py watch_hotspots [--poll] [--interval 5]
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from api.watcher import HotspotWatcher
+
+
+class Command(BaseCommand):
+    help = 'Watch hotspot* folders and keep Hotspot file status fields up to date'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--poll',
+            action='store_true',
+            help='Force polling mode instead of inotify',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=settings.HOTSPOT_WATCHER_POLL_INTERVAL,
+            help='Polling interval in seconds (polling mode only)',
+        )
+
+    def handle(self, *args, **options):
+        watcher = HotspotWatcher(poll_interval=options['interval'], force_polling=options['poll'])
+        self.stdout.write(self.style.SUCCESS('Hotspot watcher started (Ctrl+C to stop)'))
+        try:
+            watcher.run()
+        except KeyboardInterrupt:
+            watcher.stop()
+            self.stdout.write('\nHotspot watcher stopped')
@@ -0,0 +1,102 @@
+"""
+PostgreSQL only: convert api_pageimpression into a table range-partitioned by
+month on viewed_at (see api/partitions.py). No-op on SQLite.
+
+The primary key becomes (id, viewed_at) in the database, because PostgreSQL
+requires the partition key in every unique constraint; Django keeps using id.
+id stays unique because the api_pageimpression_id_seq sequence (continued
+from the old max(id)) is the only source of ids — see api/partitions.py.
+"""
+
+from django.conf import settings
+from django.db import migrations
+from django.utils import timezone
+
+TABLE = 'api_pageimpression'
+LEGACY = 'api_pageimpression_unpartitioned'
+SEQUENCE = 'api_pageimpression_id_seq'
+
+
+def _index_definitions(cursor, table):
+    cursor.execute(
+        "SELECT indexname, indexdef FROM pg_indexes "
+        "WHERE schemaname = current_schema() AND tablename = %s AND indexname NOT LIKE %s",
+        [table, '%\\_pkey'],
+    )
+    return [indexdef for _, indexdef in cursor.fetchall()]
+
+
+def partition_table(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+
+    from api import partitions
+
+    if partitions.is_partitioned(connection):
+        return
+
+    with connection.cursor() as cursor:
+        index_defs = _index_definitions(cursor, TABLE)  # they reference TABLE by name
+        cursor.execute(f'ALTER TABLE "{TABLE}" RENAME TO "{LEGACY}"')
+        cursor.execute(
+            f'CREATE TABLE "{TABLE}" (LIKE "{LEGACY}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+            f'PARTITION BY RANGE (viewed_at)'
+        )
+        # The identity sequence belongs to the old table; continue ids from a new sequence
+        cursor.execute(f'CREATE SEQUENCE "{SEQUENCE}_p" OWNED BY "{TABLE}".id')
+        cursor.execute(f'ALTER TABLE "{TABLE}" ALTER COLUMN id SET DEFAULT nextval(\'"{SEQUENCE}_p"\')')
+        cursor.execute(f'ALTER TABLE "{TABLE}" ADD PRIMARY KEY (id, viewed_at)')
+
+        cursor.execute(f'SELECT min(viewed_at), max(id) FROM "{LEGACY}"')
+        oldest, max_id = cursor.fetchone()
+
+    first_month = partitions.month_start(timezone.localtime(oldest) if oldest else timezone.localdate())
+    last_month = partitions.add_months(partitions.month_start(timezone.localdate()),
+                                       getattr(settings, 'IMPRESSION_PARTITIONS_AHEAD', 3))
+    partitions.ensure_partitions(connection, first_month, last_month)
+    partitions.create_default_partition(connection)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'INSERT INTO "{TABLE}" SELECT * FROM "{LEGACY}"')
+        if max_id:
+            cursor.execute(f"SELECT setval('\"{SEQUENCE}_p\"', %s)", [max_id])
+        cursor.execute(f'DROP TABLE "{LEGACY}"')
+        cursor.execute(f'ALTER SEQUENCE "{SEQUENCE}_p" RENAME TO "{SEQUENCE}"')
+        for indexdef in index_defs:
+            cursor.execute(indexdef)  # on the partitioned parent: cascades to every partition
+
+
+def unpartition_table(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+
+    from api import partitions
+
+    if not partitions.is_partitioned(connection):
+        return
+
+    with connection.cursor() as cursor:
+        index_defs = _index_definitions(cursor, TABLE)
+        cursor.execute(f'ALTER TABLE "{TABLE}" RENAME TO "{LEGACY}"')
+        cursor.execute(f'CREATE TABLE "{TABLE}" (LIKE "{LEGACY}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+        cursor.execute(f'ALTER SEQUENCE "{SEQUENCE}" OWNED BY "{TABLE}".id')
+        cursor.execute(f'ALTER TABLE "{TABLE}" ADD PRIMARY KEY (id)')
+        cursor.execute(f'INSERT INTO "{TABLE}" SELECT * FROM "{LEGACY}"')
+        cursor.execute(f'DROP TABLE "{LEGACY}"')  # drops the partitions too
+        for indexdef in index_defs:
+            cursor.execute(indexdef)
+
+
+class Migration(migrations.Migration):
+
+    atomic = True
+
+    dependencies = [
+        ('api', '0014_hotspot_content_checks'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_table, unpartition_table),
+    ]
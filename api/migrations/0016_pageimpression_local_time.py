@@ -0,0 +1,79 @@
+"""
+PageImpression.local_date / local_hour: viewed_at in TIME_ZONE, precomputed at
+ingest so daily/hourly statistics group on plain indexed columns instead of
+converting every row's timestamp (TruncDate / TruncHour).
+
+Existing rows are backfilled in chunks of BACKFILL_CHUNK ids, each chunk in
+its own transaction (the migration is not atomic), before the new indexes are
+built. viewed_at switches from auto_now_add to default=timezone.now so save()
+knows the timestamp before the INSERT — a state-only change, the column is
+unchanged (no SQLite table rebuild).
+"""
+
+from collections import defaultdict
+
+import django.utils.timezone
+from django.db import migrations, models, transaction
+from django.utils import timezone
+
+BACKFILL_CHUNK = 5000
+
+
+def backfill_local_time(apps, schema_editor):
+    PageImpression = apps.get_model('api', 'PageImpression')
+    db_alias = schema_editor.connection.alias
+    pending = PageImpression.objects.using(db_alias).filter(local_date__isnull=True).order_by('id')
+    last_id = 0
+    while True:
+        rows = list(pending.filter(id__gt=last_id).values_list('id', 'viewed_at')[:BACKFILL_CHUNK])
+        if not rows:
+            break
+        # ids are roughly in time order, so a chunk spans few local hours: one UPDATE per hour
+        by_hour = defaultdict(list)
+        for pk, viewed_at in rows:
+            local = timezone.localtime(viewed_at)
+            by_hour[(local.date(), local.hour)].append(pk)
+        with transaction.atomic(using=db_alias):
+            for (local_date, local_hour), ids in by_hour.items():
+                PageImpression.objects.using(db_alias).filter(id__in=ids).update(local_date=local_date, local_hour=local_hour)
+        last_id = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('api', '0015_partition_pageimpression'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pageimpression',
+            name='local_date',
+            field=models.DateField(editable=False, help_text='Local (TIME_ZONE) date of viewed_at', null=True),
+        ),
+        migrations.AddField(
+            model_name='pageimpression',
+            name='local_hour',
+            field=models.PositiveSmallIntegerField(editable=False, help_text='Local (TIME_ZONE) hour of viewed_at, 0-23', null=True),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='pageimpression',
+                    name='viewed_at',
+                    field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, editable=False, help_text='When page was viewed'),
+                ),
+            ],
+        ),
+        migrations.RunPython(backfill_local_time, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='pageimpression',
+            index=models.Index(fields=['local_date', 'local_hour', 'hotspot_name'], name='api_pageimp_local_d_963463_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pageimpression',
+            index=models.Index(fields=['hotspot_name', 'local_date', 'mac_hash'], name='api_pageimp_hotspot_304d06_idx'),
+        ),
+    ]
@@ -0,0 +1,74 @@
+"""
+HourlyTraffic: impressions per hotspot per local hour, maintained at ingest
+by _record_impression (api/rollups.py) for the day-of-week × hour heatmap.
+
+Rows still in the database are rolled up here with one GROUP BY on
+PageImpression (local_date, local_hour, hotspot_name). Months already moved
+out by archive_impressions are not: run
+`python manage.py rebuild_hourly_traffic` afterwards to include them.
+"""
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+BACKFILL_BATCH = 2000
+
+
+def backfill_hourly_traffic(apps, schema_editor):
+    PageImpression = apps.get_model('api', 'PageImpression')
+    HourlyTraffic = apps.get_model('api', 'HourlyTraffic')
+    db_alias = schema_editor.connection.alias
+    groups = PageImpression.objects.using(db_alias).filter(local_date__isnull=False).order_by().values(
+        'hotspot_name', 'local_date', 'local_hour'
+    ).annotate(
+        impressions=Count('id'),
+        unique_devices=Count('id', filter=Q(is_unique_today=True)),
+        total_time_on_page=Sum('time_on_page'),
+        time_on_page_count=Count('time_on_page'),
+    )
+    batch = []
+    for row in groups.iterator(chunk_size=BACKFILL_BATCH):
+        batch.append(HourlyTraffic(
+            hotspot_name=row['hotspot_name'],
+            date=row['local_date'],
+            hour=row['local_hour'],
+            impressions=row['impressions'],
+            unique_devices=row['unique_devices'],
+            total_time_on_page=row['total_time_on_page'] or 0,
+            time_on_page_count=row['time_on_page_count'],
+        ))
+        if len(batch) >= BACKFILL_BATCH:
+            HourlyTraffic.objects.using(db_alias).bulk_create(batch)
+            batch = []
+    HourlyTraffic.objects.using(db_alias).bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_pageimpression_local_time'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HourlyTraffic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hotspot_name', models.CharField(max_length=100)),
+                ('date', models.DateField(help_text='Local (TIME_ZONE) date')),
+                ('hour', models.PositiveSmallIntegerField(help_text='Local (TIME_ZONE) hour, 0-23')),
+                ('impressions', models.IntegerField(default=0, help_text='Page views in this hour')),
+                ('unique_devices', models.IntegerField(default=0, help_text='Devices first seen today at this hotspot in this hour')),
+                ('total_time_on_page', models.IntegerField(default=0, help_text='Sum of reported time_on_page (seconds)')),
+                ('time_on_page_count', models.IntegerField(default=0, help_text='Impressions that reported time_on_page')),
+            ],
+            options={
+                'verbose_name': 'Hourly Traffic',
+                'verbose_name_plural': 'Hourly Traffic',
+                'ordering': ['date', 'hour', 'hotspot_name'],
+                'indexes': [models.Index(fields=['date', 'hour', 'hotspot_name'], name='api_hourlyt_date_95d24a_idx')],
+                'unique_together': {('hotspot_name', 'date', 'hour')},
+            },
+        ),
+        migrations.RunPython(backfill_hourly_traffic, migrations.RunPython.noop),
+    ]
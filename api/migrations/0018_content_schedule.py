@@ -0,0 +1,63 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_hourlytraffic'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='backgroundimage',
+            name='ends_at',
+            field=models.DateTimeField(blank=True, help_text='Show until (blank = no end)', null=True),
+        ),
+        migrations.AddField(
+            model_name='backgroundimage',
+            name='starts_at',
+            field=models.DateTimeField(blank=True, help_text='Show from (blank = immediately)', null=True),
+        ),
+        migrations.AddField(
+            model_name='cardcontent',
+            name='ends_at',
+            field=models.DateTimeField(blank=True, help_text='Show until (blank = no end)', null=True),
+        ),
+        migrations.AddField(
+            model_name='cardcontent',
+            name='starts_at',
+            field=models.DateTimeField(blank=True, help_text='Show from (blank = immediately)', null=True),
+        ),
+        migrations.AddField(
+            model_name='landingpageurl',
+            name='ends_at',
+            field=models.DateTimeField(blank=True, help_text='Show until (blank = no end)', null=True),
+        ),
+        migrations.AddField(
+            model_name='landingpageurl',
+            name='starts_at',
+            field=models.DateTimeField(blank=True, help_text='Show from (blank = immediately)', null=True),
+        ),
+        migrations.AddField(
+            model_name='slidecontent',
+            name='ends_at',
+            field=models.DateTimeField(blank=True, help_text='Show until (blank = no end)', null=True),
+        ),
+        migrations.AddField(
+            model_name='slidecontent',
+            name='starts_at',
+            field=models.DateTimeField(blank=True, help_text='Show from (blank = immediately)', null=True),
+        ),
+        migrations.AddField(
+            model_name='templateconfig',
+            name='ends_at',
+            field=models.DateTimeField(blank=True, help_text='Show until (blank = no end)', null=True),
+        ),
+        migrations.AddField(
+            model_name='templateconfig',
+            name='starts_at',
+            field=models.DateTimeField(blank=True, help_text='Show from (blank = immediately)', null=True),
+        ),
+    ]
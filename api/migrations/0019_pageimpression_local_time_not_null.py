@@ -0,0 +1,38 @@
+"""
+PageImpression.local_date / local_hour become NOT NULL, so statistics never
+see a row without its local date (a null bucket in the daily trend, or a
+TypeError building hourly windows).
+
+Rows inserted between 0016 and the code that fills the columns at ingest
+(or loaded without set_local_time()) are backfilled again first, with the
+same chunked backfill as 0016; the migration is not atomic for the same reason.
+"""
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+backfill_local_time = import_module('api.migrations.0016_pageimpression_local_time').backfill_local_time
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('api', '0018_content_schedule'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_local_time, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='pageimpression',
+            name='local_date',
+            field=models.DateField(editable=False, help_text='Local (TIME_ZONE) date of viewed_at'),
+        ),
+        migrations.AlterField(
+            model_name='pageimpression',
+            name='local_hour',
+            field=models.PositiveSmallIntegerField(editable=False, help_text='Local (TIME_ZONE) hour of viewed_at, 0-23'),
+        ),
+    ]
@@ -1,10 +1,75 @@
 from django.db import models
+from django.db.models import Case, Q, Value, When
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.utils import timezone
 from PIL import Image
+from backend.metrics import IMAGE_PROCESSING
 import os
 
 
-class BackgroundImage(models.Model):
+# ===============================================
+# Scheduled content (publishing windows)
+# ===============================================
+
+# Rows without a window: at most one of these is active per hotspot for the
+# single-row models (background, template, landing URL)
+PERMANENT = Q(starts_at__isnull=True, ends_at__isnull=True)
+
+
+class ScheduleQuerySet(models.QuerySet):
+    def live(self, now=None):
+        """Active rows whose publishing window contains now"""
+        now = now or timezone.now()
+        return self.filter(
+            Q(starts_at__isnull=True) | Q(starts_at__lte=now),
+            Q(ends_at__isnull=True) | Q(ends_at__gt=now),
+            is_active=True,
+        )
+
+    def scheduled_first(self):
+        """Rows with a window ahead of permanent ones (a live window overrides), then the model ordering"""
+        permanent = Case(When(PERMANENT, then=Value(1)), default=Value(0))
+        return self.order_by(permanent, *self.model._meta.ordering)
+
+
+class ScheduledContent(models.Model):
+    """
+    Public content with an optional publishing window.
+    An active row is served only from starts_at (inclusive) until ends_at
+    (exclusive); blank means unbounded. api/schedule.py expires the public
+    caches at the next window boundary.
+    """
+    starts_at = models.DateTimeField(null=True, blank=True, help_text="Show from (blank = immediately)")
+    ends_at = models.DateTimeField(null=True, blank=True, help_text="Show until (blank = no end)")
+
+    objects = ScheduleQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    @property
+    def is_scheduled(self):
+        return self.starts_at is not None or self.ends_at is not None
+
+    def clean(self):
+        super().clean()
+        if self.starts_at and self.ends_at and self.ends_at <= self.starts_at:
+            raise ValidationError({'ends_at': 'เวลาสิ้นสุดต้องอยู่หลังเวลาเริ่มต้น'})
+
+    def deactivate_others(self):
+        """
+        Deactivate the hotspot's other permanent active rows (single-row models).
+        Scheduled rows are left alone: they override only for their window.
+        """
+        if self.is_scheduled:
+            return 0
+        return type(self).objects.filter(
+            PERMANENT, hotspot_name=self.hotspot_name, is_active=True
+        ).exclude(pk=self.pk).update(is_active=False)
+
+
+class BackgroundImage(ScheduledContent):
     """Model for storing background images"""
     title = models.CharField(max_length=255)
     image = models.ImageField(upload_to='backgrounds/')
@@ -21,25 +86,26 @@ class BackgroundImage(models.Model):
         return f"{self.title} - {'Active' if self.is_active else 'Inactive'}"
 
     def save(self, *args, **kwargs):
-        # If this image is set as active, deactivate all other images for the same hotspot
+        # If this image is set as active, deactivate all other (permanent) images for the same hotspot
         if self.is_active:
-            BackgroundImage.objects.filter(hotspot_name=self.hotspot_name, is_active=True).exclude(id=self.id).update(is_active=False)
+            self.deactivate_others()
 
         super().save(*args, **kwargs)
 
         # Optimize image after upload
         if self.image:
-            img_path = self.image.path
-            img = Image.open(img_path)
+            with IMAGE_PROCESSING.labels('background_resize').time():
+                img_path = self.image.path
+                img = Image.open(img_path)
 
-            # Resize if too large (max 1920x1080)
-            max_size = (1920, 1080)
-            if img.height > max_size[1] or img.width > max_size[0]:
-                img.thumbnail(max_size, Image.Resampling.LANCZOS)
-                img.save(img_path, optimize=True, quality=85)
+                # Resize if too large (max 1920x1080)
+                max_size = (1920, 1080)
+                if img.height > max_size[1] or img.width > max_size[0]:
+                    img.thumbnail(max_size, Image.Resampling.LANCZOS)
+                    img.save(img_path, optimize=True, quality=85)
 
 
-class TemplateConfig(models.Model):
+class TemplateConfig(ScheduledContent):
     """Model for configuring login page templates"""
     COMPONENT_CHOICES = [
         ('slideshow', 'Slideshow (Icons + Text + Dots)'),
@@ -71,13 +137,13 @@ class TemplateConfig(models.Model):
         return f"{status} {self.template_name}{hotspot_info} - {self.get_left_panel_component_display()}"
 
     def save(self, *args, **kwargs):
-        # If this template is set as active, deactivate all other templates for the same hotspot
+        # If this template is set as active, deactivate all other (permanent) templates for the same hotspot
         if self.is_active:
-            TemplateConfig.objects.filter(hotspot_name=self.hotspot_name, is_active=True).exclude(id=self.id).update(is_active=False)
+            self.deactivate_others()
         super().save(*args, **kwargs)
 
 
-class SlideContent(models.Model):
+class SlideContent(ScheduledContent):
     """Model for storing slide show content on login page"""
     icon = models.CharField(max_length=10, default="📚", blank=True, help_text="Emoji icon (e.g., 📚, 📖, 💻) - optional if using image")
     icon_image = models.ImageField(upload_to='slide_icons/', blank=True, null=True, help_text="Icon image file (recommended size: 100x100px)")
@@ -133,7 +199,7 @@ class SlideContent(models.Model):
         return self.icon
 
 
-class CardContent(models.Model):
+class CardContent(ScheduledContent):
     """Model for storing card content for card gallery component"""
     icon = models.CharField(max_length=10, default="📚", blank=True, help_text="Emoji icon (e.g., 📚, 💻, 🎓) - optional if using image")
     icon_image = models.ImageField(upload_to='card_icons/', blank=True, null=True, help_text="Icon image file (recommended size: 100x100px)")
@@ -305,7 +371,11 @@ class PageImpression(models.Model):
 
     # Core data
     hotspot_name = models.CharField(max_length=100, db_index=True, help_text="Hotspot identifier")
-    viewed_at = models.DateTimeField(auto_now_add=True, db_index=True, help_text="When page was viewed")
+    viewed_at = models.DateTimeField(default=timezone.now, editable=False, db_index=True, help_text="When page was viewed")
+
+    # viewed_at in TIME_ZONE, set on save: daily/hourly grouping without per-row timezone conversion
+    local_date = models.DateField(editable=False, help_text="Local (TIME_ZONE) date of viewed_at")
+    local_hour = models.PositiveSmallIntegerField(editable=False, help_text="Local (TIME_ZONE) hour of viewed_at, 0-23")
 
     # Device identification (for unique counting)
     mac_hash = models.CharField(max_length=64, db_index=True, help_text="SHA256 hash of MAC address")
@@ -327,6 +397,8 @@ class PageImpression(models.Model):
             models.Index(fields=['hotspot_name', 'viewed_at']),
             models.Index(fields=['mac_hash', 'viewed_at']),
             models.Index(fields=['hotspot_name', 'mac_hash', 'viewed_at']),
+            models.Index(fields=['local_date', 'local_hour', 'hotspot_name']),
+            models.Index(fields=['hotspot_name', 'local_date', 'mac_hash']),
         ]
         verbose_name = "Page Impression"
         verbose_name_plural = "Page Impressions"
@@ -334,6 +406,18 @@ class PageImpression(models.Model):
     def __str__(self):
         return f"{self.hotspot_name} - {self.viewed_at.strftime('%Y-%m-%d %H:%M')}"
 
+    def set_local_time(self):
+        """Fill local_date / local_hour from viewed_at (call before bulk_create, which skips save())"""
+        local = timezone.localtime(self.viewed_at)
+        self.local_date, self.local_hour = local.date(), local.hour
+
+    def save(self, *args, **kwargs):
+        self.set_local_time()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'viewed_at' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'local_date', 'local_hour'}
+        super().save(*args, **kwargs)
+
 
 class DailyReachStats(models.Model):
     """Aggregated daily reach statistics per hotspot"""
@@ -375,6 +459,31 @@ class DailyReachStats(models.Model):
         return f"{self.hotspot_name} - {self.date} ({self.unique_devices} unique, {self.total_impressions} total)"
 
 
+class HourlyTraffic(models.Model):
+    """Impressions per hotspot per local hour, kept current at ingest (api/rollups.py)"""
+
+    hotspot_name = models.CharField(max_length=100)
+    date = models.DateField(help_text="Local (TIME_ZONE) date")
+    hour = models.PositiveSmallIntegerField(help_text="Local (TIME_ZONE) hour, 0-23")
+
+    impressions = models.IntegerField(default=0, help_text="Page views in this hour")
+    unique_devices = models.IntegerField(default=0, help_text="Devices first seen today at this hotspot in this hour")
+    total_time_on_page = models.IntegerField(default=0, help_text="Sum of reported time_on_page (seconds)")
+    time_on_page_count = models.IntegerField(default=0, help_text="Impressions that reported time_on_page")
+
+    class Meta:
+        unique_together = ['hotspot_name', 'date', 'hour']
+        ordering = ['date', 'hour', 'hotspot_name']
+        verbose_name = "Hourly Traffic"
+        verbose_name_plural = "Hourly Traffic"
+        indexes = [
+            models.Index(fields=['date', 'hour', 'hotspot_name']),
+        ]
+
+    def __str__(self):
+        return f"{self.hotspot_name} - {self.date} {self.hour:02d}:00 ({self.impressions})"
+
+
 class Department(models.Model):
     """Model for managing departments and their allowed hotspot access"""
     name = models.CharField(max_length=255, unique=True, help_text="ชื่อหน่วยงาน (e.g., คณะวิทยาศาสตร์, สำนักหอสมุด)")
@@ -415,7 +524,7 @@ class Department(models.Model):
         return self.hotspots.count()
 
 
-class LandingPageURL(models.Model):
+class LandingPageURL(ScheduledContent):
     """Landing page URL for post-login redirect (per hotspot)"""
 
     title = models.CharField(max_length=255, help_text="Description (e.g., Library Portal, Promotion Page)")
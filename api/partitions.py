@@ -0,0 +1,165 @@
+"""
+Monthly range partitions of PageImpression (PostgreSQL profile only).
+
+Migration 0015 turns api_pageimpression into a table partitioned by RANGE
+(viewed_at), one partition per local (TIME_ZONE) month named
+api_pageimpression_yYYYYmMM, plus a DEFAULT partition that catches rows
+outside the created months. Analytics filter on viewed_at ranges, so the
+planner only scans the months a report covers.
+
+Partitions are created ahead of time and old ones detached with
+`python manage.py impression_partitions`. The DEFAULT partition is only
+created by the migration: PostgreSQL refuses DETACH ... CONCURRENTLY while
+one exists, so a deployment that wants non-blocking detaches drops it (once
+it is empty) and relies on months being created ahead; an insert for a month
+without a partition then fails instead of landing in DEFAULT.
+
+id uniqueness: PostgreSQL only enforces unique constraints that include the
+partition key, so the primary key is (id, viewed_at) and nothing in the
+database stops the same id appearing in two months. ids are unique because
+the api_pageimpression_id_seq sequence is their only source: every insert
+(track_impression, generate_impressions, bulk_create) leaves id to the
+column default, and rows moved between partitions keep theirs. Do not load
+impressions with explicit ids (loaddata, re-attaching a table from another
+database); `impression_partitions --check-ids` lists any duplicates.
+"""
+
+import re
+from datetime import date, datetime
+
+from django.utils import timezone
+
+TABLE = 'api_pageimpression'
+DEFAULT_PARTITION = f'{TABLE}_default'
+PARTITION_NAME_PATTERN = re.compile(rf'^{TABLE}_y(\d{{4}})m(\d{{2}})$')
+
+
+def is_supported(connection):
+    return connection.vendor == 'postgresql'
+
+
+def is_partitioned(connection):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [TABLE]
+        )
+        row = cursor.fetchone()
+    return bool(row) and row[0] == 'p'
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'{TABLE}_y{month.year:04d}m{month.month:02d}'
+
+
+def partition_month(name):
+    """date of the first day of the month a partition covers, or None (e.g. the DEFAULT partition)"""
+    match = PARTITION_NAME_PATTERN.match(name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def _bound(month):
+    # Local midnight on the 1st, so a partition holds exactly one local month of data
+    return timezone.make_aware(datetime(month.year, month.month, 1)).isoformat()
+
+
+def create_partition(connection, month):
+    """
+    Create the partition for one month (no-op if it exists). Rows for that month
+    that landed in the DEFAULT partition are moved into it first, since
+    PostgreSQL refuses to attach a range the DEFAULT partition already holds.
+    Returns True if a partition was created.
+    """
+    name = partition_name(month)
+    start, end = _bound(month), _bound(add_months(month, 1))
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s)", [name])
+        if cursor.fetchone()[0]:
+            return False
+        cursor.execute(f'CREATE TABLE "{name}" (LIKE "{TABLE}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+        if has_default_partition(connection):
+            cursor.execute(
+                f'WITH moved AS (DELETE FROM "{DEFAULT_PARTITION}" WHERE viewed_at >= %s AND viewed_at < %s RETURNING *) '
+                f'INSERT INTO "{name}" SELECT * FROM moved',
+                [start, end],
+            )
+        cursor.execute(
+            f'ALTER TABLE "{TABLE}" ATTACH PARTITION "{name}" FOR VALUES FROM (%s) TO (%s)',
+            [start, end],
+        )
+    return True
+
+
+def create_default_partition(connection):
+    with connection.cursor() as cursor:
+        cursor.execute(f'CREATE TABLE IF NOT EXISTS "{DEFAULT_PARTITION}" PARTITION OF "{TABLE}" DEFAULT')
+
+
+def ensure_partitions(connection, first_month, last_month):
+    """Create monthly partitions first_month..last_month (inclusive); returns the names created"""
+    created = []
+    month = month_start(first_month)
+    while month <= last_month:
+        if create_partition(connection, month):
+            created.append(partition_name(month))
+        month = add_months(month, 1)
+    return created
+
+
+def list_partitions(connection):
+    """[{'name', 'month', 'bound', 'rows', 'bytes'}] — rows is the planner estimate"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint, pg_total_relation_size(c.oid)
+            FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = to_regclass(%s)
+            ORDER BY c.relname
+            """,
+            [TABLE],
+        )
+        rows = cursor.fetchall()
+    return [
+        {'name': name, 'month': partition_month(name), 'bound': bound, 'rows': max(tuples, 0), 'bytes': size}
+        for name, bound, tuples, size in rows
+    ]
+
+
+def has_default_partition(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s)", [DEFAULT_PARTITION])
+        return cursor.fetchone()[0] is not None
+
+
+def detach_partition(connection, name, concurrently=False):
+    """
+    Detach a monthly partition; its data stays in a standalone table of the same name.
+    A plain DETACH makes inserts wait for a brief exclusive lock on the parent.
+    CONCURRENTLY does not block them, but must run outside a transaction and
+    PostgreSQL refuses it while a DEFAULT partition exists.
+    """
+    option = ' CONCURRENTLY' if concurrently else ''
+    with connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{name}"{option}')
+
+
+def duplicate_ids(connection, limit=20):
+    """[(id, rows)] for ids stored more than once across partitions (see id uniqueness above)"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT id, count(*) FROM "{TABLE}" GROUP BY id HAVING count(*) > 1 ORDER BY id LIMIT %s', [limit]
+        )
+        return cursor.fetchall()
+
+
+def drop_table(connection, name):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS "{name}"')
@@ -0,0 +1,805 @@
+"""
+Tiered retention for PageImpression.
+
+Raw impressions older than IMPRESSION_RETENTION_MONTHS are moved out of the
+database into one compressed, columnar file per local (TIME_ZONE) month under
+IMPRESSION_ARCHIVE_DIR (impressions-YYYY-MM.json.gz):
+
+  1. the month's rows are paged out of the database in (viewed_at, id) order
+     (keyset, ARCHIVE_PAGE rows per query) and merged with any existing
+     archive for that month (re-runs after an interruption are safe), and
+     written block by block to a temp file
+  2. per-hour totals of those rows must match HourlyTraffic, the rollup kept
+     at ingest; on a mismatch the temp file is dropped and nothing changes
+  3. the temp file is fsynced and renamed into place, DailyReachStats for the
+     month are rewritten from the same rows
+  4. the file is read back: its per-hour totals must match again and every
+     row still in the database must be in it
+  5. only then are the rows deleted, IMPRESSION_ARCHIVE_CHUNK ids per
+     transaction so impression inserts are never blocked for long
+
+Memory stays bounded by one page / block of rows plus per-hour and per-day
+rollup state, whatever the month's size.
+
+Analytics (impression-statistics, media-reach-report, the PDF export) call
+stats_for_range(): when a date range reaches an archived month it returns an
+ImpressionStats that answers the live part with ORM aggregates and the
+archived part from HourlyTraffic; only per-device figures (reach, frequency,
+engagement, recent rows) stream the archive rows of the range, keeping state
+per device, never per row. Otherwise it returns None and the view keeps its
+ORM queries.
+
+File layout (gzip'd JSON lines): a header, then per block of up to
+BLOCK_ROWS rows a {"rows", "first", "last"} line and a line of columns stored
+as parallel lists, then an {"end"} footer with the row count. Repetitive text
+columns (hotspot_name, device_type, user_agent) are dictionary-encoded per
+block and viewed_at is microseconds since the Unix epoch (UTC). Readers skip
+the column lines of blocks outside the requested range without parsing them.
+Version 1 files (one JSON document) are still read.
+
+Run with `python manage.py archive_impressions`.
+"""
+
+import gzip
+import heapq
+import json
+import logging
+import os
+import re
+from collections import Counter, defaultdict
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .models import DailyReachStats, HourlyTraffic, PageImpression
+from .partitions import add_months, month_start
+
+logger = logging.getLogger(__name__)
+
+FORMAT = 'liblogin-impressions'
+FORMAT_VERSION = 2
+FILE_PATTERN = re.compile(r'^impressions-(\d{4})-(\d{2})\.json\.gz$')
+
+COLUMNS = ('id', 'hotspot_name', 'viewed_at', 'mac_hash', 'ip_address',
+           'device_type', 'user_agent', 'time_on_page', 'is_unique_today')
+DICTIONARY_COLUMNS = ('hotspot_name', 'device_type', 'user_agent')
+# Columns analytics need (ImpressionStats.recent rows), in this order
+STATS_COLUMNS = ('id', 'hotspot_name', 'viewed_at', 'mac_hash', 'ip_address',
+                 'device_type', 'time_on_page', 'is_unique_today')
+# Columns the per-hour totals are computed from
+HOURLY_COLUMNS = ('hotspot_name', 'viewed_at', 'is_unique_today', 'time_on_page')
+
+BLOCK_ROWS = 10000  # rows per block in the file
+ARCHIVE_PAGE = 5000  # rows per keyset query while archiving
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+DEVICE_COUNT_FIELDS = {'mobile': 'mobile_count', 'desktop': 'desktop_count', 'tablet': 'tablet_count'}
+
+
+class ArchiveVerificationError(Exception):
+    """The archive does not match the database or its rollups — nothing was deleted"""
+
+
+# ===============================================
+# Settings / paths
+# ===============================================
+
+def archive_dir():
+    return str(getattr(settings, 'IMPRESSION_ARCHIVE_DIR', settings.BASE_DIR / 'data' / 'impression_archive'))
+
+
+def retention_months():
+    return getattr(settings, 'IMPRESSION_RETENTION_MONTHS', 13)
+
+
+def archive_path(month):
+    return os.path.join(archive_dir(), f'impressions-{month:%Y-%m}.json.gz')
+
+
+def month_bounds(month):
+    """Aware [start, end) datetimes of one local month"""
+    start = timezone.make_aware(datetime(month.year, month.month, 1))
+    next_month = add_months(month, 1)
+    return start, timezone.make_aware(datetime(next_month.year, next_month.month, 1))
+
+
+def retention_cutoff(months=None):
+    """First month that stays in the database; everything before it is archived"""
+    months = retention_months() if months is None else months
+    return add_months(month_start(timezone.localdate()), -(months - 1))
+
+
+def archived_months():
+    try:
+        names = os.listdir(archive_dir())
+    except FileNotFoundError:
+        return []
+    months = []
+    for name in names:
+        match = FILE_PATTERN.match(name)
+        if match:
+            months.append(datetime(int(match.group(1)), int(match.group(2)), 1).date())
+    return sorted(months)
+
+
+def months_to_archive(months=None):
+    """Months before the retention cutoff that still have rows in the database"""
+    cutoff_start, _ = month_bounds(retention_cutoff(months))
+    oldest = PageImpression.objects.filter(viewed_at__lt=cutoff_start).order_by('viewed_at').values_list('viewed_at', flat=True).first()
+    if oldest is None:
+        return []
+    month, cutoff = month_start(timezone.localtime(oldest)), retention_cutoff(months)
+    result = []
+    while month < cutoff:
+        start, end = month_bounds(month)
+        if PageImpression.objects.filter(viewed_at__gte=start, viewed_at__lt=end).exists():
+            result.append(month)
+        month = add_months(month, 1)
+    return result
+
+
+# ===============================================
+# Columnar file format
+# ===============================================
+
+def _to_micros(value):
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+def _from_micros(value):
+    return EPOCH + timedelta(microseconds=value)
+
+
+def _encode(rows):
+    """rows: dicts keyed by COLUMNS, sorted by (viewed_at, id)"""
+    columns = {}
+    for name in COLUMNS:
+        values = [row[name] for row in rows]
+        if name == 'viewed_at':
+            values = [_to_micros(v) for v in values]
+        if name in DICTIONARY_COLUMNS:
+            dictionary, codes, index = [], [], {}
+            for value in values:
+                if value not in index:
+                    index[value] = len(dictionary)
+                    dictionary.append(value)
+                codes.append(index[value])
+            columns[name] = {'dictionary': dictionary, 'codes': codes}
+        else:
+            columns[name] = values
+    return columns
+
+
+def _column(block, name):
+    """One column of an encoded block as a list (viewed_at stays in microseconds)"""
+    values = block[name]
+    if name in DICTIONARY_COLUMNS:
+        dictionary = values['dictionary']
+        return [dictionary[code] for code in values['codes']]
+    return values
+
+
+def _dumps(obj):
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8') + b'\n'
+
+
+class ArchiveWriter:
+    """
+    Write one month's archive block by block to a temp file next to it.
+    Rows must be added in (viewed_at, id) order; close() writes the footer and
+    fsyncs, commit() renames the file into place, abort() removes it.
+    """
+
+    def __init__(self, month, block_rows=BLOCK_ROWS):
+        os.makedirs(archive_dir(), exist_ok=True)
+        self.path = archive_path(month)
+        self.tmp_path = f'{self.path}.tmp'
+        self.block_rows = block_rows
+        self.rows = 0
+        self.blocks = 0
+        self._block = []
+        self._raw = open(self.tmp_path, 'wb')
+        self._gz = gzip.GzipFile(fileobj=self._raw, mode='wb', compresslevel=9, mtime=0)
+        self._gz.write(_dumps({
+            'format': FORMAT,
+            'version': FORMAT_VERSION,
+            'month': f'{month:%Y-%m}',
+            'created_at': timezone.now().isoformat(),
+        }))
+
+    def add(self, row):
+        self._block.append(row)
+        if len(self._block) >= self.block_rows:
+            self._flush()
+
+    def _flush(self):
+        if not self._block:
+            return
+        block = self._block
+        self._gz.write(_dumps({
+            'rows': len(block),
+            'first': _to_micros(block[0]['viewed_at']),
+            'last': _to_micros(block[-1]['viewed_at']),
+        }))
+        self._gz.write(_dumps(_encode(block)))
+        self.rows += len(block)
+        self.blocks += 1
+        self._block = []
+
+    def close(self):
+        self._flush()
+        self._gz.write(_dumps({'end': True, 'rows': self.rows, 'blocks': self.blocks}))
+        self._gz.close()
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+        self._raw.close()
+
+    def commit(self):
+        os.replace(self.tmp_path, self.path)
+        return self.path
+
+    def abort(self):
+        try:
+            self._gz.close()
+            self._raw.close()
+        finally:
+            if os.path.exists(self.tmp_path):
+                os.remove(self.tmp_path)
+
+
+def _read_blocks(path, low=None, high=None):
+    """
+    Encoded blocks of an archive file that may hold rows with low <= viewed_at
+    <= high (microseconds), in order. Column lines of other blocks are skipped
+    without being parsed.
+    """
+    with gzip.open(path, 'rb') as gz:
+        header = json.loads(gz.readline())
+        if header.get('format') != FORMAT:
+            raise ValueError(f'{path}: unsupported archive format')
+        if header.get('version') == 1:
+            # One document: all rows in a single block
+            columns = header['columns']
+            if len(columns['id']) != header['rows']:
+                raise ValueError(f'{path}: row count mismatch')
+            yield columns
+            return
+        if header.get('version') != FORMAT_VERSION:
+            raise ValueError(f'{path}: unsupported archive version {header.get("version")}')
+
+        rows = 0
+        for line in gz:
+            meta = json.loads(line)
+            if meta.get('end'):
+                if meta['rows'] != rows:
+                    raise ValueError(f'{path}: row count mismatch')
+                return
+            data = gz.readline()
+            if not data.endswith(b'\n'):
+                break
+            rows += meta['rows']
+            if high is not None and meta['first'] > high:
+                return  # blocks are in viewed_at order
+            if low is not None and meta['last'] < low:
+                continue
+            yield json.loads(data)
+    raise ValueError(f'{path}: truncated archive (no footer)')
+
+
+def iter_archive(month, columns=COLUMNS, start=None, end=None):
+    """
+    Rows of one archived month as tuples of the given columns, in (viewed_at,
+    id) order, limited to start <= viewed_at <= end. Yields nothing if the
+    month is not archived.
+    """
+    low = _to_micros(start) if start is not None else None
+    high = _to_micros(end) if end is not None else None
+    when = columns.index('viewed_at') if 'viewed_at' in columns else None
+    try:
+        for block in _read_blocks(archive_path(month), low, high):
+            stamps = block['viewed_at']
+            values = [stamps if name == 'viewed_at' else _column(block, name) for name in columns]
+            for i, stamp in enumerate(stamps):
+                if (low is not None and stamp < low) or (high is not None and stamp > high):
+                    continue
+                row = [column[i] for column in values]
+                if when is not None:
+                    row[when] = _from_micros(stamp)
+                yield tuple(row)
+    except FileNotFoundError:
+        return
+
+
+def archive_info(month):
+    """{'version', 'rows', 'blocks'} of one archive, read without decoding its columns"""
+    with gzip.open(archive_path(month), 'rb') as gz:
+        header = json.loads(gz.readline())
+        if header.get('version') == 1:
+            return {'version': 1, 'rows': header['rows'], 'blocks': 1}
+        rows = blocks = 0
+        for line in gz:
+            meta = json.loads(line)
+            if meta.get('end'):
+                return {'version': header.get('version'), 'rows': rows, 'blocks': blocks}
+            gz.readline()
+            rows += meta['rows']
+            blocks += 1
+    raise ValueError(f'{archive_path(month)}: truncated archive (no footer)')
+
+
+# ===============================================
+# Rollups (HourlyTraffic check, DailyReachStats)
+# ===============================================
+
+def _local_hour(viewed_at):
+    local = timezone.localtime(viewed_at)
+    return local.date(), local.hour
+
+
+class HourlyTotals:
+    """Per-(hotspot, local date, hour) totals as HourlyTraffic stores them, from a stream of rows"""
+
+    def __init__(self):
+        self.groups = defaultdict(lambda: [0, 0, 0, 0])  # impressions, unique, time sum, time count
+
+    def add(self, hotspot_name, viewed_at, is_unique_today, time_on_page):
+        group = self.groups[(hotspot_name, *_local_hour(viewed_at))]
+        group[0] += 1
+        group[1] += 1 if is_unique_today else 0
+        if time_on_page is not None:
+            group[2] += time_on_page
+            group[3] += 1
+
+    def as_dict(self):
+        return {key: tuple(values) for key, values in self.groups.items()}
+
+
+def stored_hourly_totals(month):
+    """HourlyTraffic rows of one local month in the HourlyTotals.as_dict() shape"""
+    rows = HourlyTraffic.objects.filter(date__gte=month, date__lt=add_months(month, 1)).values_list(
+        'hotspot_name', 'date', 'hour', 'impressions', 'unique_devices', 'total_time_on_page', 'time_on_page_count',
+    )
+    return {(name, day, hour): tuple(values) for name, day, hour, *values in rows if values[0]}
+
+
+def _check_hourly(month, totals, what):
+    stored = stored_hourly_totals(month)
+    if stored != totals:
+        diff = set(stored.items()) ^ set(totals.items())
+        hours = sorted({key for key, _ in diff})
+        name, day, hour = hours[0]
+        raise ArchiveVerificationError(
+            f'{month:%Y-%m}: {what} do not match HourlyTraffic in {len(hours)} hotspot-hours '
+            f'(e.g. {name} {day} {hour:02d}:00); run rebuild_hourly_traffic if the rollups are stale'
+        )
+
+
+class DailyRollups:
+    """DailyReachStats values per (hotspot_name, local date), from a stream of rows"""
+
+    def __init__(self):
+        self.groups = {}
+
+    def add(self, row):
+        day, hour = _local_hour(row['viewed_at'])
+        group = self.groups.get((row['hotspot_name'], day))
+        if group is None:
+            group = self.groups[(row['hotspot_name'], day)] = {
+                'impressions': 0, 'macs': set(), 'devices': Counter(), 'times': [0, 0], 'hours': Counter(),
+            }
+        group['impressions'] += 1
+        group['macs'].add(row['mac_hash'])
+        group['devices'][DEVICE_COUNT_FIELDS.get(row['device_type'], 'unknown_count')] += 1
+        if row['time_on_page'] is not None:
+            group['times'][0] += row['time_on_page']
+            group['times'][1] += 1
+        group['hours'][str(hour)] += 1
+
+    def result(self):
+        rollups = {}
+        for key, group in self.groups.items():
+            devices, (time_sum, time_count) = group['devices'], group['times']
+            rollups[key] = {
+                'total_impressions': group['impressions'],
+                'unique_devices': len(group['macs']),
+                'mobile_count': devices['mobile_count'],
+                'desktop_count': devices['desktop_count'],
+                'tablet_count': devices['tablet_count'],
+                'unknown_count': devices['unknown_count'],
+                'avg_time_on_page': round(time_sum / time_count, 1) if time_count else 0.0,
+                'total_time_on_page': time_sum,
+                'hourly_data': dict(sorted(group['hours'].items(), key=lambda item: int(item[0]))),
+            }
+        return rollups
+
+
+def save_rollups(month, rollups):
+    """Replace the month's DailyReachStats with the given rollups"""
+    start, end = month_bounds(month)
+    with transaction.atomic():
+        DailyReachStats.objects.filter(date__gte=start.date(), date__lt=end.date()).delete()
+        DailyReachStats.objects.bulk_create([
+            DailyReachStats(hotspot_name=hotspot_name, date=day, **values)
+            for (hotspot_name, day), values in rollups.items()
+        ], batch_size=500)
+
+
+# ===============================================
+# Archive one month
+# ===============================================
+
+def _db_rows(queryset, page_size=ARCHIVE_PAGE, columns=COLUMNS):
+    """Stream queryset rows (dicts) in (viewed_at, id) order, one keyset page per query"""
+    ordered = queryset.order_by('viewed_at', 'id').values(*columns)
+    last = None
+    while True:
+        page = ordered
+        if last is not None:
+            page = ordered.filter(Q(viewed_at__gt=last[0]) | Q(viewed_at=last[0], id__gt=last[1]))
+        rows = list(page[:page_size])
+        yield from rows
+        if len(rows) < page_size:
+            return
+        last = (rows[-1]['viewed_at'], rows[-1]['id'])
+
+
+def _merged_rows(month, month_qs):
+    """(row, in_database) for the month's database rows merged with its existing archive, by (viewed_at, id)"""
+    db = ((row['viewed_at'], row['id'], True, row) for row in _db_rows(month_qs))
+    archived = ((values[2], values[0], False, dict(zip(COLUMNS, values))) for values in iter_archive(month))
+    previous = None
+    # On equal keys merge() yields the database row first; its archived copy is skipped
+    for viewed_at, pk, in_database, row in heapq.merge(db, archived, key=lambda item: item[:2]):
+        if (viewed_at, pk) == previous:
+            continue
+        previous = (viewed_at, pk)
+        yield row, in_database
+
+
+def verify_archive(month, month_qs, expected, max_id):
+    """
+    Read the committed file back: its per-hour totals must equal expected
+    (already checked against HourlyTraffic) and every database row of the
+    month up to max_id must be in it. Returns the file's row count.
+    """
+    totals = HourlyTotals()
+    rows = 0
+    for pk, hotspot_name, viewed_at, is_unique_today, time_on_page in iter_archive(month, ('id', *HOURLY_COLUMNS)):
+        totals.add(hotspot_name, viewed_at, is_unique_today, time_on_page)
+        rows += 1
+    if totals.as_dict() != expected:
+        raise ArchiveVerificationError(f'{month:%Y-%m}: archive read back does not match the archived rows')
+
+    file_keys = ((viewed_at, pk) for pk, viewed_at in iter_archive(month, ('id', 'viewed_at')))
+    current = next(file_keys, None)
+    for row in _db_rows(month_qs.filter(id__lte=max_id), columns=('id', 'viewed_at')):
+        key = (row['viewed_at'], row['id'])
+        while current is not None and current < key:
+            current = next(file_keys, None)
+        if current != key:
+            raise ArchiveVerificationError(f'{month:%Y-%m}: row id {row["id"]} is not in the archive')
+    return rows
+
+
+def archive_month(month, delete=True, chunk_size=None, on_chunk=None):
+    """
+    Archive, verify and (optionally) delete one month of impressions.
+    Returns {'month', 'archived', 'deleted', 'path'}.
+    """
+    chunk_size = chunk_size or getattr(settings, 'IMPRESSION_ARCHIVE_CHUNK', 2000)
+    start, end = month_bounds(month)
+    if month >= month_start(timezone.localdate()):
+        raise ValueError('Refusing to archive the current or a future month')
+
+    month_qs = PageImpression.objects.filter(viewed_at__gte=start, viewed_at__lt=end)
+    totals, daily = HourlyTotals(), DailyRollups()
+    db_rows, max_id = 0, 0
+    writer = ArchiveWriter(month)
+    try:
+        for row, in_database in _merged_rows(month, month_qs):
+            writer.add(row)
+            totals.add(row['hotspot_name'], row['viewed_at'], row['is_unique_today'], row['time_on_page'])
+            daily.add(row)
+            if in_database:
+                db_rows += 1
+                max_id = max(max_id, row['id'])
+        writer.close()
+        # Before anything is replaced: the rows must add up to the rollups kept at ingest
+        expected = totals.as_dict()
+        _check_hourly(month, expected, 'archived rows')
+        path = writer.commit()
+    except BaseException:
+        writer.abort()
+        raise
+
+    save_rollups(month, daily.result())
+    archived = verify_archive(month, month_qs, expected, max_id)
+    logger.info(f"[Retention] Archived {month:%Y-%m}: {archived} rows -> {path}")
+
+    deleted = 0
+    if delete:
+        # Only rows that existed when the file was verified (ids come from one sequence)
+        pending = month_qs.filter(id__lte=max_id).order_by('id').values_list('id', flat=True)
+        last_id = 0
+        while True:
+            chunk = list(pending.filter(id__gt=last_id)[:chunk_size])
+            if not chunk:
+                break
+            with transaction.atomic():
+                deleted += PageImpression.objects.filter(id__in=chunk).delete()[0]
+            last_id = chunk[-1]
+            if on_chunk:
+                on_chunk(deleted, db_rows)
+        logger.info(f"[Retention] Deleted {deleted} archived rows for {month:%Y-%m}")
+    return {'month': month, 'archived': archived, 'deleted': deleted, 'path': path}
+
+
+# ===============================================
+# Query path
+# ===============================================
+
+def _months_in(start, end):
+    return [m for m in archived_months() if month_bounds(m)[1] > start and month_bounds(m)[0] <= end]
+
+
+def reaches_archive(start, end):
+    return bool(_months_in(start, end))
+
+
+def stats_for_range(queryset, start, end, allowed=None, hotspot=None):
+    """
+    ImpressionStats over the filtered live queryset plus the archived months
+    of [start, end], or None when the range only covers months still in the
+    database. An archived month is taken from its file alone: it holds every
+    row of the month, including any still in the database (--keep-rows,
+    interrupted deletes).
+    """
+    months = _months_in(start, end)
+    if not months:
+        return None
+    for month in months:
+        month_first, month_end = month_bounds(month)
+        queryset = queryset.exclude(viewed_at__gte=month_first, viewed_at__lt=month_end)
+    return ImpressionStats(queryset, months, start, end, allowed, hotspot)
+
+
+def _hour_start(day, hour):
+    return timezone.make_aware(datetime.combine(day, time(hour)))
+
+
+class ImpressionStats:
+    """
+    The aggregates the analytics views use, over live rows (queryset, ORM
+    aggregates) plus archived months:
+      - counts, time on page, per-day and per-hour totals: HourlyTraffic for
+        every whole hour of the range, archive rows only for a partial first
+        or last hour
+      - unique devices, frequency, engagement, per-hotspot / per-device /
+        per-day reach: one streaming pass over the archived rows of the range,
+        keeping state per device; live devices are merged in from the ORM
+      - recent rows: live rows first, archived ones only to fill up the limit
+    """
+
+    def __init__(self, queryset, months, start, end, allowed=None, hotspot=None):
+        self.live = queryset.order_by()
+        self.months = months
+        self.start, self.end = start, end
+        self.allowed = set(allowed) if allowed is not None else None
+        self.hotspot = hotspot if hotspot and hotspot != 'all' else None
+        self._hours = None
+        self._scan = None
+        self._live_totals = None
+
+    # --- archived rows / rollups --------------------------------------------
+
+    def _selected(self, hotspot_name):
+        if self.allowed is not None and hotspot_name not in self.allowed:
+            return False
+        return self.hotspot is None or hotspot_name == self.hotspot
+
+    def _archived(self, columns, start=None, end=None):
+        """Archived rows of the range (or of [start, end] within it); columns must start with hotspot_name"""
+        start = max(start or self.start, self.start)
+        end = min(end or self.end, self.end)
+        for month in self.months:
+            month_first, month_end = month_bounds(month)
+            if month_end <= start or month_first > end:
+                continue
+            for row in iter_archive(month, columns, start, end):
+                if self._selected(row[0]):
+                    yield row
+
+    def _partial_hours(self):
+        """[start, end] windows of the range's first and last hour when they are not whole hours"""
+        first = timezone.localtime(self.start).replace(minute=0, second=0, microsecond=0)
+        last = timezone.localtime(self.end).replace(minute=0, second=0, microsecond=0)
+        windows = []
+        if first < self.start:
+            windows.append((self.start, min(first + timedelta(hours=1) - timedelta(microseconds=1), self.end)))
+        if last + timedelta(hours=1) - timedelta(microseconds=1) > self.end and (last > first or not windows):
+            windows.append((max(last, self.start), self.end))
+        return windows
+
+    def _archived_hours(self):
+        """{(local date, hour): [impressions, time sum, time count]} of the archived part"""
+        if self._hours is not None:
+            return self._hours
+        partial = self._partial_hours()
+        skip = {_local_hour(window_start) for window_start, _ in partial}
+
+        in_months = Q()
+        for month in self.months:
+            in_months |= Q(date__gte=month, date__lt=add_months(month, 1))
+        rollups = HourlyTraffic.objects.filter(
+            in_months, date__gte=timezone.localdate(self.start), date__lte=timezone.localdate(self.end),
+        )
+        if self.allowed is not None:
+            rollups = rollups.filter(hotspot_name__in=self.allowed)
+        if self.hotspot:
+            rollups = rollups.filter(hotspot_name=self.hotspot)
+        hours = {}
+        for row in rollups.order_by().values('date', 'hour').annotate(
+            impressions=Sum('impressions'), time_sum=Sum('total_time_on_page'), time_count=Sum('time_on_page_count'),
+        ):
+            key = (row['date'], row['hour'])
+            if key not in skip and self.start <= _hour_start(*key) <= self.end:
+                hours[key] = [row['impressions'], row['time_sum'] or 0, row['time_count'] or 0]
+
+        for window_start, window_end in partial:
+            for _, viewed_at, seconds in self._archived(('hotspot_name', 'viewed_at', 'time_on_page'), window_start, window_end):
+                group = hours.setdefault(_local_hour(viewed_at), [0, 0, 0])
+                group[0] += 1
+                if seconds is not None:
+                    group[1] += seconds
+                    group[2] += 1
+        self._hours = hours
+        return hours
+
+    def _archived_scan(self):
+        """Per-device state of the archived rows in one streaming pass"""
+        if self._scan is not None:
+            return self._scan
+        scan = {
+            'macs': Counter(),                          # mac_hash -> impressions
+            'hotspots': defaultdict(lambda: [0, set()]),  # name -> [impressions, macs]
+            'devices': defaultdict(lambda: [0, set(), 0, 0]),  # type -> [impressions, macs, time sum, time count]
+            'days': defaultdict(set),                   # local date -> macs
+            'times': Counter(),                         # time_on_page -> impressions
+        }
+        for name, viewed_at, mac_hash, device_type, seconds in self._archived(
+            ('hotspot_name', 'viewed_at', 'mac_hash', 'device_type', 'time_on_page')
+        ):
+            scan['macs'][mac_hash] += 1
+            hotspot = scan['hotspots'][name]
+            hotspot[0] += 1
+            hotspot[1].add(mac_hash)
+            device = scan['devices'][device_type]
+            device[0] += 1
+            device[1].add(mac_hash)
+            if seconds is not None:
+                device[2] += seconds
+                device[3] += 1
+                scan['times'][seconds] += 1
+            scan['days'][timezone.localtime(viewed_at).date()].add(mac_hash)
+        self._scan = scan
+        return scan
+
+    def _live_time_totals(self):
+        if self._live_totals is None:
+            self._live_totals = self.live.aggregate(count=Count('id'), time_sum=Sum('time_on_page'), time_count=Count('time_on_page'))
+        return self._live_totals
+
+    # --- aggregates -------------------------------------------------------
+
+    def __len__(self):
+        return self.count()
+
+    def count(self):
+        return self._live_time_totals()['count'] + sum(hour[0] for hour in self._archived_hours().values())
+
+    def time_totals(self):
+        """(sum, count) of time_on_page over rows that have it"""
+        live = self._live_time_totals()
+        hours = self._archived_hours().values()
+        return (live['time_sum'] or 0) + sum(hour[1] for hour in hours), live['time_count'] + sum(hour[2] for hour in hours)
+
+    def avg_time(self):
+        total, count = self.time_totals()
+        return total / count if count else 0
+
+    def unique_devices(self):
+        archived = self._archived_scan()['macs']
+        live_only = sum(1 for mac in self.live.values_list('mac_hash', flat=True).distinct().iterator() if mac not in archived)
+        return len(archived) + live_only
+
+    def engaged(self, seconds=10):
+        archived = sum(count for value, count in self._archived_scan()['times'].items() if value >= seconds)
+        return archived + self.live.filter(time_on_page__gte=seconds).count()
+
+    def frequency_distribution(self):
+        """{impressions per device: number of devices}"""
+        archived = self._archived_scan()['macs']
+        distribution = Counter(archived.values())
+        for row in self.live.values('mac_hash').annotate(n=Count('id')).iterator():
+            previous = archived.get(row['mac_hash'], 0)
+            if previous:
+                distribution[previous] -= 1
+            distribution[previous + row['n']] += 1
+        return +distribution
+
+    def _live_new_devices(self, field):
+        """{value of field: live devices not already seen in the archive for that value}"""
+        archived = self._archived_scan()['hotspots' if field == 'hotspot_name' else 'devices']
+        new = Counter()
+        for value, mac_hash in self.live.values_list(field, 'mac_hash').distinct().iterator():
+            if value not in archived or mac_hash not in archived[value][1]:
+                new[value] += 1
+        return new
+
+    def device_breakdown(self):
+        devices = {device: [count, len(macs), time_sum, time_count]
+                   for device, (count, macs, time_sum, time_count) in self._archived_scan()['devices'].items()}
+        for row in self.live.values('device_type').annotate(
+            count=Count('id'), time_sum=Sum('time_on_page'), time_count=Count('time_on_page'),
+        ):
+            device = devices.setdefault(row['device_type'], [0, 0, 0, 0])
+            device[0] += row['count']
+            device[2] += row['time_sum'] or 0
+            device[3] += row['time_count']
+        for device, new in self._live_new_devices('device_type').items():
+            devices[device][1] += new
+        result = [{
+            'device_type': device,
+            'count': count,
+            'unique_users': unique,
+            'total_impressions': count,
+            'avg_time': time_sum / time_count if time_count else None,
+        } for device, (count, unique, time_sum, time_count) in devices.items()]
+        return sorted(result, key=lambda item: -item['count'])
+
+    def hotspot_breakdown(self):
+        hotspots = {name: [count, len(macs)] for name, (count, macs) in self._archived_scan()['hotspots'].items()}
+        for row in self.live.values('hotspot_name').annotate(count=Count('id')):
+            hotspots.setdefault(row['hotspot_name'], [0, 0])[0] += row['count']
+        for name, new in self._live_new_devices('hotspot_name').items():
+            hotspots[name][1] += new
+        result = [{
+            'hotspot_name': name,
+            'impressions': count,
+            'unique_devices': unique,
+        } for name, (count, unique) in hotspots.items()]
+        return sorted(result, key=lambda item: -item['impressions'])
+
+    def daily(self):
+        """[{'date', 'total', 'unique'}] by local date, ascending"""
+        days = defaultdict(lambda: [0, 0])
+        for (day, _), hour in self._archived_hours().items():
+            days[day][0] += hour[0]
+        for day, macs in self._archived_scan()['days'].items():
+            days[day][1] = len(macs)
+        # Archived months are excluded from the live rows: their days never overlap
+        for row in self.live.values('local_date').annotate(
+            total=Count('id'), unique=Count('mac_hash', distinct=True),
+        ):
+            days[row['local_date']] = [row['total'], row['unique']]
+        return [{'date': day, 'total': total, 'unique': unique} for day, (total, unique) in sorted(days.items())]
+
+    def hourly(self):
+        """[{'hour', 'count'}] by local hour (aware datetime), ascending"""
+        hours = Counter({key: hour[0] for key, hour in self._archived_hours().items()})
+        for row in self.live.values('local_date', 'local_hour').annotate(count=Count('id')):
+            hours[(row['local_date'], row['local_hour'])] += row['count']
+        return [{'hour': _hour_start(*key), 'count': count} for key, count in sorted(hours.items())]
+
+    def recent(self, limit):
+        rows = list(self.live.order_by('-viewed_at').values(*STATS_COLUMNS)[:limit])
+        if len(rows) < limit:
+            # Archived rows are older than every live row of the range
+            columns = ('hotspot_name',) + tuple(name for name in STATS_COLUMNS if name != 'hotspot_name')
+            when = columns.index('viewed_at')
+            newest = heapq.nlargest(limit - len(rows), self._archived(columns), key=lambda row: row[when])
+            rows += [dict(zip(columns, row)) for row in newest]
+        return [{name: row[name] for name in STATS_COLUMNS} for row in rows]
@@ -0,0 +1,211 @@
+"""
+Hourly traffic rollups (HourlyTraffic) and the day-of-week × hour heatmap.
+
+_record_impression calls record() for every impression, in the same
+transaction as the insert, so HourlyTraffic is always current: one row per
+(hotspot_name, local date, local hour) with the impression count, devices
+first seen that day at that hotspot ("unique", i.e. is_unique_today) and
+time_on_page totals.
+
+/api/traffic-heatmap/ reads only these rows — at most 24 per hotspot per
+day — so a year across every hotspot is a few thousand rows instead of a scan
+of every impression, and months moved out by archive_impressions stay covered
+after their raw rows are gone.
+
+rebuild() recomputes a date range from PageImpression and, for archived
+months, from the archive files: `python manage.py rebuild_hourly_traffic`.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from . import retention
+from .models import HourlyTraffic, PageImpression
+from .partitions import add_months, month_start
+
+logger = logging.getLogger(__name__)
+
+WEEKDAYS = ('จันทร์', 'อังคาร', 'พุธ', 'พฤหัสบดี', 'ศุกร์', 'เสาร์', 'อาทิตย์')  # date.weekday() order
+SERIES_MAX_DAYS = 366  # the per-hour series is dense: 24 values per day
+
+
+# ===============================================
+# Ingest
+# ===============================================
+
+def record(hotspot_name, day, hour, is_unique, time_on_page=None):
+    """Add one impression to its (hotspot, local date, hour) row"""
+    time_on_page = int(time_on_page) if time_on_page is not None else None
+    increments = {'impressions': F('impressions') + 1}
+    if is_unique:
+        increments['unique_devices'] = F('unique_devices') + 1
+    if time_on_page is not None:
+        increments['total_time_on_page'] = F('total_time_on_page') + time_on_page
+        increments['time_on_page_count'] = F('time_on_page_count') + 1
+
+    row = HourlyTraffic.objects.filter(hotspot_name=hotspot_name, date=day, hour=hour)
+    if row.update(**increments):
+        return
+    try:
+        with transaction.atomic():
+            HourlyTraffic.objects.create(
+                hotspot_name=hotspot_name,
+                date=day,
+                hour=hour,
+                impressions=1,
+                unique_devices=1 if is_unique else 0,
+                total_time_on_page=time_on_page or 0,
+                time_on_page_count=0 if time_on_page is None else 1,
+            )
+    except IntegrityError:  # another process created the row between the UPDATE and the INSERT
+        row.update(**increments)
+
+
+# ===============================================
+# Rebuild
+# ===============================================
+
+def _empty():
+    return {'impressions': 0, 'unique_devices': 0, 'total_time_on_page': 0, 'time_on_page_count': 0}
+
+
+def _archived_groups(start_date, end_date, months):
+    groups = defaultdict(_empty)
+    for month in months:
+        for name, viewed_at, is_unique, seconds in retention.iter_archive(month, retention.HOURLY_COLUMNS):
+            local = timezone.localtime(viewed_at)
+            if not (start_date <= local.date() <= end_date):
+                continue
+            group = groups[(name, local.date(), local.hour)]
+            group['impressions'] += 1
+            group['unique_devices'] += 1 if is_unique else 0
+            if seconds is not None:
+                group['total_time_on_page'] += seconds
+                group['time_on_page_count'] += 1
+    return groups
+
+
+def rebuild(start_date, end_date):
+    """
+    Recompute HourlyTraffic for local dates start_date..end_date (inclusive);
+    returns the number of rows written. A month with an archive file is taken
+    from the file alone: it holds every row of the month, including any still
+    in the database (--keep-rows, interrupted deletes).
+    """
+    archived = [m for m in retention.archived_months() if start_date < add_months(m, 1) and m <= end_date]
+    groups = _archived_groups(start_date, end_date, archived)
+
+    live = PageImpression.objects.filter(local_date__gte=start_date, local_date__lte=end_date)
+    for month in archived:
+        live = live.exclude(local_date__gte=month, local_date__lt=add_months(month, 1))
+
+    # Delete first: on SQLite that takes the write lock, so no impression is
+    # recorded between the aggregate below and the insert
+    with transaction.atomic():
+        HourlyTraffic.objects.filter(date__gte=start_date, date__lte=end_date).delete()
+        rows = live.order_by().values('hotspot_name', 'local_date', 'local_hour').annotate(
+            impressions=Count('id'),
+            unique_devices=Count('id', filter=Q(is_unique_today=True)),
+            total_time_on_page=Sum('time_on_page'),
+            time_on_page_count=Count('time_on_page'),
+        )
+        for row in rows:
+            group = groups[(row['hotspot_name'], row['local_date'], row['local_hour'])]
+            group['impressions'] += row['impressions']
+            group['unique_devices'] += row['unique_devices']
+            group['total_time_on_page'] += row['total_time_on_page'] or 0
+            group['time_on_page_count'] += row['time_on_page_count']
+        HourlyTraffic.objects.bulk_create([
+            HourlyTraffic(hotspot_name=name, date=day, hour=hour, **values)
+            for (name, day, hour), values in groups.items()
+        ], batch_size=500)
+    logger.info(f"[Rollups] Rebuilt hourly traffic {start_date} - {end_date}: {len(groups)} rows")
+    return len(groups)
+
+
+def first_date():
+    """Earliest local date with impressions in the database or the archives, or None"""
+    dates = retention.archived_months()[:1]
+    oldest = PageImpression.objects.order_by('local_date').values_list('local_date', flat=True).first()
+    if oldest is not None:
+        dates.append(oldest)
+    return min(dates) if dates else None
+
+
+def month_ranges(start_date, end_date):
+    """(first, last) local dates of each month overlapping start_date..end_date"""
+    month = month_start(start_date)
+    while month <= end_date:
+        following = add_months(month, 1)
+        yield max(month, start_date), min(following - timedelta(days=1), end_date)
+        month = following
+
+
+# ===============================================
+# Heatmap / series
+# ===============================================
+
+def hourly_totals(start_date, end_date, hotspot_names=None, allowed=None):
+    """{(date, hour): {'impressions', 'unique'}} summed over the selected hotspots"""
+    queryset = HourlyTraffic.objects.filter(date__gte=start_date, date__lte=end_date)
+    if allowed is not None:
+        queryset = queryset.filter(hotspot_name__in=allowed)
+    if hotspot_names:
+        queryset = queryset.filter(hotspot_name__in=hotspot_names)
+    rows = queryset.order_by().values('date', 'hour').annotate(
+        impressions=Sum('impressions'),
+        unique=Sum('unique_devices'),
+    )
+    return {(row['date'], row['hour']): {'impressions': row['impressions'], 'unique': row['unique']} for row in rows}
+
+
+def heatmap(totals, start_date, end_date):
+    """7×24 grids (Monday first): total impressions and the average per occurrence of that weekday in the range"""
+    weeks, rest = divmod((end_date - start_date).days + 1, 7)
+    occurrences = [weeks + (1 if (weekday - start_date.weekday()) % 7 < rest else 0) for weekday in range(7)]
+
+    impressions = [[0] * 24 for _ in range(7)]
+    unique = [[0] * 24 for _ in range(7)]
+    for (day, hour), values in totals.items():
+        impressions[day.weekday()][hour] += values['impressions']
+        unique[day.weekday()][hour] += values['unique']
+    average = [
+        [round(count / occurrences[weekday], 1) if occurrences[weekday] else 0 for count in impressions[weekday]]
+        for weekday in range(7)
+    ]
+
+    peak = max(((weekday, hour) for weekday in range(7) for hour in range(24)), key=lambda cell: average[cell[0]][cell[1]])
+    return {
+        'weekdays': list(WEEKDAYS),
+        'hours': list(range(24)),
+        'impressions': impressions,
+        'unique': unique,
+        'average': average,
+        'weekday_occurrences': occurrences,
+        'max_average': average[peak[0]][peak[1]],
+        'peak': {
+            'weekday': peak[0],
+            'weekday_name': WEEKDAYS[peak[0]],
+            'hour': peak[1],
+            'average_impressions': average[peak[0]][peak[1]],
+        } if average[peak[0]][peak[1]] else None,
+        'hour_totals': [sum(impressions[weekday][hour] for weekday in range(7)) for hour in range(24)],
+        'weekday_totals': [sum(row) for row in impressions],
+    }
+
+
+def series(totals, start_date, end_date):
+    """Per-hour series, zero-filled: one 24-value row per local date, oldest first"""
+    dates, impressions, unique = [], [], []
+    day = start_date
+    while day <= end_date:
+        dates.append(day.isoformat())
+        impressions.append([totals[(day, hour)]['impressions'] if (day, hour) in totals else 0 for hour in range(24)])
+        unique.append([totals[(day, hour)]['unique'] if (day, hour) in totals else 0 for hour in range(24)])
+        day += timedelta(days=1)
+    return {'dates': dates, 'impressions': impressions, 'unique': unique}
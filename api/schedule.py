@@ -0,0 +1,88 @@
+"""
+Schedule index for content publishing windows (ScheduledContent.starts_at /
+ends_at in api/models.py).
+
+The public endpoints never filter by time per request: they serve cached
+payloads (api/fastpath.py, the landing URL cache), and a payload is only
+rebuilt, with ScheduleQuerySet.live(), on a cache fill. What keeps windows
+exact is the cache lifetime: cache_timeout() cuts it short at the hotspot's
+next window boundary, so the entry expires the moment a scheduled row starts
+or ends and the next request rebuilds it.
+
+The index maps each hotspot ('' for default content, which every hotspot
+falls back to) to its next boundary. It is built in one query per model from
+active rows with a boundary still ahead, kept per process, and rebuilt when
+the public content version changes (any content edit, api/signals.py), when
+its earliest boundary passes, or after INDEX_MAX_AGE seconds.
+"""
+
+import logging
+import math
+import threading
+import time
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import BackgroundImage, CardContent, LandingPageURL, SlideContent, TemplateConfig
+
+logger = logging.getLogger(__name__)
+
+SCHEDULED_MODELS = (BackgroundImage, SlideContent, CardContent, TemplateConfig, LandingPageURL)
+INDEX_MAX_AGE = 300  # seconds; also covers edits that bypass signals (queryset.update())
+
+_lock = threading.Lock()
+_state = {'version': None, 'valid_until': 0.0, 'index': {}}
+
+
+def build_index(now=None):
+    """{hotspot_name or '': next boundary (epoch seconds)} over active rows"""
+    now = now or timezone.now()
+    index = {}
+    for model in SCHEDULED_MODELS:
+        rows = model.objects.filter(
+            Q(starts_at__gt=now) | Q(ends_at__gt=now), is_active=True,
+        ).values_list('hotspot_name', 'starts_at', 'ends_at')
+        for hotspot_name, starts_at, ends_at in rows:
+            key = hotspot_name or ''
+            for boundary in (starts_at, ends_at):
+                if boundary and boundary > now:
+                    index[key] = min(index.get(key, math.inf), boundary.timestamp())
+    return index
+
+
+def _index():
+    from .fastpath import content_version  # fastpath imports views, which imports this module
+
+    version = content_version()
+    now = time.time()
+    with _lock:
+        if _state['version'] == version and now < _state['valid_until']:
+            return _state['index']
+        index = build_index()
+        _state.update(
+            version=version,
+            valid_until=min(now + INDEX_MAX_AGE, min(index.values(), default=math.inf)),
+            index=index,
+        )
+    if index:
+        logger.debug(f"[Schedule] Index rebuilt: {len(index)} hotspots with upcoming boundaries")
+    return index
+
+
+def next_transition(hotspot_name):
+    """Epoch seconds of the next window boundary affecting hotspot_name, or None"""
+    index = _index()
+    boundary = min(index.get(hotspot_name or '', math.inf), index.get('', math.inf))
+    return None if boundary == math.inf else boundary
+
+
+def cache_timeout(hotspot_name, timeout):
+    """
+    Seconds a public response for hotspot_name may be cached: timeout, cut
+    short (rounded down) at the next window boundary. 0 means do not cache.
+    """
+    boundary = next_transition(hotspot_name)
+    if boundary is None:
+        return timeout
+    return max(0, min(timeout, int(boundary - time.time())))
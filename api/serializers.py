@@ -1,6 +1,8 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth.models import User
 from .models import BackgroundImage, SystemSettings, TemplateConfig, SlideContent, CardContent, Hotspot, LandingPageURL, PageImpression
+from .traffic_monitor import monitor as traffic_monitor
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -11,14 +13,26 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
-class BackgroundImageSerializer(serializers.ModelSerializer):
+class ScheduleWindowMixin:
+    """Publishing window check for ScheduledContent models (starts_at / ends_at)"""
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        starts_at = attrs.get('starts_at', getattr(self.instance, 'starts_at', None))
+        ends_at = attrs.get('ends_at', getattr(self.instance, 'ends_at', None))
+        if starts_at and ends_at and ends_at <= starts_at:
+            raise serializers.ValidationError({'ends_at': 'เวลาสิ้นสุดต้องอยู่หลังเวลาเริ่มต้น'})
+        return attrs
+
+
+class BackgroundImageSerializer(ScheduleWindowMixin, serializers.ModelSerializer):
     """Serializer for BackgroundImage model"""
     uploaded_by = UserSerializer(read_only=True)
     image_url = serializers.SerializerMethodField()
 
     class Meta:
         model = BackgroundImage
-        fields = ['id', 'title', 'image', 'image_url', 'hotspot_name', 'is_active',
+        fields = ['id', 'title', 'image', 'image_url', 'hotspot_name', 'is_active', 'starts_at', 'ends_at',
                   'uploaded_by', 'uploaded_at', 'updated_at']
         read_only_fields = ['id', 'uploaded_at', 'updated_at']
 
@@ -30,11 +44,11 @@ class BackgroundImageSerializer(serializers.ModelSerializer):
         return None
 
 
-class BackgroundImageUploadSerializer(serializers.ModelSerializer):
+class BackgroundImageUploadSerializer(ScheduleWindowMixin, serializers.ModelSerializer):
     """Serializer for uploading background images"""
     class Meta:
         model = BackgroundImage
-        fields = ['title', 'image', 'hotspot_name', 'is_active']
+        fields = ['title', 'image', 'hotspot_name', 'is_active', 'starts_at', 'ends_at']
 
 
 class HotspotSerializer(serializers.ModelSerializer):
@@ -43,25 +57,40 @@ class HotspotSerializer(serializers.ModelSerializer):
     status = serializers.ReadOnlyField()
     status_icon = serializers.ReadOnlyField()
     last_impression_at = serializers.SerializerMethodField()
+    traffic = serializers.SerializerMethodField()
 
     class Meta:
         model = Hotspot
         fields = ['id', 'hotspot_name', 'display_name', 'description', 'is_active',
                   'folder_exists', 'login_file_exists', 'config_matched', 'last_checked',
                   'has_active_background', 'has_active_template', 'has_landing_url',
-                  'last_impression_at',
+                  'last_impression_at', 'traffic',
                   'status', 'status_icon', 'created_by', 'created_at', 'updated_at']
         read_only_fields = ['id', 'folder_exists', 'login_file_exists', 'config_matched',
                             'last_checked', 'has_active_background', 'has_active_template',
-                            'has_landing_url', 'last_impression_at',
+                            'has_landing_url', 'last_impression_at', 'traffic',
                             'created_at', 'updated_at', 'status', 'status_icon']
 
     def get_last_impression_at(self, obj):
+        # A single process sees every impression: the traffic monitor knows the latest one
+        if settings.WAITRESS_WORKERS == 1:
+            last_seen = traffic_monitor.last_seen(obj.hotspot_name)
+            if last_seen is not None:
+                return last_seen
         impression = PageImpression.objects.filter(
             hotspot_name=obj.hotspot_name
         ).values('viewed_at').order_by('-viewed_at').first()
         return impression['viewed_at'] if impression else None
 
+    def get_traffic(self, obj):
+        """
+        Live traffic state (api/traffic_monitor.py): ok / silent / spike / learning; None if inactive.
+        per_worker is true with WAITRESS_WORKERS > 1: the state covers the answering worker's share only.
+        """
+        if not obj.is_active:
+            return None
+        return traffic_monitor.status(obj.hotspot_name)
+
 
 class HotspotChoiceSerializer(serializers.Serializer):
     """Serializer for hotspot choices (for dropdowns)"""
@@ -89,7 +118,7 @@ class SystemSettingsSerializer(serializers.ModelSerializer):
         return None
 
 
-class TemplateConfigSerializer(serializers.ModelSerializer):
+class TemplateConfigSerializer(ScheduleWindowMixin, serializers.ModelSerializer):
     """Serializer for TemplateConfig model"""
     created_by = UserSerializer(read_only=True)
     component_display = serializers.CharField(source='get_left_panel_component_display', read_only=True)
@@ -97,11 +126,11 @@ class TemplateConfigSerializer(serializers.ModelSerializer):
     class Meta:
         model = TemplateConfig
         fields = ['id', 'template_name', 'left_panel_component', 'component_display',
-                  'hotspot_name', 'is_active', 'created_by', 'created_at', 'updated_at']
+                  'hotspot_name', 'is_active', 'starts_at', 'ends_at', 'created_by', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class SlideContentSerializer(serializers.ModelSerializer):
+class SlideContentSerializer(ScheduleWindowMixin, serializers.ModelSerializer):
     """Serializer for SlideContent model"""
     created_by = UserSerializer(read_only=True)
     icon_image_url = serializers.SerializerMethodField()
@@ -110,7 +139,7 @@ class SlideContentSerializer(serializers.ModelSerializer):
     class Meta:
         model = SlideContent
         fields = ['id', 'icon', 'icon_image', 'icon_image_url', 'title', 'description',
-                  'hotspot_name', 'order', 'is_active',
+                  'hotspot_name', 'order', 'is_active', 'starts_at', 'ends_at',
                   'show_title', 'show_description',
                   'image_size', 'image_size_display',
                   'show_link', 'link_url', 'link_text',
@@ -125,7 +154,7 @@ class SlideContentSerializer(serializers.ModelSerializer):
         return None
 
 
-class CardContentSerializer(serializers.ModelSerializer):
+class CardContentSerializer(ScheduleWindowMixin, serializers.ModelSerializer):
     """Serializer for CardContent model"""
     created_by = UserSerializer(read_only=True)
     icon_image_url = serializers.SerializerMethodField()
@@ -133,7 +162,7 @@ class CardContentSerializer(serializers.ModelSerializer):
     class Meta:
         model = CardContent
         fields = ['id', 'icon', 'icon_image', 'icon_image_url', 'title', 'description',
-                  'hotspot_name', 'order', 'is_active', 'created_by', 'created_at', 'updated_at']
+                  'hotspot_name', 'order', 'is_active', 'starts_at', 'ends_at', 'created_by', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
 
     def get_icon_image_url(self, obj):
@@ -153,13 +182,13 @@ class TemplateConfigFullSerializer(serializers.Serializer):
     background = serializers.DictField(required=False)
 
 
-class LandingPageURLSerializer(serializers.ModelSerializer):
+class LandingPageURLSerializer(ScheduleWindowMixin, serializers.ModelSerializer):
     """Serializer for LandingPageURL model"""
     created_by = UserSerializer(read_only=True)
 
     class Meta:
         model = LandingPageURL
-        fields = ['id', 'title', 'url', 'hotspot_name', 'is_active',
+        fields = ['id', 'title', 'url', 'hotspot_name', 'is_active', 'starts_at', 'ends_at',
                   'redirect_count', 'last_redirected_at', 'priority',
                   'created_by', 'created_at', 'updated_at']
         read_only_fields = ['id', 'redirect_count', 'last_redirected_at', 'created_at', 'updated_at']
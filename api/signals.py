@@ -0,0 +1,29 @@
+"""
+Cache invalidation for public content.
+
+Any save/delete of content served to MikroTik login pages bumps the public
+content version, which invalidates every cached fast-path response
+(api/fastpath.py) at once.
+"""
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import BackgroundImage, SlideContent, CardContent, TemplateConfig, LandingPageURL
+from .fastpath import bump_content_version
+
+PUBLIC_CONTENT_MODELS = (BackgroundImage, SlideContent, CardContent, TemplateConfig, LandingPageURL)
+
+# LandingPageURL analytics counters are updated on cache fill — must not invalidate
+COUNTER_FIELDS = frozenset({'redirect_count', 'last_redirected_at'})
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_public_content(sender, **kwargs):
+    if sender not in PUBLIC_CONTENT_MODELS:
+        return
+    update_fields = kwargs.get('update_fields')
+    if update_fields and frozenset(update_fields) <= COUNTER_FIELDS:
+        return
+    bump_content_version()
@@ -0,0 +1,305 @@
+"""
+Streaming per-hotspot traffic monitor: flags hotspots that go silent (e.g. a
+broken login page quietly stops producing impressions) or spike.
+
+track_impression calls monitor.observe() for every recorded impression. Per
+hotspot the monitor keeps, in memory:
+  - last_seen: time of the latest impression
+  - an exponentially weighted impression rate (time constant
+    TRAFFIC_MONITOR_WINDOW seconds)
+  - an hour-of-week baseline (168 slots) of expected impressions per hour,
+    seeded once per process from the HourlyTraffic rollups of the last
+    TRAFFIC_BASELINE_WEEKS weeks, then learned online: every completed hour
+    is folded into its slot (a mean over the slot's first weeks, then an EWMA
+    with weight 1 / TRAFFIC_BASELINE_WEEKS); hours spent silent or spiking
+    are not learned
+
+Reading a state never queries the database:
+  - silent:   no impression for TRAFFIC_SILENT_MIN_MINUTES while the baseline
+              expected at least TRAFFIC_SILENT_EXPECTED of them (a working
+              hotspot stays that quiet with probability < e^-N)
+  - spike:    EWMA rate >= TRAFFIC_SPIKE_FACTOR x the expected rate, with at
+              least TRAFFIC_SPIKE_MIN impressions per window
+  - learning: some hour of the week has no baseline yet for this hotspot
+  - ok
+
+State is per process. With WAITRESS_WORKERS > 1 each worker sees about
+1/WAITRESS_WORKERS of the impressions, so the seeded baseline is scaled down
+by that factor and the rules above hold for each worker's share. Payloads
+say so: status() carries per_worker, and scope() names the answering worker.
+
+Shown by HotspotSerializer (`traffic`), /api/health/ and /metrics/.
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+
+from backend.metrics import HOTSPOT_TRAFFIC_TRANSITIONS
+
+logger = logging.getLogger(__name__)
+
+WINDOW = getattr(settings, 'TRAFFIC_MONITOR_WINDOW', 900)
+BASELINE_WEEKS = getattr(settings, 'TRAFFIC_BASELINE_WEEKS', 4)
+SILENT_EXPECTED = getattr(settings, 'TRAFFIC_SILENT_EXPECTED', 8)
+SILENT_MIN_SECONDS = getattr(settings, 'TRAFFIC_SILENT_MIN_MINUTES', 15) * 60
+SPIKE_FACTOR = getattr(settings, 'TRAFFIC_SPIKE_FACTOR', 3)
+SPIKE_MIN = getattr(settings, 'TRAFFIC_SPIKE_MIN', 20)
+
+STATES = ('ok', 'silent', 'spike', 'learning')
+HOURS_PER_WEEK = 168
+MAX_HOTSPOTS = 500  # hotspot_name comes from the login page: bound the memory
+SEED_RETRY_SECONDS = 300
+ACTIVE_HOTSPOTS_TTL = 60
+
+
+def _local_hour(ts):
+    """(local hour index, hour-of-week slot, start of the next local hour as a timestamp)"""
+    local = timezone.localtime(datetime.fromtimestamp(ts, tz=dt_timezone.utc))
+    hour_start = local.replace(minute=0, second=0, microsecond=0)
+    return (
+        local.toordinal() * 24 + local.hour,
+        local.weekday() * 24 + local.hour,
+        (hour_start + timedelta(hours=1)).timestamp(),
+    )
+
+
+class _HotspotTraffic:
+    __slots__ = ('last_seen', 'rate', 'rate_at', 'hour', 'hour_count', 'hour_partial',
+                 'baseline', 'samples', 'state', 'state_since')
+
+    def __init__(self, now):
+        self.last_seen = None
+        self.rate = 0.0  # impressions per second at rate_at
+        self.rate_at = now
+        self.hour = None
+        self.hour_count = 0
+        self.hour_partial = True  # the process started during this hour: don't learn it
+        self.baseline = None
+        self.samples = None  # hours learned per slot
+        self.state = 'learning'
+        self.state_since = now
+
+    def rate_at_time(self, now):
+        return self.rate * math.exp(-(now - self.rate_at) / WINDOW)
+
+
+class TrafficMonitor:
+
+    def __init__(self, workers=None):
+        self.workers = max(1, workers or getattr(settings, 'WAITRESS_WORKERS', 1))
+        self.started_at = time.time()
+        self._hotspots = {}
+        self._lock = threading.Lock()
+        self._seeded = False
+        self._seed_attempted_at = None
+
+    # -----------------------------------------------
+    # Baseline
+    # -----------------------------------------------
+
+    def scope(self):
+        """Which process answered: states differ between workers when per_worker is true"""
+        return {'per_worker': self.workers > 1, 'workers': self.workers, 'pid': os.getpid()}
+
+    def _seed(self, now):
+        """Hour-of-week baselines from the HourlyTraffic rollups (once per process)"""
+        if self._seeded or (self._seed_attempted_at and now - self._seed_attempted_at < SEED_RETRY_SECONDS):
+            return
+        self._seed_attempted_at = now
+        from .models import HourlyTraffic
+
+        today = timezone.localdate()
+        try:
+            rows = list(HourlyTraffic.objects.filter(
+                date__gte=today - timedelta(days=7 * BASELINE_WEEKS), date__lt=today
+            ).values_list('hotspot_name', 'date', 'hour', 'impressions'))
+        except Exception as e:
+            logger.warning(f"[Traffic] Baseline seed failed: {e}")
+            return
+
+        slots = defaultdict(lambda: [0.0] * HOURS_PER_WEEK)
+        for name, day, hour, impressions in rows:
+            slots[name][day.weekday() * 24 + hour] += impressions / (BASELINE_WEEKS * self.workers)
+        with self._lock:
+            for name, baseline in slots.items():
+                hotspot = self._get(name, now)
+                if hotspot is not None and hotspot.baseline is None:
+                    hotspot.baseline = baseline
+                    hotspot.samples = [BASELINE_WEEKS] * HOURS_PER_WEEK
+            self._seeded = True
+        logger.info(f"[Traffic] Baseline seeded for {len(slots)} hotspots from {len(rows)} hourly rollups")
+
+    def _learn(self, hotspot, hour_index, count):
+        slot = self._slot_of_index(hour_index)
+        if hotspot.baseline is None:
+            hotspot.baseline, hotspot.samples = [0.0] * HOURS_PER_WEEK, [0] * HOURS_PER_WEEK
+        # Plain mean for a slot's first weeks, then an EWMA over BASELINE_WEEKS
+        hotspot.samples[slot] += 1
+        weight = 1 / min(hotspot.samples[slot], BASELINE_WEEKS)
+        hotspot.baseline[slot] += weight * (count - hotspot.baseline[slot])
+
+    @staticmethod
+    def _slot_of_index(hour_index):
+        ordinal, hour = divmod(hour_index, 24)
+        return ((ordinal - 1) % 7) * 24 + hour  # ordinal 1 (0001-01-01) is a Monday
+
+    def _advance(self, hotspot, hour_index):
+        """Close the hours that ended since the last update and learn them"""
+        if hotspot.hour is None:
+            hotspot.hour = hour_index
+            return
+        if hour_index <= hotspot.hour:
+            return
+        if hotspot.state in ('ok', 'learning'):
+            if not hotspot.hour_partial:
+                self._learn(hotspot, hotspot.hour, hotspot.hour_count)
+            # Hours without a single impression (nothing called observe())
+            for skipped in range(hotspot.hour + 1, min(hour_index, hotspot.hour + 1 + HOURS_PER_WEEK)):
+                self._learn(hotspot, skipped, 0)
+        hotspot.hour, hotspot.hour_count, hotspot.hour_partial = hour_index, 0, False
+
+    # -----------------------------------------------
+    # State
+    # -----------------------------------------------
+
+    def _expected_between(self, hotspot, start, end):
+        """Impressions the baseline expects in [start, end) (capped at one week of hours)"""
+        expected, t = 0.0, start
+        for _ in range(HOURS_PER_WEEK + 1):
+            if t >= end:
+                break
+            _, slot, next_hour = _local_hour(t)
+            segment_end = min(next_hour, end)
+            expected += hotspot.baseline[slot] * (segment_end - t) / 3600
+            t = segment_end
+        return expected
+
+    def _evaluate(self, name, hotspot, now):
+        if hotspot.baseline is None or min(hotspot.samples) == 0:
+            state = 'learning'
+        else:
+            _, slot, _ = _local_hour(now)
+            expected_rate = hotspot.baseline[slot] / 3600
+            rate = hotspot.rate_at_time(now)
+            quiet_since = max(hotspot.last_seen or 0, self.started_at)
+            if now - quiet_since >= SILENT_MIN_SECONDS and self._expected_between(hotspot, quiet_since, now) >= SILENT_EXPECTED:
+                state = 'silent'
+            elif rate * WINDOW >= SPIKE_MIN and rate >= SPIKE_FACTOR * expected_rate:
+                state = 'spike'
+            else:
+                state = 'ok'
+
+        if state != hotspot.state:
+            log = logger.warning if state in ('silent', 'spike') else logger.info
+            log(f"[Traffic] {name}: {hotspot.state} -> {state}")
+            HOTSPOT_TRAFFIC_TRANSITIONS.labels(state).inc()
+            hotspot.state, hotspot.state_since = state, now
+        return state
+
+    def _get(self, name, now):
+        hotspot = self._hotspots.get(name)
+        if hotspot is None and len(self._hotspots) < MAX_HOTSPOTS:
+            hotspot = self._hotspots[name] = _HotspotTraffic(now)
+        return hotspot
+
+    # -----------------------------------------------
+    # Public API
+    # -----------------------------------------------
+
+    def observe(self, hotspot_name, now=None):
+        """Record one impression (called by track_impression after the row is written)"""
+        now = now or time.time()
+        self._seed(now)
+        hour_index, _, _ = _local_hour(now)
+        with self._lock:
+            hotspot = self._get(hotspot_name, now)
+            if hotspot is None:
+                return
+            self._advance(hotspot, hour_index)
+            hotspot.rate = hotspot.rate_at_time(now) + 1 / WINDOW
+            hotspot.rate_at = now
+            hotspot.last_seen = now
+            hotspot.hour_count += 1
+            self._evaluate(hotspot_name, hotspot, now)
+
+    def status(self, hotspot_name, now=None):
+        """{'state', 'since', 'last_seen', 'idle_seconds', 'rate_per_hour', 'expected_per_hour', 'per_worker'} — no database queries"""
+        now = now or time.time()
+        self._seed(now)
+        hour_index, slot, _ = _local_hour(now)
+        with self._lock:
+            hotspot = self._get(hotspot_name, now)
+            if hotspot is None:
+                return None
+            self._advance(hotspot, hour_index)
+            state = self._evaluate(hotspot_name, hotspot, now)
+            return {
+                'state': state,
+                'since': _isoformat(hotspot.state_since),
+                'last_seen': _isoformat(hotspot.last_seen),
+                'idle_seconds': round(now - hotspot.last_seen) if hotspot.last_seen else None,
+                'rate_per_hour': round(hotspot.rate_at_time(now) * 3600, 1),
+                'expected_per_hour': round(hotspot.baseline[slot], 1) if hotspot.baseline else None,
+                'per_worker': self.workers > 1,  # this worker's share of the traffic only
+            }
+
+    def last_seen(self, hotspot_name):
+        """Time of the latest impression this process recorded for the hotspot, or None"""
+        hotspot = self._hotspots.get(hotspot_name)
+        return _datetime(hotspot.last_seen) if hotspot and hotspot.last_seen else None
+
+    def snapshot(self, hotspot_names=None, now=None):
+        """{hotspot_name: status} for the given hotspots (default: active Hotspot rows)"""
+        names = active_hotspots() if hotspot_names is None else hotspot_names
+        return {name: status for name in names if (status := self.status(name, now)) is not None}
+
+
+def _datetime(ts):
+    return timezone.localtime(datetime.fromtimestamp(ts, tz=dt_timezone.utc))
+
+
+def _isoformat(ts):
+    return _datetime(ts).isoformat() if ts else None
+
+
+_active = {'names': (), 'loaded_at': 0.0}
+
+
+def active_hotspots():
+    """Names of active Hotspot rows (cached ACTIVE_HOTSPOTS_TTL seconds)"""
+    if time.monotonic() - _active['loaded_at'] > ACTIVE_HOTSPOTS_TTL:
+        from .models import Hotspot
+        try:
+            _active['names'] = tuple(Hotspot.objects.filter(is_active=True).values_list('hotspot_name', flat=True))
+        except Exception:
+            pass
+        _active['loaded_at'] = time.monotonic()
+    return _active['names']
+
+
+def metric_samples(field):
+    """Labelled gauge values for backend.metrics (state / rate / expected / seconds since last impression)"""
+    now = time.time()
+    samples = {}
+    for name, status in monitor.snapshot(now=now).items():
+        if field == 'state':
+            for state in STATES:
+                samples[(name, state)] = 1 if status['state'] == state else 0
+        elif field == 'rate':
+            samples[(name,)] = status['rate_per_hour']
+        elif field == 'expected' and status['expected_per_hour'] is not None:
+            samples[(name,)] = status['expected_per_hour']
+        elif field == 'idle' and status['idle_seconds'] is not None:
+            samples[(name,)] = status['idle_seconds']
+    return samples
+
+
+monitor = TrafficMonitor()
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
@@ -10,21 +11,36 @@ from .views import (
     impression_statistics,
     media_reach_report,
     export_reach_report_pdf,
+    export_impressions,
+    traffic_heatmap,
+    live_stream,
+    live_poll,
     health_check,
     BackgroundImageViewSet,
     SystemSettingsViewSet,
     UserViewSet,
     SlideContentViewSet,
+    CardContentViewSet,
     HotspotViewSet,
     LandingPageURLViewSet
 )
 
+# Hot public endpoints: cached pre-encoded JSON (api/fastpath.py) or the DRF views
+if settings.PUBLIC_API_FAST_PATH:
+    from .fastpath import (
+        fast_get_background_image as get_background_image,
+        fast_get_slide_content as get_slide_content,
+        fast_get_template_config as get_template_config,
+        fast_get_landing_url as get_landing_url,
+    )
+
 # Create router for viewsets
 router = DefaultRouter()
 router.register(r'backgrounds', BackgroundImageViewSet, basename='background')
 router.register(r'settings', SystemSettingsViewSet, basename='settings')
 router.register(r'users', UserViewSet, basename='user')
 router.register(r'slides', SlideContentViewSet, basename='slide')
+router.register(r'cards', CardContentViewSet, basename='card')
 router.register(r'hotspots', HotspotViewSet, basename='hotspot')
 router.register(r'landing-urls', LandingPageURLViewSet, basename='landing-url')
 
@@ -56,6 +72,16 @@ urlpatterns = [
     # Export media reach report as PDF
     path('export-reach-report-pdf/', export_reach_report_pdf, name='export-reach-report-pdf'),
 
+    # Day-of-week × hour heatmap + per-hour series from the HourlyTraffic rollups
+    path('traffic-heatmap/', traffic_heatmap, name='traffic-heatmap'),
+
+    # Raw impression export, streamed as CSV / NDJSON (authenticated, keyset-paginated)
+    path('impressions/export/', export_impressions, name='impression-export'),
+
+    # Live impression feed for the monitoring dashboard (SSE + long-poll fallback)
+    path('live/stream/', live_stream, name='live-stream'),
+    path('live/poll/', live_poll, name='live-poll'),
+
     # Health check (public)
     path('health/', health_check, name='health-check'),
 
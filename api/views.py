@@ -8,7 +8,9 @@ from django.core.exceptions import ValidationError
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.cache import cache_page
 from django.core.cache import cache
+from django.core import signing
 from .models import BackgroundImage, SystemSettings, SlideContent, TemplateConfig, CardContent, Hotspot, PageImpression, DailyReachStats, LandingPageURL, Department
+from django.db import transaction
 from .serializers import (
     BackgroundImageSerializer,
     BackgroundImageUploadSerializer,
@@ -24,11 +26,20 @@ from .serializers import (
 )
 import logging
 import hashlib
+import base64
+import binascii
+import csv
+import json
+import queue
+from backend.metrics import LANDING_URL_CACHE, IMPRESSIONS_INGESTED, PDF_RENDER
+from backend.sqlite import run_write
+from . import bulk_content, content_clone, live, retention, rollups, schedule
+from .traffic_monitor import monitor as traffic_monitor
 from django.utils import timezone
-from datetime import date, timedelta
-from django.db.models import Count, Avg, Sum, Q
-from django.db.models.functions import TruncDate, TruncHour
-from django.http import HttpResponse
+from collections import Counter
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from django.db.models import Count, Avg, Sum, Q, F
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -44,6 +55,12 @@ from django.conf import settings as django_settings
 
 # Configure logging
 logger = logging.getLogger(__name__)
+# Per-request messages on public endpoints — sampled by LOG_SAMPLING (backend/log_handlers.py),
+# use lazy %-style args so skipped records are never formatted
+hot_logger = logging.getLogger(f'{__name__}.hotpath')
+
+# Upper bound for impression-statistics ?limit= (the recent-impressions table)
+RECENT_IMPRESSIONS_MAX = 500
 
 
 def _get_allowed_hotspot_names(user):
@@ -95,7 +112,7 @@ def get_background_image(request):
     hotspot_name = request.GET.get('hotspot_name', None)
 
     try:
-        logger.info(f"[API] get_background_image called with hotspot_name={hotspot_name}")
+        hot_logger.info("[API] get_background_image called with hotspot_name=%s", hotspot_name)
 
         # Validate hotspot_name if provided
         if hotspot_name and len(hotspot_name) > 100:
@@ -109,23 +126,21 @@ def get_background_image(request):
 
         # Try to get active background for specific hotspot
         if hotspot_name:
-            background = BackgroundImage.objects.filter(
-                hotspot_name=hotspot_name,
-                is_active=True
+            background = BackgroundImage.objects.live().scheduled_first().filter(
+                hotspot_name=hotspot_name
             ).first()
 
             if background:
-                logger.info(f"[API] Found hotspot-specific background: {background.title}")
+                hot_logger.info("[API] Found hotspot-specific background: %s", background.title)
 
         # Fallback to default background (no hotspot_name)
         if not background:
-            background = BackgroundImage.objects.filter(
-                hotspot_name__isnull=True,
-                is_active=True
+            background = BackgroundImage.objects.live().scheduled_first().filter(
+                hotspot_name__isnull=True
             ).first()
 
             if background:
-                logger.info(f"[API] Using default background: {background.title}")
+                hot_logger.info("[API] Using default background: %s", background.title)
 
         if background:
             serializer = BackgroundImageSerializer(background, context={'request': request})
@@ -155,7 +170,33 @@ def get_background_image(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class BackgroundImageViewSet(viewsets.ModelViewSet):
+class BulkContentMixin:
+    """
+    POST <collection>/bulk_update/ with {"changes": [{"id", "order", "is_active"}, ...]}:
+    reorder / activate / deactivate many items in one transaction (api/bulk_content.py).
+    """
+
+    @action(detail=False, methods=['post'])
+    def bulk_update(self, request):
+        try:
+            updated, hotspots = bulk_content.apply_changes(
+                self.get_queryset(),
+                request.data.get('changes'),
+                _get_allowed_hotspot_names(request.user),
+            )
+        except ValueError as e:
+            return Response({
+                'success': False,
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'success': True,
+            'updated': updated,
+            'hotspots': hotspots,
+        })
+
+
+class BackgroundImageViewSet(BulkContentMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing background images
     Requires authentication. Non-staff users see only their department's hotspot images.
@@ -235,7 +276,7 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [IsAdminUser]
 
 
-class SlideContentViewSet(viewsets.ModelViewSet):
+class SlideContentViewSet(BulkContentMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing slide content (admin CRUD).
     All operations require authentication.
@@ -262,6 +303,31 @@ class SlideContentViewSet(viewsets.ModelViewSet):
         serializer.save(created_by=self.request.user)
 
 
+class CardContentViewSet(BulkContentMixin, viewsets.ModelViewSet):
+    """
+    ViewSet for managing card content (admin CRUD).
+    Same access rules as SlideContentViewSet.
+    """
+    serializer_class = CardContentSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        allowed = _get_allowed_hotspot_names(self.request.user)
+        if allowed is None:
+            return CardContent.objects.all()
+        return CardContent.objects.filter(
+            Q(hotspot_name__in=allowed) | Q(hotspot_name__isnull=True) | Q(hotspot_name='')
+        )
+
+    def perform_create(self, serializer):
+        """Set created_by when creating a card"""
+        hotspot_name = serializer.validated_data.get('hotspot_name')
+        allowed = _get_allowed_hotspot_names(self.request.user)
+        if allowed is not None and hotspot_name and hotspot_name not in allowed:
+            raise PermissionDenied("คุณไม่มีสิทธิ์จัดการ Hotspot นี้")
+        serializer.save(created_by=self.request.user)
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def get_slide_content(request):
@@ -275,22 +341,19 @@ def get_slide_content(request):
     try:
         # Get active slides for specific hotspot
         if hotspot_name:
-            slides = SlideContent.objects.filter(
-                hotspot_name=hotspot_name,
-                is_active=True
+            slides = SlideContent.objects.live().filter(
+                hotspot_name=hotspot_name
             )
         else:
             # Get default slides (no hotspot_name)
-            slides = SlideContent.objects.filter(
-                hotspot_name__isnull=True,
-                is_active=True
+            slides = SlideContent.objects.live().filter(
+                hotspot_name__isnull=True
             )
 
         # If no hotspot-specific slides found, try default slides
         if hotspot_name and not slides.exists():
-            slides = SlideContent.objects.filter(
-                hotspot_name__isnull=True,
-                is_active=True
+            slides = SlideContent.objects.live().filter(
+                hotspot_name__isnull=True
             )
 
         if slides.exists():
@@ -347,7 +410,7 @@ def get_template_config(request):
     template_id = request.GET.get('template_id', None)
 
     try:
-        logger.info(f"[API] get_template_config called with hotspot_name={hotspot_name}, template_id={template_id}")
+        hot_logger.info("[API] get_template_config called with hotspot_name=%s, template_id=%s", hotspot_name, template_id)
 
         # Validate hotspot_name if provided
         if hotspot_name and len(hotspot_name) > 100:
@@ -364,7 +427,7 @@ def get_template_config(request):
         if template_id:
             try:
                 template_config = TemplateConfig.objects.get(id=template_id)
-                logger.info(f"[API] Preview mode - using template ID {template_id}: {template_config.template_name}")
+                hot_logger.info("[API] Preview mode - using template ID %s: %s", template_id, template_config.template_name)
             except TemplateConfig.DoesNotExist:
                 logger.warning(f"[API] Template ID {template_id} not found")
                 return Response({
@@ -374,23 +437,21 @@ def get_template_config(request):
 
         # Priority 2: Active template for specific hotspot
         elif hotspot_name:
-            template_config = TemplateConfig.objects.filter(
-                hotspot_name=hotspot_name,
-                is_active=True
+            template_config = TemplateConfig.objects.live().scheduled_first().filter(
+                hotspot_name=hotspot_name
             ).first()
 
             if template_config:
-                logger.info(f"[API] Found hotspot-specific template: {template_config.template_name}")
+                hot_logger.info("[API] Found hotspot-specific template: %s", template_config.template_name)
 
         # Priority 3: Default active template (no hotspot_name)
         if not template_config:
-            template_config = TemplateConfig.objects.filter(
-                hotspot_name__isnull=True,
-                is_active=True
+            template_config = TemplateConfig.objects.live().scheduled_first().filter(
+                hotspot_name__isnull=True
             ).first()
 
             if template_config:
-                logger.info(f"[API] Using default template: {template_config.template_name}")
+                hot_logger.info("[API] Using default template: %s", template_config.template_name)
 
         # If no template config found, return default slideshow
         if not template_config:
@@ -414,11 +475,11 @@ def get_template_config(request):
         if template_config.left_panel_component == 'slideshow':
             try:
                 if hotspot_name:
-                    slides = SlideContent.objects.filter(hotspot_name=hotspot_name, is_active=True).order_by('order')
+                    slides = SlideContent.objects.live().filter(hotspot_name=hotspot_name).order_by('order')
                     if not slides.exists():
-                        slides = SlideContent.objects.filter(hotspot_name__isnull=True, is_active=True).order_by('order')
+                        slides = SlideContent.objects.live().filter(hotspot_name__isnull=True).order_by('order')
                 else:
-                    slides = SlideContent.objects.filter(hotspot_name__isnull=True, is_active=True).order_by('order')
+                    slides = SlideContent.objects.live().filter(hotspot_name__isnull=True).order_by('order')
 
                 slides_data = SlideContentSerializer(slides, many=True, context={'request': request}).data
                 response_data['slides'] = [
@@ -436,7 +497,7 @@ def get_template_config(request):
                     }
                     for slide in slides_data
                 ]
-                logger.info(f"[API] Loaded {len(response_data['slides'])} slides")
+                hot_logger.info("[API] Loaded %s slides", len(response_data['slides']))
             except Exception as e:
                 logger.error(f"[API] Error loading slides: {str(e)}")
                 response_data['slides'] = []
@@ -445,11 +506,11 @@ def get_template_config(request):
         elif template_config.left_panel_component == 'cardgallery':
             try:
                 if hotspot_name:
-                    cards = CardContent.objects.filter(hotspot_name=hotspot_name, is_active=True).order_by('order')
+                    cards = CardContent.objects.live().filter(hotspot_name=hotspot_name).order_by('order')
                     if not cards.exists():
-                        cards = CardContent.objects.filter(hotspot_name__isnull=True, is_active=True).order_by('order')
+                        cards = CardContent.objects.live().filter(hotspot_name__isnull=True).order_by('order')
                 else:
-                    cards = CardContent.objects.filter(hotspot_name__isnull=True, is_active=True).order_by('order')
+                    cards = CardContent.objects.live().filter(hotspot_name__isnull=True).order_by('order')
 
                 cards_data = CardContentSerializer(cards, many=True, context={'request': request}).data
                 response_data['cards'] = [
@@ -461,7 +522,7 @@ def get_template_config(request):
                     }
                     for card in cards_data
                 ]
-                logger.info(f"[API] Loaded {len(response_data['cards'])} cards")
+                hot_logger.info("[API] Loaded %s cards", len(response_data['cards']))
             except Exception as e:
                 logger.error(f"[API] Error loading cards: {str(e)}")
                 response_data['cards'] = []
@@ -469,11 +530,11 @@ def get_template_config(request):
         # Get background image
         try:
             if hotspot_name:
-                background = BackgroundImage.objects.filter(hotspot_name=hotspot_name, is_active=True).first()
+                background = BackgroundImage.objects.live().scheduled_first().filter(hotspot_name=hotspot_name).first()
                 if not background:
-                    background = BackgroundImage.objects.filter(hotspot_name__isnull=True, is_active=True).first()
+                    background = BackgroundImage.objects.live().scheduled_first().filter(hotspot_name__isnull=True).first()
             else:
-                background = BackgroundImage.objects.filter(hotspot_name__isnull=True, is_active=True).first()
+                background = BackgroundImage.objects.live().scheduled_first().filter(hotspot_name__isnull=True).first()
 
             if background:
                 serializer = BackgroundImageSerializer(background, context={'request': request})
@@ -481,7 +542,7 @@ def get_template_config(request):
                     'imageUrl': serializer.data['image_url'],
                     'title': serializer.data['title']
                 }
-                logger.info(f"[API] Loaded background: {background.title}")
+                hot_logger.info("[API] Loaded background: %s", background.title)
             else:
                 response_data['background'] = {}
                 logger.warning("[API] No background image found")
@@ -489,7 +550,7 @@ def get_template_config(request):
             logger.error(f"[API] Error loading background: {str(e)}")
             response_data['background'] = {}
 
-        logger.info("[API] Template config loaded successfully")
+        hot_logger.info("[API] Template config loaded successfully")
         return Response(response_data)
 
     except ValidationError as e:
@@ -526,39 +587,16 @@ class HotspotViewSet(viewsets.ModelViewSet):
         Test hotspot health status — checks filesystem + DB content availability.
         Checks: folder, login.html, config, active background, active template, landing URL.
         """
-        import os
-        import re
-        from django.conf import settings
-        from django.utils import timezone
-        from django.db.models import Q
-        from .models import BackgroundImage, TemplateConfig, LandingPageURL
+        from .hotspot_files import check_hotspot_files
 
         hotspot = self.get_object()
-        base_dir = settings.BASE_DIR
 
         try:
-            # Check 1: Folder exists
-            folder_path = os.path.join(base_dir, hotspot.hotspot_name)
-            folder_exists = os.path.isdir(folder_path)
-
-            # Check 2: login.html exists
-            login_file_path = os.path.join(folder_path, 'login.html')
-            login_file_exists = os.path.isfile(login_file_path)
-
-            # Check 3: Config matched (window.HOTSPOT_NAME)
-            config_matched = False
-            if login_file_exists:
-                try:
-                    with open(login_file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    pattern = r"window\.HOTSPOT_NAME\s*=\s*['\"]([^'\"]+)['\"]"
-                    match = re.search(pattern, content)
-                    if match:
-                        found_name = match.group(1)
-                        config_matched = (found_name == hotspot.hotspot_name)
-                        logger.info(f"[Hotspot Test] HOTSPOT_NAME found: {found_name}, expected: {hotspot.hotspot_name}")
-                except Exception as e:
-                    logger.error(f"[Hotspot Test] Error reading login.html: {str(e)}")
+            # Checks 1-3: folder, login.html, window.HOTSPOT_NAME
+            file_status = check_hotspot_files(hotspot.hotspot_name)
+            folder_exists = file_status['folder_exists']
+            login_file_exists = file_status['login_file_exists']
+            config_matched = file_status['config_matched']
 
             # Check 4: Active Background (own or default)
             hs = hotspot.hotspot_name
@@ -623,51 +661,41 @@ class HotspotViewSet(viewsets.ModelViewSet):
         Phase 3A: Generate login.html for a hotspot from the master template.
         Reads hotspot/login_master.html, substitutes __HOTSPOT_NAME__ with the
         actual hotspot name, and writes the result to {hotspot_name}/login.html.
+        The write is atomic and skipped when the content is unchanged.
         """
-        import os
-        from django.conf import settings
+        from .hotspot_files import (
+            master_template_path, read_master_template, render_login_html,
+            write_login_html, configured_hotspot_name, login_html_path,
+        )
 
         hotspot = self.get_object()
-        base_dir = settings.BASE_DIR
-        master_path = os.path.join(base_dir, 'hotspot', 'login_master.html')
 
-        if not os.path.isfile(master_path):
+        if not os.path.isfile(master_template_path()):
             return Response({
                 'success': False,
                 'message': 'ไม่พบ login_master.html — กรุณาสร้างไฟล์ hotspot/login_master.html ก่อน'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
         try:
-            with open(master_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            generated = render_login_html(read_master_template(), hotspot.hotspot_name)
+            written = write_login_html(hotspot.hotspot_name, generated)
 
-            generated = content.replace("'__HOTSPOT_NAME__'", f"'{hotspot.hotspot_name}'")
-
-            # Ensure hotspot folder exists
-            folder_path = os.path.join(base_dir, hotspot.hotspot_name)
-            os.makedirs(folder_path, exist_ok=True)
-
-            output_path = os.path.join(folder_path, 'login.html')
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(generated)
-
-            logger.info(f"[Generate] login.html generated for {hotspot.hotspot_name} at {output_path}")
+            if written:
+                logger.info(f"[Generate] login.html generated for {hotspot.hotspot_name} at {login_html_path(hotspot.hotspot_name)}")
+            else:
+                logger.info(f"[Generate] login.html for {hotspot.hotspot_name} unchanged, skipped write")
 
             # Auto-run test_connection logic to update status
-            import re
-            from django.utils import timezone
             hotspot.folder_exists = True
             hotspot.login_file_exists = True
-            pattern = r"window\.HOTSPOT_NAME\s*=\s*['\"]([^'\"]+)['\"]"
-            match = re.search(pattern, generated)
-            found_name = match.group(1) if match else None
-            hotspot.config_matched = (found_name == hotspot.hotspot_name)
+            hotspot.config_matched = (configured_hotspot_name(generated) == hotspot.hotspot_name)
             hotspot.last_checked = timezone.now()
             hotspot.save()
 
             return Response({
                 'success': True,
                 'message': f'สร้าง login.html สำเร็จสำหรับ {hotspot.hotspot_name}',
+                'changed': written,
                 'hotspot': HotspotSerializer(hotspot).data,
             })
 
@@ -678,56 +706,100 @@ class HotspotViewSet(viewsets.ModelViewSet):
                 'message': f'เกิดข้อผิดพลาด: {str(e)}'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @action(detail=True, methods=['post'])
+    def clone_content(self, request, pk=None):
+        """
+        Copy this hotspot's active template, background, landing URL, slides
+        and cards to the hotspots in "targets" (api/content_clone.py).
+        "replace": true deactivates content the targets already have.
+        The fast-path cache is warmed for each target from this request's origin.
+        """
+        hotspot = self.get_object()
+        try:
+            created, targets = content_clone.clone_content(
+                hotspot.hotspot_name,
+                request.data.get('targets'),
+                user=request.user,
+                replace=bool(request.data.get('replace', False)),
+                origin=f"{request.scheme}://{request.get_host()}",
+            )
+        except ValueError as e:
+            return Response({
+                'success': False,
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'success': True,
+            'message': f'คัดลอกเนื้อหาจาก {hotspot.hotspot_name} ไปยัง {len(targets)} Hotspot สำเร็จ',
+            'targets': targets,
+            'created': created,
+        })
+
+    @action(detail=False, methods=['post'])
+    def regenerate_all(self, request):
+        """
+        Regenerate login.html for all hotspots (active only unless include_inactive=true).
+        Renders concurrently from one read of login_master.html, skips unchanged
+        files, writes atomically and updates status with a single bulk_update.
+        """
+        from .hotspot_files import master_template_path, regenerate_login_pages
+
+        if not os.path.isfile(master_template_path()):
+            return Response({
+                'success': False,
+                'message': 'ไม่พบ login_master.html — กรุณาสร้างไฟล์ hotspot/login_master.html ก่อน'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        include_inactive = str(request.data.get('include_inactive', '')).lower() in ('1', 'true', 'yes')
+        force = str(request.data.get('force', '')).lower() in ('1', 'true', 'yes')
+        hotspots = Hotspot.objects.all() if include_inactive else Hotspot.objects.filter(is_active=True)
+
+        try:
+            results = regenerate_login_pages(hotspots, force=force)
+            written = sum(1 for r in results if r['written'])
+            failed = sum(1 for r in results if r['error'])
+
+            logger.info(f"[Generate] Bulk regenerate by {request.user.username}: {written}/{len(results)} written, {failed} failed")
+            return Response({
+                'success': failed == 0,
+                'message': f'สร้าง login.html ใหม่ {written} ไฟล์, ไม่เปลี่ยนแปลง {len(results) - written - failed} ไฟล์, ผิดพลาด {failed} ไฟล์',
+                'written': written,
+                'unchanged': len(results) - written - failed,
+                'failed': failed,
+                'results': results,
+            })
+
+        except Exception as e:
+            logger.error(f"[Generate] Error in bulk regenerate: {str(e)}", exc_info=True)
+            return Response({
+                'success': False,
+                'message': f'เกิดข้อผิดพลาด: {str(e)}'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
     @action(detail=True, methods=['get'])
     def download_login_zip(self, request, pk=None):
         """
         Phase 3A: Download a ZIP file containing all hotspot files for manual
         upload to MikroTik. Includes generated login.html + supporting files
         (md5.js, css/, img/) from the master hotspot folder.
+        Bundles are cached on disk (see api/hotspot_files.py) and streamed back.
         """
-        import os
-        import zipfile
-        import io
-        from django.conf import settings
-        from django.http import HttpResponse
+        from django.http import FileResponse
+        from .hotspot_files import master_template_path, open_hotspot_bundle
 
         hotspot = self.get_object()
-        base_dir = settings.BASE_DIR
-        master_path = os.path.join(base_dir, 'hotspot', 'login_master.html')
 
-        if not os.path.isfile(master_path):
+        if not os.path.isfile(master_template_path()):
             return Response({
                 'success': False,
                 'message': 'ไม่พบ login_master.html'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
         try:
-            with open(master_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-
-            generated = content.replace("'__HOTSPOT_NAME__'", f"'{hotspot.hotspot_name}'")
-
-            # Build ZIP in memory
-            buffer = io.BytesIO()
-            with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
-                # Add generated login.html
-                zf.writestr('login.html', generated.encode('utf-8'))
-
-                # Add supporting files from hotspot/ master folder (skip source templates)
-                master_dir = os.path.join(base_dir, 'hotspot')
-                skip_files = {'login.html', 'login_master.html', 'login.html.working-backup', 'README.md'}
-                for root, dirs, files in os.walk(master_dir):
-                    for filename in files:
-                        if root == master_dir and filename in skip_files:
-                            continue
-                        abs_path = os.path.join(root, filename)
-                        rel_path = os.path.relpath(abs_path, master_dir)
-                        zf.write(abs_path, rel_path)
-
-            buffer.seek(0)
             zip_filename = f'hotspot_{hotspot.hotspot_name}.zip'
-            response = HttpResponse(buffer.read(), content_type='application/zip')
-            response['Content-Disposition'] = f'attachment; filename="{zip_filename}"'
+            response = FileResponse(open_hotspot_bundle(hotspot.hotspot_name), as_attachment=True,
+                                    filename=zip_filename, content_type='application/zip')
             logger.info(f"[Download ZIP] {zip_filename} downloaded by {request.user.username}")
             return response
 
@@ -738,6 +810,41 @@ class HotspotViewSet(viewsets.ModelViewSet):
                 'message': f'เกิดข้อผิดพลาด: {str(e)}'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @action(detail=False, methods=['get'])
+    def download_all_zip(self, request):
+        """
+        Download one archive containing hotspot_<name>.zip for every active hotspot.
+        Member bundles are built in parallel and reused from the on-disk cache.
+        """
+        from django.http import FileResponse
+        from .hotspot_files import master_template_path, open_all_hotspots_bundle
+
+        if not os.path.isfile(master_template_path()):
+            return Response({
+                'success': False,
+                'message': 'ไม่พบ login_master.html'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        hotspot_names = list(Hotspot.objects.filter(is_active=True).values_list('hotspot_name', flat=True))
+        if not hotspot_names:
+            return Response({
+                'success': False,
+                'message': 'ไม่มี Hotspot ที่เปิดใช้งาน'
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            response = FileResponse(open_all_hotspots_bundle(hotspot_names), as_attachment=True,
+                                    filename='hotspots_all.zip', content_type='application/zip')
+            logger.info(f"[Download ZIP] hotspots_all.zip ({len(hotspot_names)} hotspots) downloaded by {request.user.username}")
+            return response
+
+        except Exception as e:
+            logger.error(f"[Download ZIP] Error building bulk export: {str(e)}", exc_info=True)
+            return Response({
+                'success': False,
+                'message': f'เกิดข้อผิดพลาด: {str(e)}'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 
 class LandingPageURLViewSet(viewsets.ModelViewSet):
     """
@@ -779,14 +886,11 @@ class LandingPageURLViewSet(viewsets.ModelViewSet):
         hotspot_name = serializer.validated_data.get('hotspot_name')
         self._check_hotspot_permission(hotspot_name)
 
-        if serializer.validated_data.get('is_active', False):
-            LandingPageURL.objects.filter(
-                hotspot_name=hotspot_name,
-                is_active=True
-            ).update(is_active=False)
+        landing_url = serializer.save(created_by=self.request.user)
+        # Scheduled URLs override the permanent one only for their window
+        if landing_url.is_active and landing_url.deactivate_others():
             logger.info(f"[Landing URL] Deactivated existing active URLs for {hotspot_name}")
 
-        serializer.save(created_by=self.request.user)
         cache.delete(f'landing_url_{hotspot_name}')
         logger.info(f"[Landing URL] Cache invalidated for {hotspot_name}")
 
@@ -795,29 +899,21 @@ class LandingPageURLViewSet(viewsets.ModelViewSet):
         hotspot_name = serializer.instance.hotspot_name
         self._check_hotspot_permission(hotspot_name)
 
-        if serializer.validated_data.get('is_active', False):
-            LandingPageURL.objects.filter(
-                hotspot_name=hotspot_name,
-                is_active=True
-            ).exclude(id=serializer.instance.id).update(is_active=False)
+        landing_url = serializer.save()
+        if serializer.validated_data.get('is_active', False) and landing_url.deactivate_others():
             logger.info(f"[Landing URL] Deactivated other active URLs for {hotspot_name}")
 
-        serializer.save()
         cache.delete(f'landing_url_{hotspot_name}')
         logger.info(f"[Landing URL] Cache invalidated for {hotspot_name}")
 
     @action(detail=True, methods=['post'])
     def set_active(self, request, pk=None):
-        """Set this landing URL as active (deactivate others)."""
+        """Set this landing URL as active (deactivate other permanent URLs)."""
         landing_url = self.get_object()
         hotspot_name = landing_url.hotspot_name
         self._check_hotspot_permission(hotspot_name)
 
-        LandingPageURL.objects.filter(
-            hotspot_name=hotspot_name,
-            is_active=True
-        ).exclude(id=landing_url.id).update(is_active=False)
-
+        landing_url.deactivate_others()
         landing_url.is_active = True
         landing_url.save()
         cache.delete(f'landing_url_{hotspot_name}')
@@ -869,15 +965,16 @@ def get_landing_url(request):
         # Try to get from cache first
         cached_result = cache.get(cache_key)
         if cached_result is not None:
-            logger.info(f"[Landing URL] Cache hit for {hotspot_name}")
+            LANDING_URL_CACHE.labels('hit').inc()
+            hot_logger.info("[Landing URL] Cache hit for %s", hotspot_name)
             return Response(cached_result)
 
         # Cache miss - query database
-        logger.info(f"[Landing URL] Cache miss for {hotspot_name}, querying database")
+        LANDING_URL_CACHE.labels('miss').inc()
+        hot_logger.info("[Landing URL] Cache miss for %s, querying database", hotspot_name)
 
-        landing_url = LandingPageURL.objects.filter(
-            hotspot_name=hotspot_name,
-            is_active=True
+        landing_url = LandingPageURL.objects.live().scheduled_first().filter(
+            hotspot_name=hotspot_name
         ).first()
 
         if landing_url:
@@ -887,7 +984,7 @@ def get_landing_url(request):
                 'title': landing_url.title,
                 'fallback': False
             }
-            logger.info(f"[Landing URL] Found active URL for {hotspot_name}: {landing_url.url}")
+            hot_logger.info("[Landing URL] Found active URL for %s: %s", hotspot_name, landing_url.url)
 
             # Update redirect count and timestamp
             landing_url.redirect_count += 1
@@ -900,10 +997,12 @@ def get_landing_url(request):
                 'fallback': True,
                 'message': f'No active landing URL configured for {hotspot_name}'
             }
-            logger.info(f"[Landing URL] No active URL for {hotspot_name}, using fallback")
+            hot_logger.info("[Landing URL] No active URL for %s, using fallback", hotspot_name)
 
-        # Cache the result for 5 minutes (300 seconds)
-        cache.set(cache_key, result, timeout=300)
+        # Cache the result for 5 minutes (300 seconds), or until the next publishing window boundary
+        timeout = schedule.cache_timeout(hotspot_name, 300)
+        if timeout:
+            cache.set(cache_key, result, timeout=timeout)
 
         return Response(result)
 
@@ -978,6 +1077,36 @@ def detect_device_type(user_agent):
     return 'desktop'
 
 
+def _record_impression(hotspot_name, mac_hash, ip_address, device_type, user_agent, time_on_page):
+    """Insert one PageImpression; returns is_unique_today"""
+    # Check if this is unique today: (hotspot_name, local_date, mac_hash) index;
+    # the viewed_at bound lets PostgreSQL prune to the current month's partition
+    now = timezone.now()
+    today = timezone.localdate(now)
+    is_unique_today = not PageImpression.objects.filter(
+        hotspot_name=hotspot_name,
+        local_date=today,
+        mac_hash=mac_hash,
+        viewed_at__gte=timezone.make_aware(datetime.combine(today, time.min)),
+    ).exists()
+
+    # Create impression record (save() fills local_date / local_hour from viewed_at)
+    # and count it in its HourlyTraffic row, together
+    with transaction.atomic():
+        impression = PageImpression.objects.create(
+            viewed_at=now,
+            hotspot_name=hotspot_name,
+            mac_hash=mac_hash,
+            ip_address=ip_address,
+            device_type=device_type,
+            user_agent=user_agent,
+            time_on_page=time_on_page,
+            is_unique_today=is_unique_today
+        )
+        rollups.record(hotspot_name, impression.local_date, impression.local_hour, is_unique_today, time_on_page)
+    return is_unique_today
+
+
 @api_view(['POST'])
 @authentication_classes([])  # Disable authentication - allows MikroTik to POST without session
 @permission_classes([AllowAny])
@@ -993,6 +1122,10 @@ def track_impression(request):
         "user_agent": "Mozilla/5.0...",
         "time_on_page": 30
     }
+
+    Answers 503 + Retry-After when the SQLite single writer is backed up. A job
+    that timed out stays queued and may still commit, so a retried request can
+    record the impression twice.
     """
     try:
         # Extract data
@@ -1016,26 +1149,18 @@ def track_impression(request):
         # Detect device type
         device_type = detect_device_type(user_agent)
 
-        # Check if this is unique today
-        today = date.today()
-        is_unique_today = not PageImpression.objects.filter(
-            mac_hash=mac_hash,
-            hotspot_name=hotspot_name,
-            viewed_at__date=today
-        ).exists()
-
-        # Create impression record
-        impression = PageImpression.objects.create(
-            hotspot_name=hotspot_name,
-            mac_hash=mac_hash,
-            ip_address=ip_address,
-            device_type=device_type,
-            user_agent=user_agent,
-            time_on_page=time_on_page,
-            is_unique_today=is_unique_today
+        # Unique check + insert run on the SQLite single writer (inline if not running)
+        is_unique_today = run_write(
+            _record_impression, hotspot_name, mac_hash, ip_address, device_type, user_agent, time_on_page
         )
 
-        logger.info(f"[Tracking] ✓ Impression recorded: {hotspot_name} | {device_type} | unique={is_unique_today}")
+        IMPRESSIONS_INGESTED.labels(device_type).inc()
+        traffic_monitor.observe(hotspot_name)
+        try:
+            live.publish_impression(hotspot_name, mac_hash, ip_address, device_type, time_on_page, is_unique_today)
+        except Exception as e:  # the impression is recorded; only the live dashboard misses it
+            logger.warning(f"[Live] Publish failed: {e}")
+        hot_logger.info("[Tracking] ✓ Impression recorded: %s | %s | unique=%s", hotspot_name, device_type, is_unique_today)
 
         return Response({
             'success': True,
@@ -1043,6 +1168,16 @@ def track_impression(request):
             'is_unique_today': is_unique_today
         }, status=status.HTTP_201_CREATED)
 
+    except (TimeoutError, queue.Full):
+        # Writer queue full (queue.Full) or the job not done within SQLITE_WRITER_TIMEOUT (TimeoutError)
+        logger.warning("[Tracking] SQLite writer backed up, impression not confirmed")
+        response = Response({
+            'success': False,
+            'message': 'Service busy, retry later'
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        response['Retry-After'] = '5'
+        return response
+
     except Exception as e:
         logger.error(f"[Tracking] ✗ Error tracking impression: {str(e)}", exc_info=True)
         return Response({
@@ -1051,6 +1186,186 @@ def track_impression(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+# ===============================================
+# Daily / hourly grouping on PageImpression.local_date / local_hour
+# ===============================================
+
+def _local_day_range(queryset, start, end):
+    """Add local_date bounds matching a viewed_at range, so grouping can use the local_date indexes"""
+    return queryset.filter(local_date__gte=timezone.localdate(start), local_date__lte=timezone.localdate(end))
+
+
+def _hour_start(local_date, local_hour):
+    return timezone.make_aware(datetime.combine(local_date, time(local_hour)))
+
+
+def _daily_counts(queryset):
+    """[{'date', 'total', 'unique'}] per local day, ascending"""
+    return queryset.order_by().values(date=F('local_date')).annotate(
+        total=Count('id'),
+        unique=Count('mac_hash', distinct=True)
+    ).order_by('date')
+
+
+def _hourly_counts(queryset):
+    """[{'hour' (aware datetime), 'count'}] per local hour, ascending"""
+    rows = queryset.order_by().values('local_date', 'local_hour').annotate(
+        count=Count('id')
+    ).order_by('local_date', 'local_hour')
+    return [{'hour': _hour_start(row['local_date'], row['local_hour']), 'count': row['count']} for row in rows]
+
+
+# ===============================================
+# Impression statistics: delta refreshes (?since=<watermark>)
+# ===============================================
+# A full response carries a signed watermark: the highest PageImpression id it
+# covers, the window start and when the full computation ran. Sending it back
+# as ?since= returns only what changed after that id: additive deltas for the
+# summary, devices and hotspots (unique devices checked against earlier rows
+# of the window), replacement rows for the days/hours touched, and the new
+# impressions. The window start stays pinned to the full load; after
+# STATS_DELTA_MAX_AGE seconds, a date change, a large tail or a range reaching
+# archived months, the server answers with a full response instead.
+#
+# Ids are handed out before commit: on PostgreSQL a higher id can be visible
+# while a lower one is still in flight, and a watermark at the highest visible
+# id would skip that row for good. The watermark therefore only advances to
+# rows older than STATS_DELTA_SETTLE_SECONDS; newer ones are left to the next
+# delta. SQLite's single writer commits in id order (no lag needed).
+
+STATS_WATERMARK_SALT = 'api.impression_statistics.watermark'
+STATS_DELTA_MAX_ROWS = 5000
+
+
+def _stats_params_key(request):
+    """Watermarks are only valid for the same user and filters"""
+    return '|'.join([str(request.user.pk)] + [request.GET.get(name, '') for name in ('hotspot', 'days', 'start_date', 'end_date')])
+
+
+def _stats_high_water_id():
+    """Highest PageImpression id a statistics response may cover (see above)"""
+    rows = PageImpression.objects.order_by('-id')
+    settle = getattr(django_settings, 'STATS_DELTA_SETTLE_SECONDS', 0)
+    if settle:
+        rows = rows.filter(viewed_at__lt=timezone.now() - timedelta(seconds=settle))
+    return rows.values_list('id', flat=True).first() or 0
+
+
+def _make_stats_watermark(high_water_id, start_date, params_key, full_at):
+    return signing.dumps({
+        'id': high_water_id,
+        'start': start_date.isoformat(),
+        'issued': timezone.now().timestamp(),
+        'full_at': full_at,
+        'params': params_key,
+    }, salt=STATS_WATERMARK_SALT, compress=True)
+
+
+def _read_stats_watermark(token, params_key):
+    """Decoded watermark if it can still be used for a delta, else None (→ full response)"""
+    if not token:
+        return None
+    max_age = getattr(django_settings, 'STATS_DELTA_MAX_AGE', 600)
+    try:
+        watermark = signing.loads(token, salt=STATS_WATERMARK_SALT, max_age=max_age)
+    except signing.BadSignature:
+        return None
+    now = timezone.now()
+    full_at = datetime.fromtimestamp(watermark['full_at'], tz=dt_timezone.utc)
+    if watermark['params'] != params_key or (now - full_at).total_seconds() > max_age:
+        return None
+    if timezone.localtime(full_at).date() != timezone.localdate():
+        return None
+    watermark['start'] = datetime.fromisoformat(watermark['start'])
+    watermark['issued'] = datetime.fromtimestamp(watermark['issued'], tz=dt_timezone.utc)
+    return watermark
+
+
+def _recent_impression_data(imp):
+    return {
+        'id': imp['id'],
+        'hotspot_name': imp['hotspot_name'],
+        'viewed_at': imp['viewed_at'],
+        'device_type': imp['device_type'],
+        'ip_address': imp['ip_address'],
+        'time_on_page': imp['time_on_page'],
+        'is_unique_today': imp['is_unique_today'],
+        'mac_hash_short': imp['mac_hash'][:16] + '...'  # Truncated for display
+    }
+
+
+def _impression_statistics_delta(queryset, hourly_base, watermark, params_key, start_date, end_date, days, recent_limit):
+    """Delta payload after watermark['id'], or None if a full response is cheaper"""
+    high_water_id = max(_stats_high_water_id(), watermark['id'])
+    tail_qs = queryset.filter(id__gt=watermark['id'], id__lte=high_water_id)
+    tail = list(tail_qs.order_by('-id').values(
+        'id', 'hotspot_name', 'viewed_at', 'mac_hash', 'ip_address', 'device_type', 'time_on_page', 'is_unique_today'
+    )[:STATS_DELTA_MAX_ROWS + 1])
+    if len(tail) > STATS_DELTA_MAX_ROWS:
+        return None
+
+    # Devices already counted in the window (overall and per hotspot) before the watermark
+    macs = {row['mac_hash'] for row in tail}
+    seen_pairs = set(queryset.filter(id__lte=watermark['id'], mac_hash__in=macs).order_by().values_list(
+        'hotspot_name', 'mac_hash'
+    ).distinct()) if macs else set()
+    seen_macs = {mac for _, mac in seen_pairs}
+    new_pairs = {(row['hotspot_name'], row['mac_hash']) for row in tail} - seen_pairs
+
+    devices, hotspots, hotspot_unique = Counter(), Counter(), Counter(name for name, _ in new_pairs)
+    time_sum = time_count = 0
+    for row in tail:
+        devices[row['device_type']] += 1
+        hotspots[row['hotspot_name']] += 1
+        if row['time_on_page'] is not None:
+            time_sum += row['time_on_page']
+            time_count += 1
+
+    # Replacement rows for the days / hours the new impressions fall in
+    daily_trend, hourly_data = [], []
+    if tail:
+        first_day = min(timezone.localdate(row['viewed_at']) for row in tail)
+        daily_trend = _daily_counts(queryset.filter(id__lte=high_water_id, local_date__gte=first_day))
+    # hourly_data is not filtered by hotspot, so refresh the hours since the last response regardless of the tail
+    first_hour = timezone.localtime(watermark['issued'])
+    hourly_data = _hourly_counts(hourly_base.filter(id__lte=high_water_id).filter(
+        Q(local_date__gt=first_hour.date()) | Q(local_date=first_hour.date(), local_hour__gte=first_hour.hour)
+    ))
+
+    return {
+        'success': True,
+        'mode': 'delta',
+        'watermark': _make_stats_watermark(high_water_id, start_date, params_key, watermark['full_at']),
+        'date_range': {
+            'start': start_date.isoformat(),
+            'end': end_date.isoformat(),
+            'days': days
+        },
+        'summary_delta': {
+            'total_impressions': len(tail),
+            'unique_devices': len(macs - seen_macs),
+            'time_on_page_sum': time_sum,
+            'time_on_page_count': time_count,
+        },
+        'device_delta': [{'device_type': device, 'count': count} for device, count in devices.items()],
+        'hotspot_delta': [{
+            'hotspot_name': name,
+            'impressions': count,
+            'unique_devices': hotspot_unique[name],
+        } for name, count in hotspots.items()],
+        'daily_trend': [{
+            'date': item['date'].isoformat(),
+            'total': item['total'],
+            'unique': item['unique']
+        } for item in daily_trend],
+        'hourly_data': [{
+            'hour': item['hour'].isoformat(),
+            'count': item['count']
+        } for item in hourly_data],
+        'recent_impressions': [_recent_impression_data(row) for row in tail[:recent_limit]],
+    }
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def impression_statistics(request):
@@ -1078,6 +1393,14 @@ def impression_statistics(request):
             end_date = timezone.now()
             start_date = end_date - timedelta(days=days)
 
+        # Delta refresh: keep the window start of the full response the watermark came from
+        params_key = _stats_params_key(request)
+        watermark = _read_stats_watermark(request.GET.get('since'), params_key)
+        if watermark is not None and retention.reaches_archive(watermark['start'], end_date):
+            watermark = None
+        if watermark is not None:
+            start_date = watermark['start']
+
         # Base queryset
         queryset = PageImpression.objects.filter(viewed_at__gte=start_date, viewed_at__lte=end_date)
 
@@ -1090,57 +1413,80 @@ def impression_statistics(request):
         if hotspot_filter and hotspot_filter != 'all':
             queryset = queryset.filter(hotspot_name=hotspot_filter)
 
-        # === SUMMARY STATISTICS ===
-        total_impressions = queryset.count()
-        unique_devices = queryset.values('mac_hash').distinct().count()
-
-        # Average time on page (exclude None/null values)
-        avg_time = queryset.filter(time_on_page__isnull=False).aggregate(
-            avg=Avg('time_on_page')
-        )['avg'] or 0
-
-        # Device breakdown
-        device_stats = queryset.values('device_type').annotate(
-            count=Count('id')
-        ).order_by('-count')
-
-        # Top hotspot by impressions
-        top_hotspot = queryset.values('hotspot_name').annotate(
-            count=Count('id')
-        ).order_by('-count').first()
-
-        # Handle case when no data exists
-        top_hotspot_name = top_hotspot['hotspot_name'] if top_hotspot else 'N/A'
-        top_hotspot_count = top_hotspot['count'] if top_hotspot else 0
-
-        # === DAILY TREND (for line chart) ===
-        daily_trend = queryset.annotate(
-            date=TruncDate('viewed_at')
-        ).values('date').annotate(
-            total=Count('id'),
-            unique=Count('mac_hash', distinct=True)
-        ).order_by('date')
-
-        # === HOURLY BREAKDOWN (for heatmap - last 24 hours) ===
+        recent_limit = min(int(request.GET.get('limit', 50)), RECENT_IMPRESSIONS_MAX)  # raw dumps: export_impressions
         last_24h = timezone.now() - timedelta(hours=24)
         hourly_base = PageImpression.objects.filter(viewed_at__gte=last_24h)
         if allowed is not None:
             hourly_base = hourly_base.filter(hotspot_name__in=allowed)
-        hourly_data = hourly_base.annotate(
-            hour=TruncHour('viewed_at')
-        ).values('hour').annotate(
-            count=Count('id')
-        ).order_by('hour')
-
-        # === HOTSPOT BREAKDOWN (for bar chart) ===
-        hotspot_breakdown = queryset.values('hotspot_name').annotate(
-            impressions=Count('id'),
-            unique_devices=Count('mac_hash', distinct=True)
-        ).order_by('-impressions')
-
-        # === RECENT IMPRESSIONS (for table) ===
-        recent_limit = int(request.GET.get('limit', 50))
-        recent_impressions = queryset.select_related().order_by('-viewed_at')[:recent_limit]
+
+        if watermark is not None:
+            delta = _impression_statistics_delta(
+                queryset, hourly_base, watermark, params_key, start_date, end_date, days, recent_limit
+            )
+            if delta is not None:
+                hot_logger.info("[Stats] Delta: %s new impressions", delta['summary_delta']['total_impressions'])
+                return Response(delta, status=status.HTTP_200_OK)
+
+        # Everything below covers rows up to this id, the next delta starts after it
+        high_water_id = _stats_high_water_id()
+        queryset = queryset.filter(id__lte=high_water_id)
+        hourly_base = hourly_base.filter(id__lte=high_water_id)
+
+        # Ranges reaching archived months (api/retention.py) are aggregated in Python
+        archive_stats = retention.stats_for_range(queryset, start_date, end_date, allowed, hotspot_filter)
+
+        if archive_stats is not None:
+            total_impressions = archive_stats.count()
+            unique_devices = archive_stats.unique_devices()
+            avg_time = archive_stats.avg_time()
+            time_sum, time_count = archive_stats.time_totals()
+            device_stats = [{'device_type': d['device_type'], 'count': d['count']} for d in archive_stats.device_breakdown()]
+            hotspot_breakdown = archive_stats.hotspot_breakdown()
+            top_hotspot = hotspot_breakdown[0] if hotspot_breakdown else None
+            top_hotspot_name = top_hotspot['hotspot_name'] if top_hotspot else 'N/A'
+            top_hotspot_count = top_hotspot['impressions'] if top_hotspot else 0
+            daily_trend = archive_stats.daily()
+            recent_impressions = [PageImpression(**row) for row in archive_stats.recent(recent_limit)]
+        else:
+            # === SUMMARY STATISTICS ===
+            total_impressions = queryset.count()
+            unique_devices = queryset.values('mac_hash').distinct().count()
+
+            # Average time on page (exclude None/null values)
+            time_stats = queryset.filter(time_on_page__isnull=False).aggregate(
+                avg=Avg('time_on_page'), total=Sum('time_on_page'), count=Count('id')
+            )
+            avg_time = time_stats['avg'] or 0
+            time_sum, time_count = time_stats['total'] or 0, time_stats['count']
+
+            # Device breakdown
+            device_stats = queryset.values('device_type').annotate(
+                count=Count('id')
+            ).order_by('-count')
+
+            # Top hotspot by impressions
+            top_hotspot = queryset.values('hotspot_name').annotate(
+                count=Count('id')
+            ).order_by('-count').first()
+
+            # Handle case when no data exists
+            top_hotspot_name = top_hotspot['hotspot_name'] if top_hotspot else 'N/A'
+            top_hotspot_count = top_hotspot['count'] if top_hotspot else 0
+
+            # === DAILY TREND (for line chart) ===
+            daily_trend = _daily_counts(_local_day_range(queryset, start_date, end_date))
+
+            # === HOTSPOT BREAKDOWN (for bar chart) ===
+            hotspot_breakdown = queryset.values('hotspot_name').annotate(
+                impressions=Count('id'),
+                unique_devices=Count('mac_hash', distinct=True)
+            ).order_by('-impressions')
+
+            # === RECENT IMPRESSIONS (for table) ===
+            recent_impressions = queryset.select_related().order_by('-viewed_at')[:recent_limit]
+
+        # === HOURLY BREAKDOWN (for heatmap - last 24 hours) ===
+        hourly_data = _hourly_counts(_local_day_range(hourly_base, last_24h, timezone.now()))
 
         recent_data = [{
             'id': imp.id,
@@ -1156,6 +1502,8 @@ def impression_statistics(request):
         # Build response
         response_data = {
             'success': True,
+            'mode': 'full',
+            'watermark': _make_stats_watermark(high_water_id, start_date, params_key, timezone.now().timestamp()),
             'date_range': {
                 'start': start_date.isoformat(),
                 'end': end_date.isoformat(),
@@ -1166,7 +1514,10 @@ def impression_statistics(request):
                 'unique_devices': unique_devices,
                 'avg_time_on_page': round(avg_time, 1),
                 'top_hotspot': top_hotspot_name,
-                'top_hotspot_count': top_hotspot_count
+                'top_hotspot_count': top_hotspot_count,
+                # for merging delta responses (avg = sum / count)
+                'time_on_page_sum': time_sum,
+                'time_on_page_count': time_count
             },
             'device_breakdown': list(device_stats),
             'daily_trend': [{
@@ -1233,13 +1584,16 @@ def media_reach_report(request):
         if hotspot_filter and hotspot_filter != 'all':
             queryset = queryset.filter(hotspot_name=hotspot_filter)
 
+        # Ranges reaching archived months (api/retention.py) are aggregated in Python
+        archive_stats = retention.stats_for_range(queryset, start_date, end_date, allowed, hotspot_filter)
+
         # === 1. REACH METRICS ===
 
         # Total Reach (Unique Devices)
-        total_reach = queryset.values('mac_hash').distinct().count()
+        total_reach = archive_stats.unique_devices() if archive_stats is not None else queryset.values('mac_hash').distinct().count()
 
         # Total Impressions (OTS - Opportunity To See)
-        total_impressions = queryset.count()
+        total_impressions = archive_stats.count() if archive_stats is not None else queryset.count()
 
         # Frequency (Average exposures per person)
         frequency = round(total_impressions / total_reach, 1) if total_reach > 0 else 0
@@ -1253,11 +1607,15 @@ def media_reach_report(request):
         # === 2. EFFECTIVE REACH ===
 
         # Frequency distribution
-        frequency_dist = queryset.values('mac_hash').annotate(
-            impression_count=Count('id')
-        ).values('impression_count').annotate(
-            users=Count('mac_hash')
-        ).order_by('impression_count')
+        if archive_stats is not None:
+            frequency_dist = [{'impression_count': n, 'users': users}
+                              for n, users in sorted(archive_stats.frequency_distribution().items())]
+        else:
+            frequency_dist = queryset.values('mac_hash').annotate(
+                impression_count=Count('id')
+            ).values('impression_count').annotate(
+                users=Count('mac_hash')
+            ).order_by('impression_count')
 
         # Categorize by frequency buckets
         freq_1_2 = sum(item['users'] for item in frequency_dist if 1 <= item['impression_count'] <= 2)
@@ -1271,47 +1629,67 @@ def media_reach_report(request):
 
         # === 3. ENGAGEMENT METRICS ===
 
-        # Average Time on Page
-        avg_time_on_page = queryset.filter(
-            time_on_page__isnull=False
-        ).aggregate(avg=Avg('time_on_page'))['avg'] or 0
+        if archive_stats is not None:
+            avg_time_on_page = archive_stats.avg_time()
+            engaged_users = archive_stats.engaged(10)
+        else:
+            # Average Time on Page
+            avg_time_on_page = queryset.filter(
+                time_on_page__isnull=False
+            ).aggregate(avg=Avg('time_on_page'))['avg'] or 0
 
-        # Engagement Rate (users who stayed >10 seconds)
-        engaged_users = queryset.filter(time_on_page__gte=10).count()
+            # Engagement Rate (users who stayed >10 seconds)
+            engaged_users = queryset.filter(time_on_page__gte=10).count()
         engagement_rate = round((engaged_users / total_impressions * 100), 1) if total_impressions > 0 else 0
 
-        # === 4. DEVICE-BASED REACH ===
+        if archive_stats is not None:
+            # === 4-6. DEVICE / TIME / LOCATION from live + archived rows ===
+            device_reach = archive_stats.device_breakdown()
+            daily = archive_stats.daily()
+            best_day = max(daily, key=lambda d: d['total'], default=None)
+            daily_stats = {'date': best_day['date'], 'impressions': best_day['total'],
+                           'unique_users': best_day['unique']} if best_day else None
+            best_hour = max(archive_stats.hourly(), key=lambda h: h['count'], default=None)
+            hourly_stats = {'hour': best_hour['hour'], 'impressions': best_hour['count']} if best_hour else None
+            location_reach = [{
+                'hotspot_name': item['hotspot_name'],
+                'unique_users': item['unique_devices'],
+                'total_impressions': item['impressions'],
+                'avg_frequency': item['impressions'] / item['unique_devices'],
+            } for item in archive_stats.hotspot_breakdown()]
+        else:
+            # === 4. DEVICE-BASED REACH ===
+
+            device_reach = queryset.values('device_type').annotate(
+                unique_users=Count('mac_hash', distinct=True),
+                total_impressions=Count('id'),
+                avg_time=Avg('time_on_page')
+            ).order_by('-total_impressions')
 
-        device_reach = queryset.values('device_type').annotate(
-            unique_users=Count('mac_hash', distinct=True),
-            total_impressions=Count('id'),
-            avg_time=Avg('time_on_page')
-        ).order_by('-total_impressions')
+            # === 5. TIME-BASED REACH ===
 
-        # === 5. TIME-BASED REACH ===
+            local_queryset = _local_day_range(queryset, start_date, end_date).order_by()
 
-        # Peak day
-        daily_stats = queryset.annotate(
-            date=TruncDate('viewed_at')
-        ).values('date').annotate(
-            impressions=Count('id'),
-            unique_users=Count('mac_hash', distinct=True)
-        ).order_by('-impressions').first()
+            # Peak day
+            daily_stats = local_queryset.values(date=F('local_date')).annotate(
+                impressions=Count('id'),
+                unique_users=Count('mac_hash', distinct=True)
+            ).order_by('-impressions').first()
 
-        # Peak hour
-        hourly_stats = queryset.annotate(
-            hour=TruncHour('viewed_at')
-        ).values('hour').annotate(
-            impressions=Count('id')
-        ).order_by('-impressions').first()
+            # Peak hour
+            hourly_stats = local_queryset.values('local_date', 'local_hour').annotate(
+                impressions=Count('id')
+            ).order_by('-impressions').first()
+            if hourly_stats:
+                hourly_stats['hour'] = _hour_start(hourly_stats['local_date'], hourly_stats['local_hour'])
 
-        # === 6. LOCATION-BASED REACH ===
+            # === 6. LOCATION-BASED REACH ===
 
-        location_reach = queryset.values('hotspot_name').annotate(
-            unique_users=Count('mac_hash', distinct=True),
-            total_impressions=Count('id'),
-            avg_frequency=Count('id') * 1.0 / Count('mac_hash', distinct=True)
-        ).order_by('-total_impressions')
+            location_reach = queryset.values('hotspot_name').annotate(
+                unique_users=Count('mac_hash', distinct=True),
+                total_impressions=Count('id'),
+                avg_frequency=Count('id') * 1.0 / Count('mac_hash', distinct=True)
+            ).order_by('-total_impressions')
 
         # Calculate CPM (Cost Per Mille) if cost provided
         ad_cost = float(request.GET.get('ad_cost', 0))
@@ -1332,8 +1710,13 @@ def media_reach_report(request):
         if hotspot_filter and hotspot_filter != 'all':
             prev_queryset = prev_queryset.filter(hotspot_name=hotspot_filter)
 
-        prev_reach = prev_queryset.values('mac_hash').distinct().count()
-        prev_impressions = prev_queryset.count()
+        prev_stats = retention.stats_for_range(prev_queryset, prev_start, prev_end, allowed, hotspot_filter)
+        if prev_stats is not None:
+            prev_reach = prev_stats.unique_devices()
+            prev_impressions = prev_stats.count()
+        else:
+            prev_reach = prev_queryset.values('mac_hash').distinct().count()
+            prev_impressions = prev_queryset.count()
 
         reach_growth = round(((total_reach - prev_reach) / prev_reach * 100), 1) if prev_reach > 0 else 0
         impression_growth = round(((total_impressions - prev_impressions) / prev_impressions * 100), 1) if prev_impressions > 0 else 0
@@ -1532,19 +1915,30 @@ def export_reach_report_pdf(request):
         if hotspot_filter and hotspot_filter != 'all':
             queryset = queryset.filter(hotspot_name=hotspot_filter)
 
+        # Ranges reaching archived months (api/retention.py) are aggregated in Python
+        archive_stats = retention.stats_for_range(queryset, start_date, end_date, allowed, hotspot_filter)
+
         # Calculate metrics
-        total_reach = queryset.values('mac_hash').distinct().count()
-        total_impressions = queryset.count()
+        if archive_stats is not None:
+            total_reach = archive_stats.unique_devices()
+            total_impressions = archive_stats.count()
+        else:
+            total_reach = queryset.values('mac_hash').distinct().count()
+            total_impressions = queryset.count()
         frequency = round(total_impressions / total_reach, 1) if total_reach > 0 else 0
         reach_rate = round((total_reach / target_audience * 100), 1) if target_audience > 0 else 0
         grp = round(reach_rate * frequency, 0)
 
         # Frequency distribution
-        frequency_dist = queryset.values('mac_hash').annotate(
-            impression_count=Count('id')
-        ).values('impression_count').annotate(
-            users=Count('mac_hash')
-        ).order_by('impression_count')
+        if archive_stats is not None:
+            frequency_dist = [{'impression_count': n, 'users': users}
+                              for n, users in sorted(archive_stats.frequency_distribution().items())]
+        else:
+            frequency_dist = queryset.values('mac_hash').annotate(
+                impression_count=Count('id')
+            ).values('impression_count').annotate(
+                users=Count('mac_hash')
+            ).order_by('impression_count')
 
         freq_1_2 = sum(item['users'] for item in frequency_dist if 1 <= item['impression_count'] <= 2)
         freq_3_7 = sum(item['users'] for item in frequency_dist if 3 <= item['impression_count'] <= 7)
@@ -1554,15 +1948,22 @@ def export_reach_report_pdf(request):
         effective_reach_percentage = round((effective_reach / total_reach * 100), 1) if total_reach > 0 else 0
 
         # Engagement
-        avg_time_on_page = queryset.filter(time_on_page__isnull=False).aggregate(avg=Avg('time_on_page'))['avg'] or 0
-        engaged_users = queryset.filter(time_on_page__gte=10).count()
+        if archive_stats is not None:
+            avg_time_on_page = archive_stats.avg_time()
+            engaged_users = archive_stats.engaged(10)
+        else:
+            avg_time_on_page = queryset.filter(time_on_page__isnull=False).aggregate(avg=Avg('time_on_page'))['avg'] or 0
+            engaged_users = queryset.filter(time_on_page__gte=10).count()
         engagement_rate = round((engaged_users / total_impressions * 100), 1) if total_impressions > 0 else 0
 
         # Device breakdown
-        device_reach = queryset.values('device_type').annotate(
-            unique_users=Count('mac_hash', distinct=True),
-            total_impressions=Count('id')
-        ).order_by('-total_impressions')
+        if archive_stats is not None:
+            device_reach = archive_stats.device_breakdown()
+        else:
+            device_reach = queryset.values('device_type').annotate(
+                unique_users=Count('mac_hash', distinct=True),
+                total_impressions=Count('id')
+            ).order_by('-total_impressions')
 
         # Create PDF
         buffer = BytesIO()
@@ -1755,7 +2156,8 @@ def export_reach_report_pdf(request):
         elements.append(Paragraph(f"สร้างเมื่อ: {timezone.now().strftime('%d/%m/%Y %H:%M:%S')} | LibLogin Monitoring System", footer_style))
 
         # Build PDF
-        doc.build(elements)
+        with PDF_RENDER.labels('media_reach').time():
+            doc.build(elements)
 
         # Get PDF from buffer
         pdf = buffer.getvalue()
@@ -1774,6 +2176,285 @@ def export_reach_report_pdf(request):
         return HttpResponse(f"Error generating PDF: {str(e)}", status=500)
 
 
+# ===============================================
+# Traffic Heatmap (HourlyTraffic rollups, api/rollups.py)
+# ===============================================
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def traffic_heatmap(request):
+    """
+    Day-of-week × hour heatmap and per-hour series for any date range.
+
+    Query params:
+      start_date/end_date (YYYY-MM-DD, inclusive) or days (default 28, today included)
+      hotspot=<name>[,<name>...]  hotspot subset (repeatable; default: all allowed)
+      series=0                    leave out the per-hour series
+
+    Read from HourlyTraffic only, so long ranges (including archived months)
+    cost a few thousand rollup rows rather than a scan of PageImpression.
+    "unique" counts devices on their first impression of the day per hotspot.
+    """
+    try:
+        if request.GET.get('start_date') and request.GET.get('end_date'):
+            start_date = datetime.strptime(request.GET.get('start_date'), '%Y-%m-%d').date()
+            end_date = datetime.strptime(request.GET.get('end_date'), '%Y-%m-%d').date()
+        else:
+            end_date = timezone.localdate()
+            start_date = end_date - timedelta(days=int(request.GET.get('days', 28)) - 1)
+    except ValueError:
+        return Response({'success': False, 'message': 'Invalid date range'}, status=status.HTTP_400_BAD_REQUEST)
+    if start_date > end_date:
+        return Response({'success': False, 'message': 'start_date must not be after end_date'}, status=status.HTTP_400_BAD_REQUEST)
+
+    hotspot_names = sorted({
+        name.strip() for value in request.GET.getlist('hotspot') for name in value.split(',')
+        if name.strip() and name.strip() != 'all'
+    })
+    allowed = _get_allowed_hotspot_names(request.user)
+
+    totals = rollups.hourly_totals(start_date, end_date, hotspot_names, allowed)
+    days = (end_date - start_date).days + 1
+    data = {
+        'success': True,
+        'date_range': {
+            'start': start_date.isoformat(),
+            'end': end_date.isoformat(),
+            'days': days,
+        },
+        'hotspots': hotspot_names or 'all',
+        'total_impressions': sum(values['impressions'] for values in totals.values()),
+        'heatmap': rollups.heatmap(totals, start_date, end_date),
+    }
+    if request.GET.get('series', '1') != '0':
+        # Dense (24 points per day): longer ranges only get the heatmap
+        data['series'] = rollups.series(totals, start_date, end_date) if days <= rollups.SERIES_MAX_DAYS else None
+    return Response(data)
+
+
+# ===============================================
+# Raw Impression Export (streaming)
+# ===============================================
+
+EXPORT_COLUMNS = ('id', 'viewed_at', 'hotspot_name', 'mac_hash', 'ip_address',
+                  'device_type', 'user_agent', 'time_on_page', 'is_unique_today')
+EXPORT_PAGE_SIZE = 2000  # rows per keyset query
+
+
+class _Echo:
+    """File-like object for csv.writer: returns each line instead of buffering it"""
+
+    def write(self, value):
+        return value
+
+
+def _encode_export_cursor(viewed_at, pk):
+    return base64.urlsafe_b64encode(f'{viewed_at.isoformat()}|{pk}'.encode()).decode().rstrip('=')
+
+
+def _decode_export_cursor(cursor):
+    """(viewed_at, id) of the last row already received; raises ValueError if malformed"""
+    raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+    viewed_at, pk = raw.rsplit('|', 1)
+    viewed_at = datetime.fromisoformat(viewed_at)
+    if timezone.is_naive(viewed_at):
+        raise ValueError('cursor timestamp must be timezone-aware')
+    return viewed_at, int(pk)
+
+
+def _after_keyset(queryset, viewed_at, pk):
+    # (viewed_at, id) > (v, pk) — the viewed_at range keeps it on the index
+    return queryset.filter(viewed_at__gte=viewed_at).filter(Q(viewed_at__gt=viewed_at) | Q(id__gt=pk))
+
+
+def _through_keyset(queryset, viewed_at, pk):
+    # (viewed_at, id) <= (v, pk)
+    return queryset.filter(viewed_at__lte=viewed_at).filter(Q(viewed_at__lt=viewed_at) | Q(id__lte=pk))
+
+
+def _iter_export_rows(queryset, after=None):
+    """All rows of queryset in (viewed_at, id) order, one keyset page at a time (constant memory)"""
+    while True:
+        page = _after_keyset(queryset, *after) if after else queryset
+        last = None
+        for row in page.order_by('viewed_at', 'id').values_list(*EXPORT_COLUMNS)[:EXPORT_PAGE_SIZE].iterator(chunk_size=EXPORT_PAGE_SIZE):
+            last = row
+            yield row
+        if last is None:
+            return
+        after = (last[1], last[0])
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_impressions(request):
+    """
+    Stream raw impressions as CSV or NDJSON.
+
+    Query params:
+      output=csv|ndjson (default csv)
+      start_date/end_date (YYYY-MM-DD, inclusive) or days (default 30)
+      hotspot=<hotspot_name>
+      limit=<n>       rows per response; if more remain, X-Next-Cursor is set
+      cursor=<token>  continue after the row the token points at
+
+    Rows are ordered by (viewed_at, id). Only rows still in the database are
+    exported; months moved out by archive_impressions live in the archive files.
+    """
+    output = request.GET.get('output', 'csv')
+    if output not in ('csv', 'ndjson'):
+        return Response({'success': False, 'message': 'output must be csv or ndjson'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        if request.GET.get('start_date') and request.GET.get('end_date'):
+            start_date = timezone.make_aware(datetime.strptime(request.GET.get('start_date'), '%Y-%m-%d'))
+            end_date = timezone.make_aware(datetime.strptime(request.GET.get('end_date'), '%Y-%m-%d') + timedelta(days=1))
+        else:
+            end_date = timezone.now()
+            start_date = end_date - timedelta(days=int(request.GET.get('days', 30)))
+        limit = int(request.GET['limit']) if request.GET.get('limit') else None
+        after = _decode_export_cursor(request.GET['cursor']) if request.GET.get('cursor') else None
+    except (ValueError, UnicodeDecodeError, binascii.Error):
+        return Response({'success': False, 'message': 'Invalid date range, limit or cursor'}, status=status.HTTP_400_BAD_REQUEST)
+    if limit is not None and limit < 1:
+        return Response({'success': False, 'message': 'limit must be positive'}, status=status.HTTP_400_BAD_REQUEST)
+
+    queryset = PageImpression.objects.filter(viewed_at__gte=start_date, viewed_at__lt=end_date)
+    allowed = _get_allowed_hotspot_names(request.user)
+    if allowed is not None:
+        queryset = queryset.filter(hotspot_name__in=allowed)
+    hotspot_filter = request.GET.get('hotspot')
+    if hotspot_filter and hotspot_filter != 'all':
+        queryset = queryset.filter(hotspot_name=hotspot_filter)
+
+    # With a limit, find the last row of this response up front so the next cursor can go in a header
+    next_cursor = None
+    if limit is not None:
+        remaining = _after_keyset(queryset, *after) if after else queryset
+        edge = list(remaining.order_by('viewed_at', 'id').values_list('viewed_at', 'id')[limit - 1:limit + 1])
+        if len(edge) == 2:
+            next_cursor = _encode_export_cursor(*edge[0])
+            queryset = _through_keyset(queryset, *edge[0])
+
+    def stream():
+        count = 0
+        if output == 'csv':
+            writer = csv.writer(_Echo())
+            yield writer.writerow(EXPORT_COLUMNS)
+        for row in _iter_export_rows(queryset, after):
+            values = list(row)
+            values[1] = timezone.localtime(values[1]).isoformat()
+            if output == 'csv':
+                yield writer.writerow(values)
+            else:
+                yield json.dumps(dict(zip(EXPORT_COLUMNS, values)), ensure_ascii=False) + '\n'
+            count += 1
+        logger.info(f"[Export] {request.user.username}: streamed {count} impressions as {output}")
+
+    content_type = 'text/csv; charset=utf-8' if output == 'csv' else 'application/x-ndjson; charset=utf-8'
+    response = StreamingHttpResponse(stream(), content_type=content_type)
+    filename = f'impressions_{start_date:%Y%m%d}-{end_date - timedelta(seconds=1):%Y%m%d}.{output}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    if next_cursor:
+        response['X-Next-Cursor'] = next_cursor
+        params = request.GET.copy()
+        params['cursor'] = next_cursor
+        response['Link'] = f'<{request.build_absolute_uri(request.path)}?{params.urlencode()}>; rel="next"'
+    return response
+
+
+# ===============================================
+# Live Impression Feed (api/live.py)
+# ===============================================
+
+def _live_counter_names(allowed, hotspot_filter):
+    """Hotspots whose today-counters a live client gets"""
+    if hotspot_filter and hotspot_filter != 'all':
+        names = [hotspot_filter]
+    else:
+        names = list(Hotspot.objects.values_list('hotspot_name', flat=True))
+    return [name for name in names if allowed is None or name in allowed]
+
+
+def live_stream(request):
+    """
+    Server-Sent Events: `counters` once (today per hotspot), then one
+    `impression` event per new impression. Closes after LIVE_FEED_STREAM_SECONDS;
+    EventSource reconnects and resumes from Last-Event-ID.
+
+    Plain Django view: DRF content negotiation would reject Accept: text/event-stream.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'success': False, 'message': 'Method not allowed'}, status=405)
+    if not request.user.is_authenticated:
+        return JsonResponse({'success': False, 'message': 'Authentication required'}, status=401)
+
+    try:
+        last_id = request.headers.get('Last-Event-ID') or request.GET.get('since')
+        after = int(last_id) if last_id else None
+    except ValueError:
+        after = None
+
+    if not live.connection_slots.acquire(blocking=False):
+        # All live slots busy: client falls back to /api/live/poll/
+        response = JsonResponse({'success': False, 'message': 'Live stream capacity reached, use polling'}, status=503)
+        response['Retry-After'] = '30'
+        return response
+
+    try:
+        allowed = _get_allowed_hotspot_names(request.user)
+        hotspot_filter = request.GET.get('hotspot')
+        snapshot = live.counters(_live_counter_names(allowed, hotspot_filter))
+    except Exception:
+        live.connection_slots.release()
+        raise
+
+    response = StreamingHttpResponse(
+        live.EventStream(snapshot, after=after, allowed=allowed, hotspot=hotspot_filter),
+        content_type='text/event-stream; charset=utf-8',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # no proxy buffering (nginx / IIS ARR)
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def live_poll(request):
+    """
+    Long-poll fallback for live_stream.
+    Without ?since= returns the counters, recent impressions and the current seq;
+    with ?since=<seq> waits up to LIVE_FEED_POLL_TIMEOUT seconds for newer impressions.
+    """
+    allowed = _get_allowed_hotspot_names(request.user)
+    hotspot_filter = request.GET.get('hotspot')
+    try:
+        since = int(request.GET['since']) if request.GET.get('since') else None
+    except ValueError:
+        return Response({'success': False, 'message': 'since must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if since is None:
+        seq = live.feed.latest_seq()
+        return Response({
+            'success': True,
+            'seq': seq,
+            'counters': live.counters(_live_counter_names(allowed, hotspot_filter)),
+            'events': live.visible(live.backlog(), allowed, hotspot_filter),
+        })
+
+    # Without a free slot answer right away (the client's next poll is its wait)
+    timeout = 0
+    acquired = live.connection_slots.acquire(blocking=False)
+    if acquired:
+        timeout = getattr(django_settings, 'LIVE_FEED_POLL_TIMEOUT', 25)
+    try:
+        events, seq = live.wait_for_events(since, timeout, allowed, hotspot_filter)
+    finally:
+        if acquired:
+            live.connection_slots.release()
+    return Response({'success': True, 'seq': seq, 'events': events})
+
+
 # ===============================================
 # Health Check API
 # ===============================================
@@ -1817,6 +2498,21 @@ def health_check(request):
     except Exception:
         checks['logs'] = {'status': 'unknown'}
 
+    # Impression traffic per active hotspot (in-memory monitor, no analytics queries)
+    try:
+        traffic = traffic_monitor.snapshot()
+        silent = sorted(name for name, item in traffic.items() if item['state'] == 'silent')
+        spike = sorted(name for name, item in traffic.items() if item['state'] == 'spike')
+        checks['traffic'] = {
+            'status': 'warning' if silent or spike else 'ok',
+            'silent': silent,
+            'spike': spike,
+            'hotspots': traffic,
+            **traffic_monitor.scope(),  # per_worker: another worker may report other states
+        }
+    except Exception as e:
+        checks['traffic'] = {'status': 'unknown', 'detail': str(e)}
+
     return Response({
         'status': overall,
         'version': '1.0',
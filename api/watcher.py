@@ -0,0 +1,269 @@
+"""
+Background watcher that keeps Hotspot.folder_exists / login_file_exists /
+config_matched live.
+
+Watches BASE_DIR/hotspot* folders with inotify on Linux (via ctypes, no extra
+dependency) and falls back to cheap stat() polling elsewhere (e.g. Windows
+Server). Only the hotspot whose files changed is re-evaluated; the result is
+written to the Hotspot row, which the hotspot list and status endpoints read.
+
+Start it from the server process (deploy/waitress_serve.py) or run it
+standalone with `python manage.py watch_hotspots`.
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .hotspot_files import check_hotspot_files
+
+logger = logging.getLogger(__name__)
+
+# inotify constants (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+IN_NONBLOCK = 0o4000
+
+ROOT_MASK = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO
+FOLDER_MASK = IN_CLOSE_WRITE | IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF
+EVENT_HEADER = struct.Struct('iIII')
+
+# Wait this long after the last event before re-evaluating (editors write in bursts)
+DEBOUNCE_SECONDS = 0.3
+
+
+def is_hotspot_folder_name(name):
+    return name.startswith('hotspot') and '.' not in name
+
+
+def update_hotspot_file_status(hotspot_name):
+    """Re-check one hotspot's files and save the result on its Hotspot row"""
+    from .models import Hotspot
+
+    file_status = check_hotspot_files(hotspot_name)
+    updated = Hotspot.objects.filter(hotspot_name=hotspot_name).update(
+        last_checked=timezone.now(), **file_status
+    )
+    if updated:
+        logger.info(
+            f"[Watcher] {hotspot_name}: folder={file_status['folder_exists']}, "
+            f"file={file_status['login_file_exists']}, config={file_status['config_matched']}"
+        )
+    return file_status
+
+
+class HotspotWatcher:
+    """Watches hotspot folders and updates Hotspot status when their files change"""
+
+    def __init__(self, base_dir=None, poll_interval=5.0, force_polling=False):
+        self.base_dir = str(base_dir or settings.BASE_DIR)
+        self.poll_interval = poll_interval
+        self.force_polling = force_polling
+        self.mode = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    # --- lifecycle -------------------------------------------------------
+
+    def start(self):
+        """Run the watcher in a daemon thread"""
+        if self._thread and self._thread.is_alive():
+            return self
+        self._thread = threading.Thread(target=self.run, name='hotspot-watcher', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def run(self):
+        """Blocking loop: initial sync, then inotify (Linux) or polling"""
+        self._process(self._scan_folders() | self._known_hotspots())
+        inotify = None if self.force_polling else _Inotify.create()
+        try:
+            if inotify:
+                self.mode = 'inotify'
+                logger.info(f"[Watcher] Watching {self.base_dir}/hotspot* with inotify")
+                self._run_inotify(inotify)
+            else:
+                self.mode = 'polling'
+                logger.info(f"[Watcher] Watching {self.base_dir}/hotspot* by polling every {self.poll_interval}s")
+                self._run_polling()
+        finally:
+            if inotify:
+                inotify.close()
+
+    # --- helpers ---------------------------------------------------------
+
+    def _scan_folders(self):
+        try:
+            return {
+                name for name in os.listdir(self.base_dir)
+                if is_hotspot_folder_name(name) and os.path.isdir(os.path.join(self.base_dir, name))
+            }
+        except OSError:
+            return set()
+
+    def _known_hotspots(self):
+        from .models import Hotspot
+
+        close_old_connections()
+        try:
+            return set(Hotspot.objects.values_list('hotspot_name', flat=True))
+        except Exception as e:
+            logger.error(f"[Watcher] Could not load hotspots: {str(e)}")
+            return set()
+
+    def _process(self, hotspot_names):
+        if not hotspot_names:
+            return
+        close_old_connections()
+        try:
+            for name in sorted(hotspot_names):
+                try:
+                    update_hotspot_file_status(name)
+                except Exception as e:
+                    logger.error(f"[Watcher] Error updating {name}: {str(e)}", exc_info=True)
+        finally:
+            close_old_connections()
+
+    def _signature(self, name):
+        try:
+            st = os.stat(os.path.join(self.base_dir, name, 'login.html'))
+            return (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            return None if not os.path.isdir(os.path.join(self.base_dir, name)) else 'no-login'
+
+    # --- polling fallback --------------------------------------------------
+
+    def _run_polling(self):
+        signatures = {name: self._signature(name) for name in self._scan_folders()}
+        while not self._stop.wait(self.poll_interval):
+            current_names = self._scan_folders() | set(signatures)
+            changed = set()
+            for name in current_names:
+                sig = self._signature(name)
+                if signatures.get(name, 'unseen') != sig:
+                    changed.add(name)
+                if sig is None:
+                    signatures.pop(name, None)
+                else:
+                    signatures[name] = sig
+            self._process(changed)
+
+    # --- inotify -----------------------------------------------------------
+
+    def _run_inotify(self, inotify):
+        wd_to_name = {}
+        root_wd = inotify.add_watch(self.base_dir, ROOT_MASK)
+
+        def watch_folder(name):
+            wd = inotify.add_watch(os.path.join(self.base_dir, name), FOLDER_MASK)
+            if wd >= 0:
+                wd_to_name[wd] = name
+
+        for name in self._scan_folders():
+            watch_folder(name)
+
+        dirty = set()
+        last_event = 0.0
+        while not self._stop.is_set():
+            timeout = DEBOUNCE_SECONDS if dirty else 1.0
+            for wd, mask, name in inotify.read_events(timeout):
+                if wd == root_wd:
+                    if not is_hotspot_folder_name(name):
+                        continue
+                    if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                        watch_folder(name)
+                    dirty.add(name)
+                elif mask & IN_IGNORED:
+                    wd_to_name.pop(wd, None)
+                elif wd in wd_to_name and (name in ('', 'login.html') or mask & (IN_DELETE_SELF | IN_MOVE_SELF)):
+                    dirty.add(wd_to_name[wd])
+                else:
+                    continue
+                last_event = time.monotonic()
+
+            if dirty and time.monotonic() - last_event >= DEBOUNCE_SECONDS:
+                self._process(dirty)
+                dirty = set()
+
+
+class _Inotify:
+    """Minimal ctypes wrapper around the Linux inotify API"""
+
+    def __init__(self, libc, fd):
+        self._libc = libc
+        self.fd = fd
+
+    @classmethod
+    def create(cls):
+        if not sys.platform.startswith('linux'):
+            return None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        except (OSError, AttributeError):
+            return None
+        if fd < 0:
+            return None
+        return cls(libc, fd)
+
+    def add_watch(self, path, mask):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), ctypes.c_uint32(mask))
+        if wd < 0:
+            logger.warning(f"[Watcher] inotify_add_watch failed for {path}: errno {ctypes.get_errno()}")
+        return wd
+
+    def read_events(self, timeout):
+        """Yield (wd, mask, name) tuples, waiting up to timeout seconds"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0').decode('utf-8', 'replace')
+            offset += length
+            yield wd, mask, name
+
+    def close(self):
+        os.close(self.fd)
+
+
+_watcher = None
+_watcher_lock = threading.Lock()
+
+
+def start_watcher(**kwargs):
+    """Start the process-wide watcher once (no-op if already running)"""
+    global _watcher
+    with _watcher_lock:
+        if _watcher is None:
+            _watcher = HotspotWatcher(**kwargs).start()
+    return _watcher
@@ -0,0 +1,149 @@
+"""
+SQLiteCache — a cache backend shared by every server process on one machine.
+
+LocMemCache is per process: with WAITRESS_WORKERS > 1 each worker would keep
+its own landing-URL / fast-path entries, throttle counters and content
+version, and serve stale data after an edit. This backend keeps entries in a
+small SQLite file (WAL mode, separate from db.sqlite3), so all workers see the
+same values and cache.incr() is atomic across processes.
+
+Hot paths layer a per-process copy on top (see api/fastpath.py), keyed by the
+shared content version, so edits still reach every worker immediately.
+
+CACHES = {'default': {'BACKEND': 'backend.cache_backends.SQLiteCache',
+                      'LOCATION': BASE_DIR / 'cache' / 'shared_cache.sqlite3'}}
+"""
+
+import os
+import pickle
+import random
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = 'CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)'
+CULL_PROBABILITY = 0.01  # fraction of set() calls that also prune the table
+
+
+class SQLiteCache(BaseCache):
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = str(location)
+        self._local = threading.local()
+
+    # --- connection ----------------------------------------------------------
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        os.makedirs(os.path.dirname(self._path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self._path, timeout=5, isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = OFF')  # cache contents are disposable
+        conn.execute(SCHEMA)
+        conn.execute('CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)')
+        self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    @staticmethod
+    def _dumps(value):
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _live(expires):
+        return expires is None or expires > time.time()
+
+    # --- BaseCache API -----------------------------------------------------
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._connection().execute('SELECT value, expires FROM cache WHERE key = ?', (key,)).fetchone()
+        if row is None or not self._live(row[1]):
+            return default
+        return pickle.loads(row[0])
+
+    def get_many(self, keys, version=None):
+        key_map = {self.make_and_validate_key(key, version=version): key for key in keys}
+        if not key_map:
+            return {}
+        placeholders = ','.join('?' * len(key_map))
+        rows = self._connection().execute(
+            f'SELECT key, value, expires FROM cache WHERE key IN ({placeholders})', list(key_map)
+        ).fetchall()
+        return {key_map[k]: pickle.loads(v) for k, v, expires in rows if self._live(expires)}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        conn = self._connection()
+        conn.execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)',
+            (key, self._dumps(value), self.get_backend_timeout(timeout)),
+        )
+        if random.random() < CULL_PROBABILITY:
+            self._cull(conn)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._connection().execute(
+            'INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires = excluded.expires '
+            'WHERE cache.expires IS NOT NULL AND cache.expires <= ?',
+            (key, self._dumps(value), self.get_backend_timeout(timeout), time.time()),
+        )
+        return cursor.rowcount > 0
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._connection().execute(
+            'UPDATE cache SET expires = ? WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), key, time.time()),
+        )
+        return cursor.rowcount > 0
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._connection().execute('DELETE FROM cache WHERE key = ?', (key,)).rowcount > 0
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._connection().execute('SELECT expires FROM cache WHERE key = ?', (key,)).fetchone()
+        return row is not None and self._live(row[0])
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')  # atomic read-modify-write across processes
+        try:
+            row = conn.execute('SELECT value, expires FROM cache WHERE key = ?', (key,)).fetchone()
+            if row is None or not self._live(row[1]):
+                raise ValueError(f"Key '{key}' not found")
+            new_value = pickle.loads(row[0]) + delta
+            conn.execute('UPDATE cache SET value = ? WHERE key = ?', (self._dumps(new_value), key))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return new_value
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # Called at the end of every request; the per-thread connection is reused.
+        pass
+
+    def _cull(self, conn):
+        conn.execute('DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?', (time.time(),))
+        count = conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count > self._max_entries and self._cull_frequency == 0:
+            conn.execute('DELETE FROM cache')
+        elif count > self._max_entries:
+            # Same policy as Django's DB cache: drop 1/cull_frequency of the entries, soonest-expiring first
+            conn.execute(
+                'DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY expires IS NULL, expires LIMIT ?)',
+                (max(1, count // self._cull_frequency),),
+            )
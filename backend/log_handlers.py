@@ -0,0 +1,119 @@
+"""
+Non-blocking logging for request threads.
+
+AsyncQueueHandler only puts the LogRecord on an in-memory queue; a background
+QueueListener thread formats it and hands it to the real handlers (the
+RotatingFileHandler and console handler defined in settings.LOGGING). Disk
+I/O, the file handler lock and log rotation therefore never run inside a
+Waitress request thread. If the queue is full (e.g. the log disk stalls),
+records are dropped and counted instead of blocking the request.
+
+SamplingFilter keeps only a fraction of INFO/DEBUG records from chatty
+hot-path loggers (e.g. api.views.hotpath). WARNING and above are never sampled.
+"""
+
+import atexit
+import logging
+import queue
+import random
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep records from a logger (or its children) with the configured probability.
+    rates: {'api.views.hotpath': 0.05} — 1.0 keeps everything, 0 drops all INFO.
+    """
+
+    def __init__(self, rates=None):
+        super().__init__()
+        self.rates = dict(rates or {})
+
+    def _rate_for(self, logger_name):
+        name = logger_name
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition('.')[0]
+        return 1.0
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate_for(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class AsyncQueueHandler(QueueHandler):
+    """
+    QueueHandler that forwards to other handlers from the same dictConfig.
+
+    targets: the handlers themselves, given as 'cfg://handlers.<name>' (as the
+             stdlib QueueHandler 'handlers' key does from Python 3.12).
+             dictConfig creates handlers in sorted name order, so this handler's
+             own name must sort after its targets (settings.LOGGING uses 'queue').
+    sampling: optional per-logger rates, see SamplingFilter.
+    maxsize: queue bound; records beyond it are dropped, never waited on.
+    """
+
+    def __init__(self, targets=(), sampling=None, maxsize=10000):
+        super().__init__(queue.Queue(maxsize=maxsize))
+        self.dropped = 0
+        self._listener = None
+        self._start_lock = threading.Lock()
+        # Indexing (not iterating) makes dictConfig resolve cfg:// references
+        self.targets = [targets[i] for i in range(len(targets))]
+        for target in self.targets:
+            if not isinstance(target, logging.Handler):
+                raise ValueError(f'Log handler target {target!r} is not a configured handler (yet)')
+        if sampling:
+            self.addFilter(SamplingFilter(sampling))
+
+    def _ensure_listener(self):
+        if self._listener is not None:
+            return
+        with self._start_lock:
+            if self._listener is None:
+                listener = QueueListener(self.queue, *self.targets, respect_handler_level=True)
+                listener.start()
+                self._listener = listener
+                atexit.register(self._stop_listener)  # flush remaining records on shutdown
+
+    def _stop_listener(self):
+        with self._start_lock:
+            if self._listener is not None:
+                self._listener.stop()
+                self._listener = None
+
+    def prepare(self, record):
+        # Formatting happens in the listener thread (lazy %-args stay unformatted here).
+        # Only the traceback is rendered now, while the frames are still alive.
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self.dropped:
+            dropped, self.dropped = self.dropped, 0
+            notice = logging.LogRecord(
+                'backend.log_handlers', logging.WARNING, __file__, 0,
+                'Log queue full: dropped %d record(s)', (dropped,), None,
+            )
+            try:
+                self.queue.put_nowait(notice)
+            except queue.Full:
+                self.dropped += dropped
+
+    def emit(self, record):
+        self._ensure_listener()
+        super().emit(record)
+
+    def close(self):
+        self._stop_listener()
+        super().close()
@@ -0,0 +1,382 @@
+"""
+In-process metrics in Prometheus text format (no prometheus_client dependency).
+
+MetricsMiddleware records, per resolved URL route:
+  - request latency histogram (labelled with the hotspot for known hotspots,
+    so bursts from one MikroTik site are visible in p99)
+  - responses by status code
+  - DB query count and DB time per request (via connection.execute_wrapper)
+
+Subsystems record their own counters/histograms from the module-level
+instruments below (landing-URL cache, impressions, Pillow, PDF).
+Everything is exposed at /metrics/ (see backend/urls.py).
+
+Values are per process: with several server processes, scrape each one
+or aggregate with the Prometheus `sum by` functions.
+"""
+
+import bisect
+import hmac
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+PROCESSING_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    pairs.extend(f'{n}="{_escape(v)}"' for n, v in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children = {}
+
+    def labels(self, *values):
+        if len(values) != len(self.labelnames):
+            raise ValueError(f'{self.name} expects labels {self.labelnames}')
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _samples(self):
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        lines.extend(self._samples())
+        return lines
+
+
+class _Value:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def set(self, value):
+        with self._lock:
+            self.value = value
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def _samples(self):
+        for key, child in sorted(self._children.items()):
+            yield f'{self.name}_total{_format_labels(self.labelnames, key)} {_format_value(child.value)}'
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), function=None):
+        super().__init__(name, documentation, labelnames)
+        self.function = function  # callable returning the current value, or {label values: value} for labelled gauges
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def dec(self, amount=1):
+        self.labels().dec(amount)
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def _samples(self):
+        if self.function is not None:
+            value = self.function()
+            if isinstance(value, dict):
+                for key, child_value in sorted(value.items()):
+                    yield f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(child_value)}'
+            else:
+                yield f'{self.name} {_format_value(value)}'
+            return
+        for key, child in sorted(self._children.items()):
+            yield f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}'
+
+
+class _HistogramValue:
+    def __init__(self, buckets):
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def _samples(self):
+        for key, child in sorted(self._children.items()):
+            with child._lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, [('le', _format_value(bound))])
+                yield f'{self.name}_bucket{labels} {cumulative}'
+            labels = _format_labels(self.labelnames, key)
+            yield f'{self.name}_sum{labels} {_format_value(total)}'
+            yield f'{self.name}_count{labels} {cumulative}'
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f'Metric {metric.name} already registered')
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        lines = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+_PROCESS_START = time.time()
+
+# --- HTTP (MetricsMiddleware) ---------------------------------------------
+REQUEST_LATENCY = registry.register(Histogram(
+    'liblogin_http_request_duration_seconds', 'Request latency by route and hotspot',
+    ['view', 'method', 'hotspot'],
+))
+RESPONSES = registry.register(Counter(
+    'liblogin_http_responses', 'Responses by route and status code', ['view', 'method', 'status'],
+))
+REQUESTS_IN_FLIGHT = registry.register(Gauge(
+    'liblogin_http_requests_in_flight', 'Requests currently being processed',
+))
+DB_QUERIES = registry.register(Histogram(
+    'liblogin_db_queries_per_request', 'Number of DB queries per request', ['view'], buckets=QUERY_COUNT_BUCKETS,
+))
+DB_DURATION = registry.register(Histogram(
+    'liblogin_db_duration_seconds', 'Total DB time per request', ['view'],
+))
+
+# --- Subsystems -------------------------------------------------------------
+LANDING_URL_CACHE = registry.register(Counter(
+    'liblogin_landing_url_cache', 'Landing URL cache lookups', ['result'],
+))
+PUBLIC_RESPONSE_CACHE = registry.register(Counter(
+    'liblogin_public_response_cache', 'Fast-path public API response cache lookups', ['endpoint', 'result'],
+))
+IMPRESSIONS_INGESTED = registry.register(Counter(
+    'liblogin_impressions_ingested', 'Page impressions recorded', ['device_type'],
+))
+IMAGE_PROCESSING = registry.register(Histogram(
+    'liblogin_image_processing_seconds', 'Pillow processing time for uploaded images', ['operation'],
+    buckets=PROCESSING_BUCKETS,
+))
+PDF_RENDER = registry.register(Histogram(
+    'liblogin_pdf_render_seconds', 'ReportLab PDF render time', ['report'], buckets=PROCESSING_BUCKETS,
+))
+
+
+def _traffic(field):
+    from api.traffic_monitor import metric_samples
+    return metric_samples(field)
+
+
+# --- Per-hotspot traffic monitor (api/traffic_monitor.py), evaluated at scrape time ---
+registry.register(Gauge(
+    'liblogin_hotspot_traffic_state', 'Traffic state of each active hotspot (1 = current): ok, silent, spike, learning',
+    ['hotspot', 'state'], function=lambda: _traffic('state'),
+))
+registry.register(Gauge(
+    'liblogin_hotspot_impression_rate', 'EWMA impressions per hour seen by this process',
+    ['hotspot'], function=lambda: _traffic('rate'),
+))
+registry.register(Gauge(
+    'liblogin_hotspot_expected_impression_rate', 'Hour-of-week baseline impressions per hour for this process',
+    ['hotspot'], function=lambda: _traffic('expected'),
+))
+registry.register(Gauge(
+    'liblogin_hotspot_idle_seconds', 'Seconds since the last impression this process recorded',
+    ['hotspot'], function=lambda: _traffic('idle'),
+))
+HOTSPOT_TRAFFIC_TRANSITIONS = registry.register(Counter(
+    'liblogin_hotspot_traffic_transitions', 'Hotspot traffic state changes, by new state', ['state'],
+))
+registry.register(Gauge(
+    'liblogin_process_start_time_seconds', 'Unix time the process started', function=lambda: _PROCESS_START,
+))
+
+
+# ===============================================
+# Middleware
+# ===============================================
+
+_known_hotspots = {'names': frozenset(), 'loaded_at': 0.0}
+_KNOWN_HOTSPOTS_TTL = 60  # seconds
+
+
+def _hotspot_label(request):
+    """hotspot_name query parameter, only for hotspots that exist (keeps label cardinality bounded)"""
+    hotspot_name = request.GET.get('hotspot_name')
+    if not hotspot_name:
+        return ''
+    if time.monotonic() - _known_hotspots['loaded_at'] > _KNOWN_HOTSPOTS_TTL:
+        from api.models import Hotspot
+        try:
+            _known_hotspots['names'] = frozenset(Hotspot.objects.values_list('hotspot_name', flat=True))
+        except Exception:
+            pass
+        _known_hotspots['loaded_at'] = time.monotonic()
+    return hotspot_name if hotspot_name in _known_hotspots['names'] else 'other'
+
+
+def _view_label(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<unresolved>'
+    return match.route or match.view_name
+
+
+class _QueryTimer:
+    """connection.execute_wrapper that counts queries and their total time"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+class MetricsMiddleware:
+    """Record latency, status code and DB usage for every request"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.path == '/metrics/':
+            return self.get_response(request)
+
+        timer = _QueryTimer()
+        REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            with connections['default'].execute_wrapper(timer):
+                response = self.get_response(request)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+        elapsed = time.perf_counter() - start
+
+        view = _view_label(request)
+        REQUEST_LATENCY.labels(view, request.method, _hotspot_label(request)).observe(elapsed)
+        RESPONSES.labels(view, request.method, response.status_code).inc()
+        DB_QUERIES.labels(view).observe(timer.count)
+        DB_DURATION.labels(view).observe(timer.duration)
+        return response
+
+
+# ===============================================
+# /metrics/ endpoint
+# ===============================================
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint. Requires 'Authorization: Bearer <METRICS_TOKEN>'
+    when METRICS_TOKEN is set, otherwise a staff session (like /sql-profile/).
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        supplied = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(supplied.encode(), f'Bearer {token}'.encode()):
+            return HttpResponseForbidden('Forbidden')
+    else:
+        user = getattr(request, 'user', None)
+        if not (user and user.is_authenticated and user.is_staff):
+            return HttpResponseForbidden('Forbidden')
+    return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
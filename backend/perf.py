@@ -0,0 +1,447 @@
+"""
+Performance regression suite: per-route SQL query count, median latency and
+peak allocation, checked against the budgets in backend/perf_budgets.json.
+
+api/tests.py and webapp/tests.py declare one Case per route (method + URL
+name) and run them in-process with the Django test runner against a seeded
+database (three hotspots, two weeks of impressions, content for each):
+
+  python manage.py test api webapp
+  PERF_UPDATE_BUDGETS=True python manage.py test api webapp   # re-baseline after an intended change
+
+Every case gets one warm-up request (fills the public caches, as in
+production), PERF_ITERATIONS timed requests, one request with every statement
+captured (sql_profiler.assert_max_queries, so a failure lists the repeated
+statements and their call sites — the N+1) and PERF_ALLOC_RUNS under
+tracemalloc, keeping the lowest peak (a log listener or writer thread
+allocating at the same moment only inflates one of them). It fails
+on an unexpected status or when it exceeds its query budget, its median_ms
+budget times PERF_LATENCY_FACTOR (raise it on slow machines) or its alloc_kib
+budget. Every named route in the app's urls.py must have a case.
+
+Each run writes PERF_REPORT (default perf_report.json) with the measurements,
+the budgets and the git version, so reports from two versions can be diffed.
+"""
+
+import io
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import timedelta
+from hashlib import sha256
+from math import ceil
+from pathlib import Path
+from statistics import median
+from types import SimpleNamespace
+from unittest import mock
+from urllib.parse import urlencode
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, override_settings
+from django.urls import URLPattern, URLResolver, reverse
+from django.utils import timezone
+from PIL import Image
+
+from .sql_profiler import QueryBudgetExceeded, assert_max_queries
+
+BUDGETS_PATH = Path(__file__).with_name('perf_budgets.json')
+ITERATIONS = int(os.getenv('PERF_ITERATIONS', '7'))
+LATENCY_FACTOR = float(os.getenv('PERF_LATENCY_FACTOR', '1.0'))
+UPDATE_BUDGETS = os.getenv('PERF_UPDATE_BUDGETS', 'False') == 'True'
+
+# Headroom written by PERF_UPDATE_BUDGETS: query counts are exact, timings are not
+LATENCY_HEADROOM = 3.0
+LATENCY_FLOOR_MS = 5.0
+ALLOC_HEADROOM = 2.0
+ALLOC_FLOOR_KIB = 256  # peaks below this are mostly interpreter / thread noise
+ALLOC_RUNS = int(os.getenv('PERF_ALLOC_RUNS', '3'))
+
+SEED_HOTSPOTS = ('perf_library', 'perf_lab', 'perf_wifi')
+SEED_DAYS = int(os.getenv('PERF_SEED_DAYS', '14'))
+SEED_PER_DAY = int(os.getenv('PERF_SEED_PER_DAY', '60'))
+SEED_PASSWORD = 'perf-password'
+
+USER_AGENTS = (
+    ('Mozilla/5.0 (iPhone; CPU iPhone OS 17_5 like Mac OS X) Mobile/15E148 Safari/604.1', 'mobile'),
+    ('Mozilla/5.0 (Linux; Android 14; SM-A546E) Chrome/126.0 Mobile Safari/537.36', 'mobile'),
+    ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/126.0 Safari/537.36', 'desktop'),
+    ('Mozilla/5.0 (iPad; CPU OS 17_5 like Mac OS X) Mobile/15E148 Safari/604.1', 'tablet'),
+)
+
+# Measurements of this process, written to PERF_REPORT after each test class
+_results = {}
+
+
+# ===============================================
+# Cases
+# ===============================================
+
+class Case:
+    """
+    One request to measure. `args`, `query` and `data` may be callables taking
+    the seed namespace, evaluated before every request (fresh objects for
+    DELETE, fresh MACs for track-impression). `prepare(client, seed)` runs
+    before every request, outside the timing.
+    """
+
+    def __init__(self, name, method='GET', args=(), query=None, data=None, user='staff',
+                 status=200, form=False, prepare=None, stream=True, label=None):
+        self.name = name
+        self.method = method
+        self.args = args
+        self.query = query
+        self.data = data
+        self.user = user
+        self.status = (status,) if isinstance(status, int) else tuple(status)
+        self.form = form
+        self.prepare = prepare
+        self.stream = stream
+        self.key = f'{method} {name}' + (f' ({label})' if label else '')
+
+    def request(self, client, seed, remote_addr):
+        resolve = lambda value: value(seed) if callable(value) else value
+        if self.prepare:
+            self.prepare(client, seed)
+        path = reverse(self.name, args=resolve(self.args))
+        query = resolve(self.query)
+        data = resolve(self.data)
+        extra = {'REMOTE_ADDR': remote_addr}
+
+        send = getattr(client, self.method.lower())
+        if self.method == 'GET':
+            return send(path, query, **extra)
+        if query:
+            path += '?' + urlencode(query)
+        if self.form:
+            return send(path, data or {}, **extra)
+        return send(path, data or {}, content_type='application/json', **extra)
+
+
+def route_names(urlconf_module):
+    """URL names declared in a urls module, router routes included"""
+    names = set()
+
+    def walk(patterns):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                walk(pattern.url_patterns)
+            elif isinstance(pattern, URLPattern) and pattern.name:
+                names.add(pattern.name)
+
+    walk(urlconf_module.urlpatterns)
+    return names
+
+
+def load_budgets():
+    try:
+        with open(BUDGETS_PATH, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+# ===============================================
+# Seed data
+# ===============================================
+
+def drain_log_queues():
+    """
+    Wait until every AsyncQueueHandler's listener has written what is queued.
+
+    The listener thread formats records while the next case runs; tracemalloc
+    counts every thread, so an undrained queue inflates that case's peak.
+    """
+    from .log_handlers import AsyncQueueHandler
+
+    loggers = [logging.getLogger(), *logging.Logger.manager.loggerDict.values()]
+    for logger in loggers:
+        for handler in getattr(logger, 'handlers', ()):
+            if isinstance(handler, AsyncQueueHandler) and handler._listener is not None:
+                handler.queue.join()
+
+
+def png_upload(name='perf.png', size=(64, 36)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (32, 96, 160)).save(buffer, format='PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+def new_background(seed):
+    """Case args: a fresh background on perf_wifi for routes that delete one"""
+    from api.models import BackgroundImage
+
+    return (BackgroundImage.objects.create(title='Perf delete', image=png_upload(), hotspot_name='perf_wifi').pk,)
+
+
+def seed(rng_seed=46):
+    """Users, hotspots, content and SEED_DAYS days of impressions; returns a namespace of the objects"""
+    from api import rollups
+    from api.models import (
+        BackgroundImage, CardContent, Department, Hotspot, LandingPageURL, PageImpression,
+        SlideContent, SystemSettings, TemplateConfig,
+    )
+
+    rng = random.Random(rng_seed)
+    staff = User.objects.create_user('perf_admin', password=SEED_PASSWORD, is_staff=True, is_superuser=True)
+    member = User.objects.create_user('perf_member', password=SEED_PASSWORD)
+    hotspots = [
+        Hotspot.objects.create(hotspot_name=name, display_name=name.replace('_', ' ').title(), is_active=True, created_by=staff)
+        for name in SEED_HOTSPOTS
+    ]
+    department = Department.objects.create(name='Perf Department', created_by=staff)
+    department.hotspots.add(hotspots[1])
+    department.users.add(member)
+    system_settings = SystemSettings.objects.create(
+        organization_name='Perf University', library_name='Perf Library', default_hotspot_name=SEED_HOTSPOTS[0],
+    )
+
+    backgrounds, slides, cards, landing_urls = [], [], [], []
+    for name in (None,) + SEED_HOTSPOTS:
+        backgrounds.append(BackgroundImage.objects.create(
+            title=f'Background {name or "default"}', image=png_upload(), hotspot_name=name, is_active=True, uploaded_by=staff,
+        ))
+        TemplateConfig.objects.create(
+            template_name=f'Template {name or "default"}', left_panel_component='slideshow',
+            hotspot_name=name, is_active=True, created_by=staff,
+        )
+        for order in range(4):
+            slides.append(SlideContent.objects.create(
+                title=f'Slide {order}', description='Perf slide', hotspot_name=name, order=order, created_by=staff,
+            ))
+        for order in range(3):
+            cards.append(CardContent.objects.create(
+                title=f'Card {order}', description='Perf card', hotspot_name=name, order=order, created_by=staff,
+            ))
+        if name:
+            landing_urls.append(LandingPageURL.objects.create(
+                title=f'Portal {name}', url=f'https://example.org/{name}', hotspot_name=name, is_active=True, created_by=staff,
+            ))
+
+    now = timezone.now()
+    impressions = []
+    for name in SEED_HOTSPOTS:
+        macs = [sha256(f'{name}-{i}'.encode()).hexdigest() for i in range(SEED_PER_DAY * 2)]
+        for day in range(SEED_DAYS):
+            seen = set()
+            for _ in range(SEED_PER_DAY):
+                mac_hash = rng.choice(macs)
+                user_agent, device_type = rng.choice(USER_AGENTS)
+                impression = PageImpression(
+                    hotspot_name=name,
+                    viewed_at=now - timedelta(days=day, seconds=rng.randrange(86400)),
+                    mac_hash=mac_hash,
+                    ip_address=f'10.5.{day}.{rng.randrange(1, 255)}',
+                    device_type=device_type,
+                    user_agent=user_agent,
+                    time_on_page=rng.randint(2, 120),
+                    is_unique_today=mac_hash not in seen,
+                )
+                impression.set_local_time()
+                seen.add(mac_hash)
+                impressions.append(impression)
+    PageImpression.objects.bulk_create(impressions, batch_size=500)
+    rollups.rebuild(timezone.localdate(now - timedelta(days=SEED_DAYS)), timezone.localdate(now))
+
+    return SimpleNamespace(
+        staff=staff, member=member, hotspots=hotspots, department=department, settings=system_settings,
+        backgrounds=backgrounds, slides=slides, cards=cards, landing_urls=landing_urls,
+    )
+
+
+# ===============================================
+# Test case
+# ===============================================
+
+class RoutePerformanceMixin:
+    """
+    Mix into a TransactionTestCase (writes commit and on_commit cache
+    invalidation runs, as in production) and set `urlconf`, the urls module
+    whose routes must all be covered, and `cases`.
+    """
+
+    urlconf = None
+    cases = ()
+
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.mkdtemp(prefix='liblogin-perf-')
+        # Files the views write (uploads, generated login.html, bundles) go to the temp dir
+        cls._settings = override_settings(
+                MEDIA_ROOT=os.path.join(cls._tmp, 'media'),
+                HOTSPOT_BUNDLE_CACHE_DIR=os.path.join(cls._tmp, 'bundles'),
+                IMPRESSION_ARCHIVE_DIR=Path(cls._tmp) / 'archive',
+                CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'liblogin-perf'}},
+                PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+                SQL_PROFILE=False,
+                SQL_SLOW_QUERY_MS=0,
+        )
+        cls._login_html = mock.patch('api.hotspot_files.login_html_path', lambda name: os.path.join(cls._tmp, name, 'login.html'))
+        cls._settings.enable()
+        cls._login_html.start()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls._login_html.stop()
+        cls._settings.disable()
+        shutil.rmtree(cls._tmp, ignore_errors=True)
+        write_report()
+        if UPDATE_BUDGETS:
+            update_budgets([case.key for case in cls.cases])
+
+    def client_for(self, user):
+        client = Client()
+        if user == 'staff':
+            client.force_login(self.seed.staff)
+        elif user == 'member':
+            client.force_login(self.seed.member)
+        return client
+
+    def measure(self, case):
+        """(result dict, [failure messages]) for one case"""
+        cache.clear()  # each case starts cold, with empty DRF throttle history
+        client = self.client_for(case.user)
+        budget = load_budgets().get(case.key)
+        failures = []
+        addresses = (f'10.46.{(i >> 8) & 255}.{i & 255}' for i in range(1, 65536))
+
+        def run():
+            response = case.request(client, self.seed, next(addresses))
+            if case.stream and response.streaming:
+                b''.join(response.streaming_content)
+            response.close()
+            if response.status_code not in case.status:
+                body = b'' if response.streaming else response.content[:200]
+                message = f'status {response.status_code}, expected {case.status} {body.decode(errors="replace")}'
+                if message not in failures:
+                    failures.append(message)
+            return response
+
+        run()  # warm-up
+        timings = []
+        for _ in range(ITERATIONS):
+            start = time.perf_counter()
+            run()
+            timings.append((time.perf_counter() - start) * 1000)
+
+        max_queries = budget['queries'] if budget and not UPDATE_BUDGETS else 10 ** 6
+        try:
+            with assert_max_queries(max_queries) as recorder:
+                run()
+        except QueryBudgetExceeded as e:
+            failures.append(f'query budget: {e}')
+
+        peaks = []
+        for _ in range(ALLOC_RUNS):
+            drain_log_queues()
+            tracemalloc.start()
+            try:
+                run()
+                peaks.append(tracemalloc.get_traced_memory()[1])
+            finally:
+                tracemalloc.stop()
+        peak = min(peaks)
+
+        timings.sort()
+        result = {
+            'queries': recorder.count,
+            'median_ms': round(median(timings), 2),
+            'p90_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.9))], 2),
+            'alloc_kib': round(peak / 1024, 1),
+            'budget': budget,
+        }
+        if not UPDATE_BUDGETS:
+            if budget is None:
+                failures.append('no budget in backend/perf_budgets.json (run with PERF_UPDATE_BUDGETS=True)')
+            else:
+                if result['median_ms'] > budget['median_ms'] * LATENCY_FACTOR:
+                    failures.append(f"median {result['median_ms']} ms > budget {budget['median_ms']} ms x {LATENCY_FACTOR}")
+                if result['alloc_kib'] > budget['alloc_kib']:
+                    failures.append(f"peak allocation {result['alloc_kib']} KiB > budget {budget['alloc_kib']} KiB")
+        result['ok'] = not failures
+        return result, failures
+
+    def test_route_budgets(self):
+        self.seed = seed()
+        for case in self.cases:
+            with self.subTest(case.key):
+                result, failures = self.measure(case)
+                _results[case.key] = result
+                self.assertFalse(failures, '\n'.join(failures))
+
+    def test_every_route_has_a_case(self):
+        missing = route_names(self.urlconf) - {case.name for case in self.cases}
+        self.assertFalse(missing, f'Routes without a performance case: {sorted(missing)}')
+
+    def test_budgets_within_runtime_query_budgets(self):
+        # SQL_QUERY_BUDGETS is what the profiler enforces at runtime; the suite may only be stricter
+        budgets = load_budgets()
+        runtime = getattr(settings, 'SQL_QUERY_BUDGETS', {})
+        for case in self.cases:
+            if case.key in budgets and case.name in runtime:
+                self.assertLessEqual(budgets[case.key]['queries'], runtime[case.name], case.key)
+
+
+# ===============================================
+# Report / budgets
+# ===============================================
+
+def _git_version():
+    try:
+        return subprocess.run(
+            ['git', 'describe', '--always', '--dirty'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def write_report():
+    path = Path(os.getenv('PERF_REPORT', settings.BASE_DIR / 'perf_report.json'))
+    report = {
+        'version': _git_version(),
+        'created_at': timezone.now().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': settings.DATABASES['default']['ENGINE'].rsplit('.', 1)[-1],
+            'public_api_fast_path': getattr(settings, 'PUBLIC_API_FAST_PATH', False),
+            'machine': platform.machine(),
+        },
+        'iterations': ITERATIONS,
+        'latency_factor': LATENCY_FACTOR,
+        'seed': {'hotspots': len(SEED_HOTSPOTS), 'days': SEED_DAYS, 'per_day': SEED_PER_DAY},
+        'routes': dict(sorted(_results.items())),
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+        f.write('\n')
+
+
+def update_budgets(keys):
+    """Rewrite the budgets of `keys` from this run's measurements (with headroom)"""
+    budgets = load_budgets()
+    for key in keys:
+        if key not in _results:
+            continue
+        result = _results[key]
+        budgets[key] = {
+            'queries': result['queries'],
+            'median_ms': max(LATENCY_FLOOR_MS, ceil(result['median_ms'] * LATENCY_HEADROOM)),
+            'alloc_kib': max(ALLOC_FLOOR_KIB, ceil(result['alloc_kib'] * ALLOC_HEADROOM / 16) * 16),
+        }
+    with open(BUDGETS_PATH, 'w', encoding='utf-8') as f:
+        json.dump(dict(sorted(budgets.items())), f, indent=2)
+        f.write('\n')
@@ -0,0 +1,63 @@
+"""
+Sliding-expiry sessions without a write on every request.
+
+SESSION_SAVE_EVERY_REQUEST rewrote the django_session row on every
+authenticated request (monitoring polls impression-statistics and
+hotspot-choices), competing with impression inserts for the SQLite write lock.
+
+SessionStore (SESSION_ENGINE = 'backend.sessions') is Django's cached_db
+store — reads are served from the cache, saves go to the DB and the cache —
+with the server-side lifetime extended by SESSION_REFRESH_INTERVAL.
+
+SlidingSessionMiddleware re-saves an unmodified session only once it was last
+saved more than SESSION_REFRESH_INTERVAL seconds ago. Every request therefore
+still leaves at least SESSION_COOKIE_AGE (8 h) of idle time, and at most
+SESSION_COOKIE_AGE + SESSION_REFRESH_INTERVAL, with one write per interval
+instead of one per request.
+"""
+
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+
+REFRESHED_AT_KEY = '_sliding_refreshed_at'
+
+
+def refresh_interval():
+    return getattr(settings, 'SESSION_REFRESH_INTERVAL', 900)
+
+
+class SessionStore(CachedDBStore):
+
+    def get_session_cookie_age(self):
+        # Server-side lifetime (DB expire_date + cache timeout) for sessions without set_expiry():
+        # slack so a refresh skipped within the interval never shortens the idle timeout
+        return settings.SESSION_COOKIE_AGE + refresh_interval()
+
+    def save(self, must_create=False):
+        self._get_session()[REFRESHED_AT_KEY] = int(time.time())
+        super().save(must_create=must_create)
+
+
+class SlidingSessionMiddleware:
+    """
+    Place after SessionMiddleware. Marks the session modified (so
+    SessionMiddleware saves it) only when its last save is older than
+    SESSION_REFRESH_INTERVAL; replaces SESSION_SAVE_EVERY_REQUEST.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        session = getattr(request, 'session', None)
+        if session is None or session.modified or not session.accessed or session.is_empty():
+            return response
+        if response.status_code == 500:
+            return response
+        refreshed_at = session.get(REFRESHED_AT_KEY, 0)
+        if time.time() - refreshed_at >= refresh_interval():
+            session.modified = True
+        return response
@@ -54,12 +54,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'backend.metrics.MetricsMiddleware',  # outermost: measures the full request (see /metrics/)
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'backend.sessions.SlidingSessionMiddleware',  # re-save sessions once per SESSION_REFRESH_INTERVAL
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'backend.sql_profiler.SqlProfilerMiddleware',  # slow-query log, SQL profiling + query budgets
     'django.contrib.messages.middleware.MessageMiddleware',
     # 'django.middleware.clickjacking.XFrameOptionsMiddleware',  # Disabled to allow iframe preview
 ]
@@ -90,26 +93,112 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_ENGINE=sqlite (default, single server) or DB_ENGINE=postgresql (larger campuses)
+DB_ENGINE = os.getenv('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgresql':
+    # Requires psycopg (pip install "psycopg[binary]").
+    # Persistent connections, health-checked before reuse (a restarted server
+    # doesn't surface as errors). PageImpression is range-partitioned by month
+    # (migration 0015); manage partitions with `python manage.py impression_partitions`.
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('POSTGRES_DB', 'liblogin'),
+            'USER': os.getenv('POSTGRES_USER', 'liblogin'),
+            'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+            'HOST': os.getenv('POSTGRES_HOST', '127.0.0.1'),
+            'PORT': os.getenv('POSTGRES_PORT', '5432'),
+            'CONN_MAX_AGE': int(os.getenv('POSTGRES_CONN_MAX_AGE', '600')),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'connect_timeout': 5,
+                'application_name': 'liblogin',
+            },
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        }
     }
-}
 
+# SQLite production mode (backend/sqlite.py), opt-in with SQLITE_PRODUCTION=True:
+# WAL + busy_timeout + tuned pragmas on every connection. SQLITE_SINGLE_WRITER runs
+# impression inserts on one writer thread (started by deploy/waitress_serve.py) whose
+# transactions alone are IMMEDIATE; request transactions stay DEFERRED, so reads never
+# take the write lock. Ignored with DB_ENGINE=postgresql.
+SQLITE_PRODUCTION = os.getenv('SQLITE_PRODUCTION', 'False') == 'True'
+SQLITE_SINGLE_WRITER = os.getenv('SQLITE_SINGLE_WRITER', 'True') == 'True'
+SQLITE_WRITER_TIMEOUT = float(os.getenv('SQLITE_WRITER_TIMEOUT', '10'))  # seconds a request waits for its write
+
+# Monthly PageImpression partitions created ahead of time (PostgreSQL only)
+IMPRESSION_PARTITIONS_AHEAD = int(os.getenv('IMPRESSION_PARTITIONS_AHEAD', '3'))
+
+# Tiered retention (api/retention.py, `python manage.py archive_impressions`):
+# raw impressions older than IMPRESSION_RETENTION_MONTHS (current month included) are
+# moved to compressed monthly archive files, then deleted IMPRESSION_ARCHIVE_CHUNK rows per transaction.
+# Analytics read archived months transparently.
+IMPRESSION_RETENTION_MONTHS = int(os.getenv('IMPRESSION_RETENTION_MONTHS', '13'))
+IMPRESSION_ARCHIVE_DIR = Path(os.getenv('IMPRESSION_ARCHIVE_DIR', BASE_DIR / 'data' / 'impression_archive'))
+IMPRESSION_ARCHIVE_CHUNK = int(os.getenv('IMPRESSION_ARCHIVE_CHUNK', '2000'))
+
+# Live impression feed (api/live.py): /api/live/stream/ (SSE) and /api/live/poll/.
+# Every open stream / waiting poll holds a Waitress thread — at most LIVE_FEED_MAX_CONNECTIONS per process.
+LIVE_FEED_MAX_CONNECTIONS = int(os.getenv('LIVE_FEED_MAX_CONNECTIONS', '2'))
+LIVE_FEED_STREAM_SECONDS = int(os.getenv('LIVE_FEED_STREAM_SECONDS', '55'))
+LIVE_FEED_POLL_TIMEOUT = int(os.getenv('LIVE_FEED_POLL_TIMEOUT', '25'))
+LIVE_FEED_BUFFER_SIZE = int(os.getenv('LIVE_FEED_BUFFER_SIZE', '500'))
+
+# impression-statistics ?since=<watermark> delta refreshes fall back to a full
+# recomputation once the watermark's full load is older than this (seconds)
+STATS_DELTA_MAX_AGE = int(os.getenv('STATS_DELTA_MAX_AGE', '600'))
+# Watermarks only cover impressions older than this (seconds), so a row whose
+# insert commits after a higher id is still picked up by the next delta.
+# SQLite's single writer commits in id order; PostgreSQL needs the lag.
+STATS_DELTA_SETTLE_SECONDS = int(os.getenv('STATS_DELTA_SETTLE_SECONDS', '15' if DB_ENGINE == 'postgresql' else '0'))
+
+# Per-hotspot traffic monitor (api/traffic_monitor.py): in-memory EWMA rate + hour-of-week
+# baseline per hotspot; shown in /api/hotspots/ (traffic), /api/health/ and /metrics/.
+# silent = no impression for TRAFFIC_SILENT_MIN_MINUTES while the baseline expected
+# TRAFFIC_SILENT_EXPECTED or more; spike = rate >= TRAFFIC_SPIKE_FACTOR x baseline
+TRAFFIC_MONITOR_WINDOW = int(os.getenv('TRAFFIC_MONITOR_WINDOW', '900'))  # EWMA time constant (seconds)
+TRAFFIC_BASELINE_WEEKS = int(os.getenv('TRAFFIC_BASELINE_WEEKS', '4'))
+TRAFFIC_SILENT_EXPECTED = float(os.getenv('TRAFFIC_SILENT_EXPECTED', '8'))
+TRAFFIC_SILENT_MIN_MINUTES = int(os.getenv('TRAFFIC_SILENT_MIN_MINUTES', '15'))
+TRAFFIC_SPIKE_FACTOR = float(os.getenv('TRAFFIC_SPIKE_FACTOR', '3'))
+TRAFFIC_SPIKE_MIN = int(os.getenv('TRAFFIC_SPIKE_MIN', '20'))
 
 # Cache configuration
 # https://docs.djangoproject.com/en/5.2/topics/cache/
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'liblogin-cache',
-        'OPTIONS': {
-            'MAX_ENTRIES': 1000,  # Maximum number of cache entries
+# Multi-process serving (deploy/waitress_serve.py): WAITRESS_WORKERS processes share one socket.
+# Worker processes need a shared cache (backend/cache_backends.SQLiteCache) so cache
+# invalidation, the public content version and throttling apply across all of them.
+WAITRESS_WORKERS = int(os.getenv('WAITRESS_WORKERS', '1'))
+SHARED_CACHE = os.getenv('SHARED_CACHE', 'True' if WAITRESS_WORKERS > 1 else 'False') == 'True'
+
+if SHARED_CACHE:
+    CACHES = {
+        'default': {
+            'BACKEND': 'backend.cache_backends.SQLiteCache',
+            'LOCATION': os.getenv('SHARED_CACHE_PATH', str(BASE_DIR / 'cache' / 'shared_cache.sqlite3')),
+            'OPTIONS': {
+                'MAX_ENTRIES': 10000,
+            }
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'liblogin-cache',
+            'OPTIONS': {
+                'MAX_ENTRIES': 1000,  # Maximum number of cache entries
+            }
         }
     }
-}
-
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -177,6 +266,44 @@ CORS_ALLOW_HEADERS = [
 MEDIA_URL = os.getenv('MEDIA_URL', '/media/')
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Serve login-background / slide-content / template-config / landing-url from
+# cached, pre-encoded JSON (api/fastpath.py) instead of the DRF views
+PUBLIC_API_FAST_PATH = os.getenv('PUBLIC_API_FAST_PATH', 'True') == 'True'
+
+# Cached hotspot ZIP bundles (api/hotspot_files.py) — not publicly served
+HOTSPOT_BUNDLE_CACHE_DIR = Path(os.getenv('HOTSPOT_BUNDLE_CACHE_DIR', BASE_DIR / 'cache' / 'hotspot_bundles'))
+
+# Hotspot folder watcher (api/watcher.py) — keeps Hotspot file status live
+# inotify on Linux, stat() polling elsewhere (interval in seconds)
+HOTSPOT_WATCHER_ENABLED = os.getenv('HOTSPOT_WATCHER_ENABLED', 'True') == 'True'
+HOTSPOT_WATCHER_POLL_INTERVAL = float(os.getenv('HOTSPOT_WATCHER_POLL_INTERVAL', '5'))
+
+# Prometheus metrics at /metrics/ (backend/metrics.py)
+# If METRICS_TOKEN is set, scrapers must send 'Authorization: Bearer <token>';
+# when it is empty only logged-in staff can read it.
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# SQL profiler (backend/sql_profiler.py)
+# SQL_PROFILE=True profiles every request; otherwise send 'X-SQL-Profile: 1' (staff or DEBUG).
+# Report: /sql-profile/ (staff). Statements slower than SQL_SLOW_QUERY_MS are always logged (0 = off).
+SQL_PROFILE = os.getenv('SQL_PROFILE', 'False') == 'True'
+SQL_SLOW_QUERY_MS = float(os.getenv('SQL_SLOW_QUERY_MS', '200'))
+# Max queries per request by URL name — exceeding logs a warning while profiling,
+# and raises QueryBudgetExceeded when SQL_QUERY_BUDGET_STRICT is True (tests)
+SQL_QUERY_BUDGETS = {
+    'dashboard': 15,
+    'backgrounds': 15,
+    'hotspots': 10,
+    'hotspot-list': 10,
+    'admin:api_hotspot_changelist': 12,
+    'admin:api_backgroundimage_changelist': 12,
+    'login-background': 3,
+    'template-config': 6,
+    'landing-url': 2,
+    'track-impression': 7,  # 4 once the hour's HourlyTraffic row exists
+}
+SQL_QUERY_BUDGET_STRICT = os.getenv('SQL_QUERY_BUDGET_STRICT', 'False') == 'True'
+
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
@@ -200,11 +327,21 @@ LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'dashboard'
 LOGOUT_REDIRECT_URL = 'login'
 
-SESSION_COOKIE_AGE = 28800          # 8 hours (seconds)
+SESSION_COOKIE_AGE = 28800          # 8 hours idle timeout (seconds)
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
-SESSION_SAVE_EVERY_REQUEST = True   # Reset timeout on each request
+# Sliding expiry without a DB write per request (backend/sessions.py):
+# cache-first session store with DB write-through; an unmodified session is
+# re-saved at most once per SESSION_REFRESH_INTERVAL (idle timeout stays >= 8 h)
+SESSION_ENGINE = 'backend.sessions'
+SESSION_SAVE_EVERY_REQUEST = False
+SESSION_REFRESH_INTERVAL = int(os.getenv('SESSION_REFRESH_INTERVAL', '900'))  # 15 minutes
 
 # Logging — rotating file log (production)
+# Loggers write to 'queue' (backend/log_handlers.py): request threads only enqueue,
+# a background listener thread formats and writes to 'file' + 'console'.
+# Hot-path INFO messages (api.views.hotpath) are sampled at LOG_HOTPATH_SAMPLE_RATE.
+LOG_HOTPATH_SAMPLE_RATE = float(os.getenv('LOG_HOTPATH_SAMPLE_RATE', '0.05'))
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -226,10 +363,19 @@ LOGGING = {
             'class': 'logging.StreamHandler',
             'formatter': 'verbose',
         },
+        'queue': {  # must sort after its targets (dictConfig order)
+            '()': 'backend.log_handlers.AsyncQueueHandler',
+            'targets': ['cfg://handlers.file', 'cfg://handlers.console'],
+            'sampling': {
+                'api.views.hotpath': LOG_HOTPATH_SAMPLE_RATE,
+            },
+            'maxsize': 10000,
+        },
     },
     'loggers': {
-        'api':    {'handlers': ['file', 'console'], 'level': 'INFO', 'propagate': False},
-        'webapp': {'handlers': ['file', 'console'], 'level': 'INFO', 'propagate': False},
+        'api':    {'handlers': ['queue'], 'level': 'INFO', 'propagate': False},
+        'webapp': {'handlers': ['queue'], 'level': 'INFO', 'propagate': False},
+        'backend': {'handlers': ['queue'], 'level': 'INFO', 'propagate': False},
     },
 }
 
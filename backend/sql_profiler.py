@@ -0,0 +1,264 @@
+"""
+Per-view SQL profiler, slow-query log and query budgets.
+
+SqlProfilerMiddleware wraps every request in connection.execute_wrapper:
+  - Always: statements slower than SQL_SLOW_QUERY_MS are logged with their
+    call site (0 disables).
+  - Profiling mode (SQL_PROFILE = True, or header 'X-SQL-Profile: 1' from a
+    staff user / in DEBUG): every statement is captured with timing and the
+    project call-site stack, aggregated per view (count, total ms, repeated
+    statement fingerprints = N+1 candidates), and summarised in response
+    headers X-SQL-Queries / X-SQL-Time-Ms / X-SQL-Repeated.
+  - Budgets: SQL_QUERY_BUDGETS maps URL names (e.g. 'dashboard',
+    'hotspot-list', 'admin:api_hotspot_changelist') to a max query count.
+    Exceeding one logs a warning while profiling; with
+    SQL_QUERY_BUDGET_STRICT = True it raises QueryBudgetExceeded, which the
+    Django test client re-raises so the test fails.
+
+The aggregated report is available to staff at /sql-profile/ (?reset=1 clears it).
+"""
+
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+import traceback
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.http import JsonResponse, HttpResponseForbidden
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-SQL-Profile'
+STACK_DEPTH = 6
+
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_NUMBER = re.compile(r'\b\d+\b')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_WHITESPACE = re.compile(r'\s+')
+
+# Middleware frames that wrap every query and would only add noise to call sites
+_SKIP_FILES = {__file__, os.path.join(os.path.dirname(__file__), 'metrics.py')}
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A view ran more SQL statements than its declared budget"""
+
+
+def fingerprint(sql):
+    """Normalise a statement so repeated calls with different parameters group together"""
+    normalized = _WHITESPACE.sub(' ', sql.strip())
+    normalized = _STRING.sub('?', normalized)
+    normalized = _IN_LIST.sub('IN (...)', normalized)
+    normalized = _NUMBER.sub('?', normalized)
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:12], normalized
+
+
+def _call_site(depth=STACK_DEPTH):
+    """Innermost project frames (no Django/site-packages, no profiler frames)"""
+    base_dir = str(settings.BASE_DIR)
+    frames = [
+        f'{os.path.relpath(frame.filename, base_dir)}:{frame.lineno} in {frame.name}'
+        for frame in traceback.extract_stack()
+        if frame.filename.startswith(base_dir)
+        and 'site-packages' not in frame.filename
+        and frame.filename not in _SKIP_FILES
+    ]
+    return frames[-depth:]
+
+
+class QueryRecorder:
+    """connection.execute_wrapper: times statements, optionally capturing each one"""
+
+    def __init__(self, capture=False, slow_ms=0):
+        self.capture = capture
+        self.slow_ms = slow_ms
+        self.count = 0
+        self.total_ms = 0.0
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.count += 1
+            self.total_ms += elapsed_ms
+            slow = self.slow_ms and elapsed_ms >= self.slow_ms
+            if self.capture or slow:
+                stack = _call_site()
+                if slow:
+                    logger.warning(
+                        "[SQL] Slow query %.1f ms at %s: %s",
+                        elapsed_ms, stack[-1] if stack else '?', sql[:500],
+                    )
+                if self.capture:
+                    self.queries.append({'sql': sql, 'ms': elapsed_ms, 'stack': stack})
+
+    def repeated(self, min_count=2):
+        """[(fingerprint, normalized_sql, count, total_ms, first_stack)] for statements run min_count+ times"""
+        groups = {}
+        for query in self.queries:
+            key, normalized = fingerprint(query['sql'])
+            group = groups.setdefault(key, [normalized, 0, 0.0, query['stack']])
+            group[1] += 1
+            group[2] += query['ms']
+        return sorted(
+            ((key, g[0], g[1], g[2], g[3]) for key, g in groups.items() if g[1] >= min_count),
+            key=lambda row: -row[2],
+        )
+
+
+class ProfileReport:
+    """Per-view aggregate across profiled requests (in-process)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.views = self._empty()
+
+    @staticmethod
+    def _empty():
+        return defaultdict(lambda: {
+            'requests': 0, 'queries': 0, 'total_ms': 0.0, 'max_queries': 0,
+            'fingerprints': Counter(), 'statements': {}, 'stacks': {},
+        })
+
+    def reset(self):
+        with self._lock:
+            self.views = self._empty()
+
+    def add(self, view_name, recorder):
+        with self._lock:
+            entry = self.views[view_name]
+            entry['requests'] += 1
+            entry['queries'] += recorder.count
+            entry['total_ms'] += recorder.total_ms
+            entry['max_queries'] = max(entry['max_queries'], recorder.count)
+            for query in recorder.queries:
+                key, normalized = fingerprint(query['sql'])
+                entry['fingerprints'][key] += 1
+                entry['statements'].setdefault(key, normalized)
+                entry['stacks'].setdefault(key, query['stack'])
+
+    def as_dict(self, top=10):
+        with self._lock:
+            report = {}
+            for view_name, entry in sorted(self.views.items()):
+                requests = entry['requests'] or 1
+                report[view_name] = {
+                    'requests': entry['requests'],
+                    'avg_queries': round(entry['queries'] / requests, 1),
+                    'max_queries': entry['max_queries'],
+                    'avg_ms': round(entry['total_ms'] / requests, 2),
+                    'budget': get_budget(view_name),
+                    'top_statements': [
+                        {
+                            'fingerprint': key,
+                            'per_request': round(count / requests, 1),
+                            'sql': entry['statements'][key][:300],
+                            'stack': entry['stacks'][key],
+                        }
+                        for key, count in entry['fingerprints'].most_common(top)
+                    ],
+                }
+            return report
+
+
+report = ProfileReport()
+
+
+def get_budget(view_name):
+    return getattr(settings, 'SQL_QUERY_BUDGETS', {}).get(view_name)
+
+
+def check_budget(view_name, count):
+    """Log (or raise in strict mode) when a view exceeds its declared budget"""
+    budget = get_budget(view_name)
+    if budget is None or count <= budget:
+        return
+    message = f"[SQL] Query budget exceeded for {view_name}: {count} queries (budget {budget})"
+    if getattr(settings, 'SQL_QUERY_BUDGET_STRICT', False):
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+
+
+@contextmanager
+def assert_max_queries(max_queries, using='default'):
+    """
+    Test helper: fail if the block runs more than max_queries statements.
+    The exception lists repeated statements with their call sites.
+    """
+    recorder = QueryRecorder(capture=True)
+    with connections[using].execute_wrapper(recorder):
+        yield recorder
+    if recorder.count > max_queries:
+        lines = [f'{recorder.count} queries (budget {max_queries})']
+        for key, normalized, count, total_ms, stack in recorder.repeated():
+            lines.append(f'  {count}x {normalized[:200]}  <- {stack[-1] if stack else "?"}')
+        raise QueryBudgetExceeded('\n'.join(lines))
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<unresolved>'
+    return match.view_name or match.route
+
+
+def _profiling_requested(request):
+    if getattr(settings, 'SQL_PROFILE', False):
+        return True
+    if request.headers.get(PROFILE_HEADER) != '1':
+        return False
+    user = getattr(request, 'user', None)
+    return settings.DEBUG or bool(user and user.is_staff)
+
+
+class SqlProfilerMiddleware:
+    """Slow-query log on every request; full capture + budgets in profiling mode"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profiling = _profiling_requested(request)
+        slow_ms = getattr(settings, 'SQL_SLOW_QUERY_MS', 0)
+        if not profiling and not slow_ms:
+            return self.get_response(request)
+
+        recorder = QueryRecorder(capture=profiling, slow_ms=slow_ms)
+        with connections['default'].execute_wrapper(recorder):
+            response = self.get_response(request)
+
+        if profiling:
+            view_name = _view_name(request)
+            report.add(view_name, recorder)
+            repeated = recorder.repeated()
+            response['X-SQL-Queries'] = str(recorder.count)
+            response['X-SQL-Time-Ms'] = f'{recorder.total_ms:.1f}'
+            response['X-SQL-Repeated'] = str(sum(row[2] for row in repeated))
+            logger.info(
+                "[SQL] %s %s: %d queries, %.1f ms, %d repeated",
+                request.method, view_name, recorder.count, recorder.total_ms, len(repeated),
+            )
+            for key, normalized, count, total_ms, stack in repeated[:5]:
+                logger.info("[SQL]   %dx (%.1f ms) %s <- %s", count, total_ms, normalized[:200], ' > '.join(stack[-3:]))
+            check_budget(view_name, recorder.count)
+        return response
+
+
+def sql_profile_view(request):
+    """Staff-only JSON report of profiled views (?reset=1 clears it)"""
+    user = getattr(request, 'user', None)
+    if not (user and user.is_authenticated and user.is_staff):
+        return HttpResponseForbidden('Forbidden')
+    data = report.as_dict()
+    if request.GET.get('reset') == '1':
+        report.reset()
+    return JsonResponse({'success': True, 'views': data}, json_dumps_params={'ensure_ascii': False})
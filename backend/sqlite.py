@@ -0,0 +1,192 @@
+"""
+SQLite production mode.
+
+1. Pragmas — applied to every new SQLite connection (connection_created):
+   WAL journaling (readers never wait for the writer), busy_timeout instead of
+   failing fast with "database is locked", synchronous=NORMAL (safe with WAL),
+   a larger page cache and memory-mapped reads. Enabled by SQLITE_PRODUCTION.
+
+2. Single writer — SingleWriter owns one dedicated connection in its own
+   thread. Request threads hand it small write jobs (impression inserts,
+   rollups) via run_write(); it runs a batch of queued jobs in one
+   transaction (one commit/fsync per batch, each job in its own savepoint),
+   so concurrent Waitress threads never fight over the SQLite write lock.
+   Only this connection begins its transactions IMMEDIATE (the write lock is
+   taken at BEGIN instead of failing on the upgrade from a read); every other
+   connection keeps SQLite's DEFERRED default, so read-only atomic blocks
+   (stats, exports) never take or wait for the write lock.
+   The writer is started by deploy/waitress_serve.py; when it is not running
+   (runserver, tests, management commands) run_write() executes inline.
+   The writer is per process, so waitress_serve.py refuses WAITRESS_WORKERS > 1
+   on SQLite while SQLITE_SINGLE_WRITER is on (every worker would run its own
+   writer and contend for the write lock again).
+
+Benchmark: python manage.py bench_track_impression
+"""
+
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+PRODUCTION_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,        # ms to wait for a lock before "database is locked"
+    'cache_size': -20000,        # negative = KiB (≈20 MB page cache)
+    'mmap_size': 268435456,      # 256 MB memory-mapped reads
+    'temp_store': 'MEMORY',
+}
+
+
+def sqlite_pragmas():
+    pragmas = dict(PRODUCTION_PRAGMAS)
+    pragmas.update(getattr(settings, 'SQLITE_PRAGMAS', {}))
+    return pragmas
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite' or not getattr(settings, 'SQLITE_PRODUCTION', False):
+        return
+    if connection.is_in_memory_db():
+        return
+    with connection.cursor() as cursor:
+        for name, value in sqlite_pragmas().items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+class SingleWriter:
+    """Serialises write jobs onto one thread/connection with batched commits"""
+
+    def __init__(self, max_batch=200, queue_size=10000):
+        self.max_batch = max_batch
+        self.jobs = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if not self.running:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='sqlite-writer', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=10):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def submit(self, func, *args, timeout=5, **kwargs):
+        """Queue func(*args, **kwargs) and return a Future (raises queue.Full if backed up)"""
+        future = Future()
+        self.jobs.put((future, func, args, kwargs), timeout=timeout)
+        return future
+
+    def _next_batch(self):
+        try:
+            batch = [self.jobs.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self.jobs.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        logger.info("[SQLite Writer] Started")
+        try:
+            while not (self._stop.is_set() and self.jobs.empty()):
+                batch = self._next_batch()
+                if batch:
+                    self._execute(batch)
+        finally:
+            connection.close()
+            logger.info("[SQLite Writer] Stopped")
+
+    def _execute(self, batch):
+        results = []
+        try:
+            close_old_connections()
+            _begin_immediate()
+            with transaction.atomic():
+                for future, func, args, kwargs in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        with transaction.atomic():  # savepoint: one failing job doesn't roll back the batch
+                            results.append((future, func(*args, **kwargs), None))
+                    except Exception as e:
+                        results.append((future, None, e))
+        except Exception as e:
+            # The commit itself failed: nothing in this batch was written
+            logger.error(f"[SQLite Writer] Batch of {len(batch)} failed: {str(e)}", exc_info=True)
+            for future, func, args, kwargs in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for future, result, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+def _begin_immediate():
+    # Per connection: reset whenever Django reopens it, hence set before every batch
+    connection.ensure_connection()
+    connection.transaction_mode = 'IMMEDIATE'
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def start_writer(**kwargs):
+    """Start the process-wide single writer (SQLite only; no-op otherwise)"""
+    global _writer
+    if connection.vendor != 'sqlite':
+        return None
+    with _writer_lock:
+        if _writer is None:
+            _writer = SingleWriter(**kwargs)
+        _writer.start()
+    return _writer
+
+
+def stop_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is not None:
+            _writer.stop()
+            _writer = None
+
+
+def run_write(func, *args, timeout=None, **kwargs):
+    """
+    Run a write job on the single writer and wait for its result,
+    or inline in the calling thread when the writer is not running.
+    Raises queue.Full when the writer is backed up and TimeoutError when the
+    job is not done within SQLITE_WRITER_TIMEOUT; a timed-out job is still
+    queued and may commit afterwards.
+    """
+    writer = _writer
+    if writer is None or not writer.running:
+        return func(*args, **kwargs)
+    timeout = timeout or getattr(settings, 'SQLITE_WRITER_TIMEOUT', 10)
+    return writer.submit(func, *args, **kwargs).result(timeout=timeout)
@@ -5,7 +5,10 @@ from django.urls import path, include, re_path
 from django.conf import settings
 from django.views.static import serve
 from django.db import connection
-from django.http import JsonResponse
+from django.http import JsonResponse, Http404
+from webapp.assets import registry as asset_registry, hotspot_login_path
+from backend.metrics import metrics_view
+from backend.sql_profiler import sql_profile_view
 import os
 
 
@@ -30,6 +33,8 @@ def health(request):
 
 urlpatterns = [
     path('health/', health, name='nms_health'),  # NMS monitoring (root-level)
+    path('metrics/', metrics_view, name='metrics'),  # Prometheus scrape (backend/metrics.py)
+    path('sql-profile/', sql_profile_view, name='sql_profile'),  # staff-only SQL profiler report
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
     path('', include('webapp.urls')),
@@ -42,7 +47,13 @@ urlpatterns += [
 ]
 
 # Serve hotspot login pages from multiple hotspot folders
+# login.html ถูกเรียกบ่อยที่สุด → เสิร์ฟจาก asset registry (in-memory + ETag + gzip)
 def serve_hotspot_file(request, hotspot_name, path):
+    if path == 'login.html':
+        try:
+            return asset_registry.serve(request, hotspot_login_path(hotspot_name), 'text/html; charset=utf-8')
+        except FileNotFoundError:
+            raise Http404('login.html not found')
     document_root = os.path.join(settings.BASE_DIR, hotspot_name)
     return serve(request, path, document_root=document_root)
 
@@ -39,6 +39,16 @@ if %errorlevel% equ 0 (
     echo [ERROR] Media backup failed!
 )
 
+REM Backup impression archives (data\impression_archive — ไฟล์รายเดือนไม่เปลี่ยนแปลง จึงคัดลอกเฉพาะไฟล์ใหม่ ไม่ลบตามอายุ)
+echo.
+echo =====================================================
+echo Backing up impression archives...
+echo =====================================================
+if exist "data\impression_archive" (
+    xcopy "data\impression_archive" "backups\impression_archive\" /D /I /Y /Q
+    echo [SUCCESS] Impression archives: backups\impression_archive\
+)
+
 REM ลบ backup เก่าที่เกิน 30 วัน (optional)
 echo.
 echo =====================================================
@@ -16,10 +16,105 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 host    = os.getenv('WAITRESS_HOST', '127.0.0.1')
 port    = int(os.getenv('WAITRESS_PORT', '8002'))
 threads = int(os.getenv('WAITRESS_THREADS', '8'))
+workers = int(os.getenv('WAITRESS_WORKERS', '1'))
 
-print(f"[START] LibLogin {host}:{port} ({threads} threads)")
 
-from waitress import serve
-from backend.wsgi import application
+def start_background_services(watcher=True):
+    from django.conf import settings
+    if settings.SQLITE_SINGLE_WRITER:
+        from backend.sqlite import start_writer
+        start_writer()
 
-serve(application, host=host, port=port, threads=threads, url_scheme='https')
+    if watcher and settings.HOTSPOT_WATCHER_ENABLED:
+        from api.watcher import start_watcher
+        start_watcher(poll_interval=settings.HOTSPOT_WATCHER_POLL_INTERVAL)
+
+
+def serve_worker(sock, index):
+    """Worker process: serve the shared listening socket (runs in a spawned child)"""
+    import signal
+    from waitress import serve
+    from backend.wsgi import application
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C is handled by the supervisor
+    start_background_services(watcher=False)  # one watcher for all workers, in the supervisor
+    print(f"[WORKER {index}] pid {os.getpid()} ({threads} threads)")
+    serve(application, sockets=[sock], threads=threads, url_scheme='https')
+
+
+def serve_multi():
+    """
+    Supervisor: bind once, spawn WAITRESS_WORKERS processes that all accept on
+    the same socket (spreads Pillow/ReportLab/JSON work over several GILs),
+    restart any worker that exits, and run the hotspot watcher here.
+    """
+    import multiprocessing
+    import signal
+    import socket
+    import time
+
+    from django.conf import settings
+    if settings.SQLITE_SINGLE_WRITER and settings.DATABASES['default']['ENGINE'].endswith('sqlite3'):
+        # Each worker would start its own writer: several processes contending for the write lock again
+        print(f"[ERROR] WAITRESS_WORKERS={workers} with SQLite and SQLITE_SINGLE_WRITER would run one writer per "
+              f"worker. Use WAITRESS_WORKERS=1, DB_ENGINE=postgresql, or SQLITE_SINGLE_WRITER=False to accept "
+              f"contending writers (see DEPLOYMENT.md)")
+        sys.exit(1)
+    if not settings.SHARED_CACHE:
+        print("[WARN] SHARED_CACHE is off — each worker has its own cache and content edits may be served stale")
+    print("[INFO] Traffic monitor state is per worker (DEPLOYMENT.md, Waitress workers)")
+
+    sock = socket.create_server((host, port), backlog=1024)
+    ctx = multiprocessing.get_context('spawn')  # no fork of a process with running threads
+    procs = {}
+    stopping = []
+
+    def spawn(index):
+        proc = ctx.Process(target=serve_worker, args=(sock, index), name=f'liblogin-worker-{index}', daemon=True)
+        proc.start()
+        procs[index] = proc
+
+    def stop(*_):
+        stopping.append(True)
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    for index in range(workers):
+        spawn(index)
+
+    # The supervisor serves no requests (no SQLite writer here), but owns the single watcher
+    import django
+    django.setup()
+    if settings.HOTSPOT_WATCHER_ENABLED:
+        from api.watcher import start_watcher
+        start_watcher(poll_interval=settings.HOTSPOT_WATCHER_POLL_INTERVAL)
+
+    try:
+        while not stopping:
+            time.sleep(1)
+            for index, proc in list(procs.items()):
+                if not proc.is_alive() and not stopping:
+                    print(f"[WORKER {index}] exited with code {proc.exitcode}, restarting")
+                    spawn(index)
+    finally:
+        print("[STOP] Stopping workers")
+        for proc in procs.values():
+            proc.terminate()
+        for proc in procs.values():
+            proc.join(10)
+        sock.close()
+
+
+if __name__ == '__main__':
+    if workers > 1:
+        print(f"[START] LibLogin {host}:{port} ({workers} workers × {threads} threads)")
+        serve_multi()
+    else:
+        print(f"[START] LibLogin {host}:{port} ({threads} threads)")
+
+        from waitress import serve
+        from backend.wsgi import application
+
+        start_background_services()
+        serve(application, host=host, port=port, threads=threads, url_scheme='https')
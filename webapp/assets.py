@@ -0,0 +1,178 @@
+"""
+File-backed asset registry for small static pages served by Django views.
+
+Files are read once and kept in memory together with a content hash, a
+gzip-compressed copy and their mtime. Each request only stat()s the file;
+the content is reloaded when the mtime or size changes.
+
+Used by login_css, hotspot_login_html, test_hotspot_background and the
+hotspot_*/login.html route in backend/urls.py. asset_version() stamps the
+login.css link of every generated login.html (api/hotspot_files.py).
+"""
+
+import gzip
+import hashlib
+import os
+import threading
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+
+# Versioned URLs (?v=<hash>) never change content, so they can be cached "forever"
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+# Unversioned URLs keep the previous 1 hour policy, but now revalidate with ETag
+DEFAULT_MAX_AGE = 3600
+# Not worth compressing tiny files
+GZIP_MIN_SIZE = 512
+
+
+@dataclass
+class Asset:
+    """In-memory copy of one file"""
+    path: str
+    content_type: str
+    content: bytes
+    gzipped: bytes
+    etag: str
+    digest: str
+    mtime: float
+    size: int
+
+    @property
+    def last_modified(self):
+        return http_date(self.mtime)
+
+
+class AssetRegistry:
+    """Thread-safe cache of files keyed by absolute path, revalidated by mtime"""
+
+    def __init__(self):
+        self._assets = {}
+        self._lock = threading.Lock()
+
+    def get(self, path, content_type):
+        """Return the cached Asset for path, reloading it if the file changed. Raises FileNotFoundError."""
+        st = os.stat(path)
+        asset = self._assets.get(path)
+        if asset and asset.mtime == st.st_mtime and asset.size == st.st_size:
+            return asset
+
+        with self._lock:
+            asset = self._assets.get(path)
+            if asset and asset.mtime == st.st_mtime and asset.size == st.st_size:
+                return asset
+            asset = self._load(path, content_type, st)
+            self._assets[path] = asset
+            return asset
+
+    def _load(self, path, content_type, st):
+        with open(path, 'rb') as f:
+            content = f.read()
+        digest = hashlib.sha256(content).hexdigest()
+        gzipped = gzip.compress(content, compresslevel=6, mtime=0) if len(content) >= GZIP_MIN_SIZE else b''
+        return Asset(
+            path=path,
+            content_type=content_type,
+            content=content,
+            gzipped=gzipped if gzipped and len(gzipped) < len(content) else b'',
+            etag=f'"{digest[:32]}"',
+            digest=digest,
+            mtime=st.st_mtime,
+            size=st.st_size,
+        )
+
+    def invalidate(self, path=None):
+        """Drop one path (or everything) from the registry"""
+        with self._lock:
+            if path is None:
+                self._assets.clear()
+            else:
+                self._assets.pop(path, None)
+
+    def version(self, path, content_type='application/octet-stream'):
+        """Short content hash for cache-busting URLs, or '' if the file is missing"""
+        try:
+            return self.get(path, content_type).digest[:12]
+        except FileNotFoundError:
+            return ''
+
+    def serve(self, request, path, content_type, max_age=DEFAULT_MAX_AGE):
+        """
+        Build a response for path with ETag / Last-Modified / gzip.
+        Returns 304 when the client copy is still valid.
+        Raises FileNotFoundError so callers can keep their own 404 bodies.
+        """
+        asset = self.get(path, content_type)
+
+        if _not_modified(request, asset):
+            response = HttpResponseNotModified()
+        else:
+            accepts_gzip = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+            if asset.gzipped and accepts_gzip:
+                response = HttpResponse(asset.gzipped, content_type=asset.content_type)
+                response['Content-Encoding'] = 'gzip'
+            else:
+                response = HttpResponse(asset.content, content_type=asset.content_type)
+
+        response['ETag'] = asset.etag
+        response['Last-Modified'] = asset.last_modified
+        if asset.gzipped:
+            patch_vary_headers(response, ('Accept-Encoding',))
+
+        # Content-hashed URL → safe to cache long-term
+        requested_version = request.GET.get('v')
+        if requested_version and requested_version == asset.digest[:len(requested_version)] and len(requested_version) >= 8:
+            response['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+        else:
+            response['Cache-Control'] = f'public, max-age={max_age}'
+        return response
+
+
+def _not_modified(request, asset):
+    """Conditional GET check (If-None-Match wins over If-Modified-Since)"""
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        etags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+        return '*' in etags or asset.etag in etags
+
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return if_modified_since is not None and int(asset.mtime) <= if_modified_since
+
+
+# Shared registry for the whole process
+registry = AssetRegistry()
+
+
+# Named assets served by webapp views: url name -> (path parts under BASE_DIR, content type)
+NAMED_ASSETS = {
+    'login_css': (('static', 'css', 'login.css'), 'text/css; charset=utf-8'),
+    'hotspot_login_html': (('hotspot', 'login.html'), 'text/html; charset=utf-8'),
+    'test_hotspot_background': (('test_hotspot_background.html',), 'text/html; charset=utf-8'),
+}
+
+
+def asset_path(name):
+    """Absolute filesystem path of a named asset"""
+    parts, _ = NAMED_ASSETS[name]
+    return os.path.join(settings.BASE_DIR, *parts)
+
+
+def serve_named(request, name):
+    """Serve a named asset via the shared registry (raises FileNotFoundError)"""
+    _, content_type = NAMED_ASSETS[name]
+    return registry.serve(request, asset_path(name), content_type)
+
+
+def hotspot_login_path(hotspot_name):
+    """Absolute path of a generated {hotspot_name}/login.html"""
+    return os.path.join(settings.BASE_DIR, hotspot_name, 'login.html')
+
+
+def asset_version(name):
+    """Short content hash of a named asset ('' if the file is missing)"""
+    _, content_type = NAMED_ASSETS[name]
+    return registry.version(asset_path(name), content_type)
+
@@ -1,3 +1,116 @@
-from django.test import TestCase
+"""
+Performance budgets for every webapp/urls.py route (backend/perf.py), then
+behaviour tests for the webapp views:
+  python manage.py test webapp
+"""
 
-# Create your tests here.
+import re
+from unittest import mock
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from api import hotspot_files
+from backend import sessions
+from backend.perf import SEED_PASSWORD, Case, RoutePerformanceMixin, new_background
+from webapp import urls
+
+MIKROTIK_QUERY = {'mac': '02:46:00:00:00:01', 'ip': '10.5.50.10', 'hotspot_name': 'perf_library'}
+# Served from files in the checkout; a checkout without them answers 404
+ASSET_STATUS = (200, 404)
+
+
+class WebappPerformanceTests(RoutePerformanceMixin, TransactionTestCase):
+    urlconf = urls
+    cases = (
+        # Admin pages
+        Case('dashboard'),
+        Case('dashboard', user='member', label='member'),
+        Case('backgrounds'),
+        Case('templates'),
+        Case('slides'),
+        Case('cards'),
+        Case('settings'),
+        Case('users'),
+        Case('hotspots'),
+        Case('departments'),
+        Case('monitoring'),
+        Case('landing_pages'),
+        Case('set_active', 'POST', args=lambda seed: (seed.backgrounds[1].pk,), form=True, status=302),
+        Case('delete_background', 'POST', args=new_background, form=True, status=302),
+
+        # Sign-in / sign-out (the password hasher is MD5 in the suite, so this is the view, not PBKDF2)
+        Case('login', user=None),
+        Case('login', 'POST', user=None, form=True, status=302, prepare=lambda client, seed: client.logout(),
+             data={'username': 'perf_admin', 'password': SEED_PASSWORD}),
+        Case('logout', status=302, prepare=lambda client, seed: client.force_login(seed.staff)),
+
+        # MikroTik hotspot pages and static assets (public)
+        Case('hotspot_login', query=MIKROTIK_QUERY, user=None),
+        Case('hotspot_logout', query=MIKROTIK_QUERY, user=None),
+        Case('hotspot_status', query=MIKROTIK_QUERY, user=None),
+        Case('hotspot_error', query={'error': 'invalid username or password'}, user=None),
+        Case('test_hotspot_background', user=None, status=ASSET_STATUS),
+        Case('hotspot_login_html', user=None, status=ASSET_STATUS),
+        Case('login_css', user=None, status=ASSET_STATUS),
+    )
+
+
+class LoginCssTests(SimpleTestCase):
+    """The stylesheet link stamped into generated login.html pages is served from the asset registry"""
+
+    def _stamped_url(self):
+        html = hotspot_files.render_login_html(hotspot_files.read_master_template(), 'hotspot_lab')
+        href = re.search(r'<link rel="stylesheet" href="([^"]+)"', html).group(1)
+        # Deployed under /liblogin/ (IIS ARR); the app sees the path without it
+        url = urlsplit(href)
+        return url.path.removeprefix('/liblogin'), url.query
+
+    def test_stamped_url_is_immutable_and_revalidates(self):
+        path, query = self._stamped_url()
+        self.assertEqual(path, reverse('login_css'))
+        self.assertRegex(query, r'^v=\w{8,}$')
+
+        response = self.client.get(f'{path}?{query}')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('max-age=31536000', response['Cache-Control'])
+
+        again = self.client.get(f'{path}?{query}', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+        self.assertIn('immutable', again['Cache-Control'])
+
+
+class SlidingSessionTests(TransactionTestCase):
+    """SlidingSessionMiddleware re-saves an unmodified session only after SESSION_REFRESH_INTERVAL"""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('session_admin', is_staff=True))
+        self.saved_at = self.client.session[sessions.REFRESHED_AT_KEY]
+
+    def _dashboard_at(self, now):
+        with mock.patch.object(sessions, 'time', mock.Mock(time=mock.Mock(return_value=now))):
+            self.assertEqual(self.client.get(reverse('dashboard')).status_code, 200)
+        return self.client.session[sessions.REFRESHED_AT_KEY]
+
+    @override_settings(SESSION_REFRESH_INTERVAL=900)
+    def test_refreshes_once_the_interval_has_passed(self):
+        with mock.patch.object(sessions.SessionStore, 'save', autospec=True, side_effect=sessions.SessionStore.save) as save:
+            self.assertEqual(self._dashboard_at(self.saved_at + 899), self.saved_at)
+            save.assert_not_called()
+
+            self.assertEqual(self._dashboard_at(self.saved_at + 900), self.saved_at + 900)
+            self.assertEqual(save.call_count, 1)
+
+            self.assertEqual(self._dashboard_at(self.saved_at + 1000), self.saved_at + 900)
+            self.assertEqual(save.call_count, 1)
+
+    def test_server_side_lifetime_covers_the_refresh_interval(self):
+        expire_date = Session.objects.get(session_key=self.client.session.session_key).expire_date
+        lifetime = (expire_date - timezone.now()).total_seconds()
+        self.assertGreater(lifetime, settings.SESSION_COOKIE_AGE + sessions.refresh_interval() - 60)
@@ -7,8 +7,7 @@ from django.views.decorators.csrf import csrf_exempt
 from django.http import HttpResponse
 from django.db.models import Q
 from api.models import BackgroundImage, SystemSettings, TemplateConfig, SlideContent, CardContent, Hotspot, Department
-import os
-from django.conf import settings as django_settings
+from .assets import serve_named
 
 
 def get_user_allowed_hotspots(user):
@@ -423,41 +422,29 @@ def hotspot_error(request):
 
 
 def test_hotspot_background(request):
-    """Serve test_hotspot_background.html static file"""
-    file_path = os.path.join(django_settings.BASE_DIR, 'test_hotspot_background.html')
-
+    """Serve test_hotspot_background.html static file (cached in memory, revalidated by mtime)"""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        return HttpResponse(content, content_type='text/html')
+        return serve_named(request, 'test_hotspot_background')
     except FileNotFoundError:
         return HttpResponse('Test file not found', status=404)
 
 
 def hotspot_login_html(request):
-    """Serve hotspot/login.html static file for testing"""
-    file_path = os.path.join(django_settings.BASE_DIR, 'hotspot', 'login.html')
-
+    """Serve hotspot/login.html static file for testing (cached in memory, revalidated by mtime)"""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        return HttpResponse(content, content_type='text/html')
+        return serve_named(request, 'hotspot_login_html')
     except FileNotFoundError:
         return HttpResponse('Login.html file not found', status=404)
 
 
 def login_css(request):
-    """Serve combined CSS file with cache headers"""
-    file_path = os.path.join(django_settings.BASE_DIR, 'static', 'css', 'login.css')
-
+    """
+    Serve combined CSS file with cache headers.
+    ETag/Last-Modified allow 304 revalidation; ?v=<content hash> URLs
+    (as stamped into generated login.html) are cached long-term as immutable.
+    """
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-
-        response = HttpResponse(content, content_type='text/css')
-        # Cache for 1 hour (3600 seconds)
-        response['Cache-Control'] = 'public, max-age=3600'
-        return response
+        return serve_named(request, 'login_css')
     except FileNotFoundError:
         return HttpResponse('/* CSS file not found */', content_type='text/css', status=404)
 